@@ -27,8 +27,24 @@ class BeliefStateAgent(Agent):
         # when 'EAST' is legal (see instructions)
         self.p = self.args.p
 
-        # The transition matrix
-        self.transitionMatrix = []
+        # The transition model, as returned by the 'create_transition_model'
+        # method
+        self.transitionModel = None
+
+        # The number of particles tracking each ghost, the belief states
+        # being computed exactly if it is 0
+        self.numberParticles = self.args.particles
+        # The (Z, numberParticles) positions of the particles of the ghosts
+        # in the flattened maze (assigned with 'initialize_particles' method)
+        self.particles = None
+        # The cumulative move probabilities and the free positions of the
+        # flattened maze, and the offsets of the moves in it (assigned with
+        # 'initialize_particles' method)
+        self.cumulativeMoves = None
+        self.freePositions = None
+        self.moveOffsets = None
+        # The random generator of the particle filter
+        self.rng = np.random.default_rng(self.args.seed)
 
     def updateAndGetBeliefStates(self, evidences):
         """
@@ -53,255 +69,290 @@ class BeliefStateAgent(Agent):
         beliefStates = self.beliefGhostStates
         # XXX: Your code here
 
-        width = beliefStates[0].shape[0]
-        height = beliefStates[0].shape[1]
-
-        i = 0
-
-        # The list contains the beliefStates for all ghosts in the maze.
-        listBeliefStates = list()
-        for evidence in evidences:
-            xPositionGhost = evidence[0]
-            yPositionGhost = evidence[1]
-
-            newBeliefStates = self.compute_probabilities(
-                width, height, xPositionGhost, yPositionGhost, beliefStates[i])
-            listBeliefStates.append(newBeliefStates)
-
-            i += 1
-
-        beliefStates = listBeliefStates
+        # The belief states of all the ghosts are computed at once, as a
+        # (Z, N, M) array, either exactly or from particles.
+        if self.numberParticles > 0:
+            if self.particles is None:
+                self.initialize_particles(
+                    len(beliefStates), self.walls.width, self.walls.height)
+            self.update_particles(np.asarray(evidences))
+            beliefStates = self.bin_particles()
+        else:
+            beliefStates = self.compute_probabilities(
+                np.asarray(evidences), np.asarray(beliefStates))
 
         # XXX: End of your code
         self.beliefGhostStates = beliefStates
         return beliefStates
 
-    def _getLegalActions(self, width, height, x, y):
+    def create_transition_model(self, width, height):
         """
-        Given a (ghost) position in the maze together with the width and
-        height of the maze, returns the list of legal actions.
+        This method creates the transition model of the maze: for each
+        position, the probability that the ghost goes east, west, north or
+        south, or stays in the same place.
 
         Arguments:
         ----------
         - width: The width of the maze.
         - height: The height of the maze.
-        - x: The abscissa position of the ghost.
-        - y: The ordinate position of the ghost.
 
         Return:
         -------
-        - The list of legal actions given the ghost position in the maze.
-
+        - The (5, width, height) array of the probabilities of the moves
+          east, west, north, south and of staying in the same place, for
+          each initial position.
         """
 
-        walls = self.walls
-        legalActions = []
-        if(x < width - 1):
-            if(walls[x + 1][y] == False):
-                legalActions.append("East")
-        if(x > 0):
-            if(walls[x - 1][y] == False):
-                legalActions.append("West")
-        if(y < height - 1):
-            if(walls[x][y + 1] == False):
-                legalActions.append("North")
-        if(y > 0):
-            if(walls[x][y - 1] == False):
-                legalActions.append("South")
-
-        return legalActions
-
-    def create_transition_matrix(self, width, height):
+        free = np.logical_not(np.array(self.walls.data, dtype=bool))
+
+        # The moves leading to a free position of the maze are legal.
+        east = np.zeros((width, height), dtype=bool)
+        west = np.zeros((width, height), dtype=bool)
+        north = np.zeros((width, height), dtype=bool)
+        south = np.zeros((width, height), dtype=bool)
+        east[:-1, :] = free[:-1, :] & free[1:, :]
+        west[1:, :] = free[1:, :] & free[:-1, :]
+        north[:, :-1] = free[:, :-1] & free[:, 1:]
+        south[:, 1:] = free[:, 1:] & free[:, :-1]
+        numberActions = east.astype(int) + west + north + south
+
+        # The ghost goes east with probability p when it can, and
+        # otherwise moves uniformly at random.
+        uniform = np.zeros((width, height))
+        np.divide(1.0, numberActions, out=uniform, where=numberActions > 0)
+        uniform[east] *= 1 - self.p
+
+        transitionModel = np.zeros((5, width, height))
+        transitionModel[:4] = np.array([east, west, north, south]) * uniform
+        transitionModel[0][east] += self.p
+
+        # If we are on a wall, or blocked surrounded by walls (like pacman in
+        # this case), we stay in the same place.
+        transitionModel[4] = numberActions == 0
+
+        return transitionModel
+
+    def predict(self, beliefStates):
         """
-        This method creates the transition matrix of the maze.
+        This function projects the belief states forward, through the
+        transition model: the probability of each position flows to the
+        positions next to it, by adding shifted slices of the grids.
 
         Arguments:
         ----------
-        - width: The width of the maze.
-        - height: The height of the maze.
+        - beliefStates: The (Z, width, height) belief states of the ghosts
+          for the previous time.
 
         Return:
         -------
-        - The transition matrix of the maze.
+        - The predicted belief states of the ghosts for the current time.
         """
 
-        self.transitionMatrix = np.zeros((width * height, width * height))
-
-        i = 0
-        while i < (width * height):
-            xPositionInitial = int(i / height)
-            yPositionInitial = int(i % height)
-
-            # In a transition matrix, the sum of the rows must be equal to 1.
-            # If we are on a wall, we stay in the same place.
-            if self.walls[xPositionInitial][yPositionInitial]:
-
-                position = xPositionInitial * height + yPositionInitial
-                self.transitionMatrix[i, position] = 1.0
-
-                i += 1
-                continue
-
-            legalActions = self._getLegalActions(
-                width, height, xPositionInitial, yPositionInitial)
-
-            # If we are blocked surrounded by walls (like pacman in this
-            # case), we cannot move.
-            if legalActions == []:
-                position = xPositionInitial * height + yPositionInitial
-                self.transitionMatrix[i, position] = 1.0
-
-            if "East" in legalActions:
-                position = (xPositionInitial + 1) * height + yPositionInitial
-                self.transitionMatrix[i, position] = self.p + \
-                    (1 - self.p) * (1.0 / len(legalActions))
-
-                if "West" in legalActions:
-                    position = (xPositionInitial - 1) * \
-                        height + yPositionInitial
-                    self.transitionMatrix[i, position] = (
-                        1 - self.p) * (1.0 / len(legalActions))
-
-                if "North" in legalActions:
-                    position = xPositionInitial * \
-                        height + (yPositionInitial + 1)
-                    self.transitionMatrix[i, position] = (
-                        1 - self.p) * (1.0 / len(legalActions))
-
-                if "South" in legalActions:
-                    position = xPositionInitial * \
-                        height + (yPositionInitial - 1)
-                    self.transitionMatrix[i, position] = (
-                        1 - self.p) * (1.0 / len(legalActions))
-
-            else:
-
-                if "West" in legalActions:
-                    position = (xPositionInitial - 1) * \
-                        height + yPositionInitial
-                    self.transitionMatrix[i,
-                                          position] = 1.0 / len(legalActions)
-
-                if "North" in legalActions:
-                    position = xPositionInitial * \
-                        height + (yPositionInitial + 1)
-                    self.transitionMatrix[i,
-                                          position] = 1.0 / len(legalActions)
-
-                if "South" in legalActions:
-                    position = xPositionInitial * \
-                        height + (yPositionInitial - 1)
-                    self.transitionMatrix[i,
-                                          position] = 1.0 / len(legalActions)
-
-            i += 1
-
-        return self.transitionMatrix
-
-    def create_observation_matrix(
-            self,
-            width,
-            height,
-            xPositionGhost,
-            yPositionGhost):
+        east, west, north, south, stay = self.transitionModel
+
+        predictedStates = stay * beliefStates
+        predictedStates[:, 1:, :] += east[:-1, :] * beliefStates[:, :-1, :]
+        predictedStates[:, :-1, :] += west[1:, :] * beliefStates[:, 1:, :]
+        predictedStates[:, :, 1:] += north[:, :-1] * beliefStates[:, :, :-1]
+        predictedStates[:, :, :-1] += south[:, 1:] * beliefStates[:, :, 1:]
+
+        return predictedStates
+
+    def update(self, evidences, predictedStates):
         """
-        This function creates the observation matrix centered in
-        (xPositionGhost, yPositionGhost) for the sensor model.
+        This function updates the predicted belief states with the evidences
+        of the sensor model, which follows a uniform discrete distribution
+        over the box of size (2w + 1) centered in the noised position of
+        each ghost: the probabilities outside of the box drop to 0.
 
         Arguments:
         ----------
-        - width: The width of the maze.
-        - height: The height of the maze.
-        - xPositionGhost: The abcissa of the noised position of the ghost.
-        - yPositionGhost: The ordinate of the noised position of the ghost.
+        - evidences: The (Z, 2) noised positions of the ghosts.
+        - predictedStates: The (Z, width, height) predicted belief states of
+          the ghosts for the current time.
 
         Return:
         -------
-        - The observation matrix for the sensor model.
+        - The belief states of the ghosts for the current time, each
+          normalized to 1.
         """
 
-        w = self.w
-        w2 = 2 * w + 1
-        div = w2 * w2
-        matrixValues = np.zeros((width, height))
-
-        # used for normalizing to 1.
-        totalSum = 0.0
-
-        # The sensor model follows a uniform discrete distribution.
-        for i in range(xPositionGhost - w, xPositionGhost + w + 1):
-            for j in range(yPositionGhost - w, yPositionGhost + w + 1):
-                if (i >= 0) and (i < width) and (j >= 0) and (j < height):
-                    matrixValues[i, j] = 1.0 / div
-                    totalSum += matrixValues[i, j]
-
-        # The values are normalized to 1.
-        for i in range(xPositionGhost - w, xPositionGhost + w + 1):
-            for j in range(yPositionGhost - w, yPositionGhost + w + 1):
-                if (i >= 0) and (i < width) and (j >= 0) and (j < height):
-                    matrixValues[i, j] /= totalSum
-
-        vectorValues = matrixValues.flatten()
-        observationMatrix = np.diag(vectorValues)
-
-        return observationMatrix
-
-    def compute_probabilities(
-            self,
-            width,
-            height,
-            xPositionGhost,
-            yPositionGhost,
-            beliefStates):
+        _, width, height = predictedStates.shape
+
+        # The positions within w of the evidence of each ghost, along each
+        # axis.
+        xInBox = np.abs(np.arange(width) - evidences[:, 0:1]) <= self.w
+        yInBox = np.abs(np.arange(height) - evidences[:, 1:2]) <= self.w
+
+        newBeliefStates = predictedStates * (
+            xInBox[:, :, np.newaxis] & yInBox[:, np.newaxis, :])
+
+        # Each belief state is normalized to 1.
+        sumElements = np.sum(newBeliefStates, axis=(1, 2), keepdims=True)
+        np.divide(newBeliefStates, sumElements, out=newBeliefStates,
+                  where=sumElements != 0.0)
+
+        return newBeliefStates
+
+    def compute_probabilities(self, evidences, beliefStates):
         """
         This function computes the belief states given the belief states of the previous time.
 
         Arguments:
         ----------
-        - width: The width of the maze.
-        - height: The height of the maze.
-        - xPositionGhost: The noised abscissa position of the ghost.
-        - yPositionGhost: The noised ordinate position of the ghost.
-        - beliefStates: The belief states for the previous time.
+        - evidences: The (Z, 2) noised positions of the ghosts.
+        - beliefStates: The (Z, width, height) belief states of the ghosts
+          for the previous time.
 
         Return:
         -------
-        - The belief states of the current time.
+        - The belief states of the ghosts for the current time.
         """
 
-        # The transition matrix is the same for all steps and is thus computed
+        # The transition model is the same for all steps and is thus computed
         # only once.
-        if self.transitionMatrix == []:
-            self.transitionMatrix = self.create_transition_matrix(
-                width, height)
+        if self.transitionModel is None:
+            self.transitionModel = self.create_transition_model(
+                beliefStates.shape[1], beliefStates.shape[2])
+
+        predictedStates = self.predict(beliefStates)
+
+        return self.update(evidences, predictedStates)
+
+    def initialize_particles(self, numberGhosts, width, height):
+        """
+        This function spreads the particles of each ghost uniformly over the
+        free positions of the maze, and creates the cumulative move
+        probabilities from which their transitions are sampled.
 
-        observationMatrix = self.create_observation_matrix(
-            width, height, xPositionGhost, yPositionGhost)
+        Arguments:
+        ----------
+        - numberGhosts: The number of ghosts.
+        - width: The width of the maze.
+        - height: The height of the maze.
+        """
+
+        self.transitionModel = self.create_transition_model(width, height)
+
+        # The cumulative probabilities of the moves east, west, north, south
+        # and of staying in the same place, for each position of the
+        # flattened maze, and the offsets of these moves in it.
+        self.cumulativeMoves = np.cumsum(
+            self.transitionModel.reshape(5, -1).T, axis=1)
+        self.cumulativeMoves[:, -1] = 1.0
+        self.moveOffsets = np.array([height, -height, 1, -1, 0])
+
+        self.freePositions = np.flatnonzero(
+            np.logical_not(np.array(self.walls.data, dtype=bool)))
+        self.particles = self.rng.choice(
+            self.freePositions, (numberGhosts, self.numberParticles))
 
-        beliefStates = np.array(beliefStates)
-        beliefStatesVector = beliefStates.flatten()
-        beliefStatesVector = beliefStatesVector.reshape(-1, 1)
+    def update_particles(self, evidences):
+        """
+        This function moves the particles of the ghosts one step forward,
+        following the transition model, weights them by the sensor model and
+        resamples them.
+
+        Arguments:
+        ----------
+        - evidences: The (Z, 2) noised positions of the ghosts.
+        """
 
-        resultVector = np.dot(
-            observationMatrix,
-            np.dot(
-                self.transitionMatrix.T,
-                beliefStatesVector))
+        height = self.walls.height
 
-        resultVector = resultVector.reshape(-1)
+        # Each particle draws its move from the cumulative move
+        # probabilities of its position.
+        draws = self.rng.random(self.particles.shape)
+        moves = np.sum(
+            draws[:, :, np.newaxis] >= self.cumulativeMoves[self.particles],
+            axis=2)
+        self.particles += self.moveOffsets[moves]
 
-        sumElements = np.sum(resultVector)
+        # The sensor model follows a uniform discrete distribution over the
+        # box of size (2w + 1) centered in the noised position of the ghost.
+        xDistances = np.abs(self.particles // height - evidences[:, 0:1])
+        yDistances = np.abs(self.particles % height - evidences[:, 1:2])
+        weights = (xDistances <= self.w) & (yDistances <= self.w)
 
-        i = 0
+        self.resample(weights, evidences)
 
-        # The vector corresponding to the belief states is normalized to 1.
-        while i < len(resultVector) and sumElements != 0.0:
-            resultVector[i] /= sumElements
-            i += 1
+    def resample(self, weights, evidences):
+        """
+        This function resamples the particles of the ghosts in proportion to
+        their weights, by low-variance (systematic) resampling: a single
+        random offset per ghost picks the particles at evenly spaced points
+        of the cumulative weights.
 
-        newBeliefStates = resultVector.reshape(width, height)
+        When no particle of a ghost is consistent with its evidence, its
+        particles are spread uniformly over the free positions of the box of
+        the sensor model instead.
 
-        return newBeliefStates
+        Arguments:
+        ----------
+        - weights: The (Z, numberParticles) weights of the particles.
+        - evidences: The (Z, 2) noised positions of the ghosts.
+        """
+
+        numberGhosts, numberParticles = self.particles.shape
+        rows = np.arange(numberGhosts)[:, np.newaxis]
+
+        cumulativeWeights = np.cumsum(weights, axis=1, dtype=float)
+        totalWeights = cumulativeWeights[:, -1:]
+        depleted = totalWeights[:, 0] == 0.0
+        totalWeights[depleted] = 1.0
+
+        # The cumulative weights of the ghosts are laid end to end, each
+        # between its index and its index plus 1, so that the particles of
+        # all the ghosts are picked by a single sorted search.
+        pointers = (self.rng.random((numberGhosts, 1)) +
+                    np.arange(numberParticles)) / numberParticles
+        picked = np.searchsorted(
+            (cumulativeWeights / totalWeights + rows).ravel(),
+            (pointers + rows).ravel(), side='right')
+        self.particles = self.particles.ravel()[
+            np.minimum(picked, self.particles.size - 1)].reshape(
+                numberGhosts, numberParticles)
+
+        for ghost in np.flatnonzero(depleted):
+            self.particles[ghost] = self.rng.choice(
+                self.box_positions(evidences[ghost]), numberParticles)
+
+    def box_positions(self, evidence):
+        """
+        Returns the free positions of the flattened maze within the box of
+        the sensor model centered in the given noised position, or all the
+        free positions if there are none.
+        """
+
+        height = self.walls.height
+        xDistances = np.abs(self.freePositions // height - evidence[0])
+        yDistances = np.abs(self.freePositions % height - evidence[1])
+        positions = self.freePositions[
+            (xDistances <= self.w) & (yDistances <= self.w)]
+
+        if len(positions) == 0:
+            return self.freePositions
+        return positions
+
+    def bin_particles(self):
+        """
+        This function bins the particles of the ghosts into their belief
+        states over the positions of the maze.
+
+        Return:
+        -------
+        - The (Z, width, height) belief states of the ghosts.
+        """
+
+        numberGhosts, numberParticles = self.particles.shape
+        width, height = self.walls.width, self.walls.height
+
+        counts = np.bincount(
+            (self.particles + np.arange(numberGhosts)[:, np.newaxis] *
+             width * height).ravel(),
+            minlength=numberGhosts * width * height)
+
+        return counts.reshape(numberGhosts, width, height) / numberParticles
 
     def _computeNoisyPositions(self, state):
         """
@@ -2,6 +2,31 @@ from pacman_module.game import Agent
 from pacman_module.pacman import Directions, GhostRules
 import numpy as np
 from pacman_module import util
+from collections import OrderedDict
+
+#The transition kernels, keyed by (layout, p), and the sensor matrices, keyed
+#by (width, height, w, evidence), of the least recently used parameters
+KERNEL_CACHE_SIZE = 8
+SENSOR_CACHE_SIZE = 256
+TRANSITION_KERNELS = OrderedDict()
+SENSOR_MATRICES = OrderedDict()
+
+
+def getCached(cache, size, key, compute):
+    """
+    Returns the value of the key in a least recently used cache of the given
+    size, calling compute to create it if it is not in the cache
+    """
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+
+    value = compute()
+    value.setflags(write=False)
+    cache[key] = value
+    if len(cache) > size:
+        cache.popitem(last=False)
+    return value
 
 
 class BeliefStateAgent(Agent):
@@ -27,22 +52,35 @@ class BeliefStateAgent(Agent):
         # when 'EAST' is legal (see instructions)
         self.p = self.args.p
         self.i = 0
+        # Key of the layout in the kernel cache (assigned with the walls)
+        self.layoutKey = None
         
         
     def transitions(self, beliefStates, evidences):
         
+        if self.layoutKey is None:
+            self.layoutKey = str(self.walls)
+
         for i in range(0, len(evidences)):
             (width, height) = (beliefStates[i].shape[0], beliefStates[i].shape[1])
                 
             #Predict step:
             #Element-wise multiplication of the current belief state and the transition matrix
             #Project the current belief state forward, from t to t+1, through the transition model
-            beliefStates[i] = np.multiply(beliefStates[i], self.transitionMatrix(height, width))
+            #The kernel only depends on the layout and p, and is computed once
+            transMatrix = getCached(
+                TRANSITION_KERNELS, KERNEL_CACHE_SIZE, (self.layoutKey, self.p),
+                lambda: self.transitionMatrix(height, width))
+            beliefStates[i] = np.multiply(beliefStates[i], transMatrix)
             
             #Update step:
             #Element-wise multiplication of the predicted belief state and the sensor matrix
             #Update this new belief state using the fresh evidence
-            beliefStates[i] = np.multiply(beliefStates[i], self.sensorMatrix(height, width, evidences[i]))
+            ghostPos = tuple(evidences[i])
+            sensorMatrix = getCached(
+                SENSOR_MATRICES, SENSOR_CACHE_SIZE, (width, height, self.w, ghostPos),
+                lambda: self.sensorMatrix(height, width, ghostPos))
+            beliefStates[i] = np.multiply(beliefStates[i], sensorMatrix)
 
             #Normalize the matrix
             beliefStates[i] = self.normalize(beliefStates[i])
@@ -52,11 +90,7 @@ class BeliefStateAgent(Agent):
         """
         Normalizes a matrix
         """
-        sumOfElements = 0
-        for i in range(0, matrix.shape[0]):    
-            sumOfElements += sum(matrix[i])
-        
-        normalizedMatrix = matrix/sumOfElements
+        normalizedMatrix = matrix/np.sum(matrix)
         return normalizedMatrix
         
 
@@ -69,11 +103,11 @@ class BeliefStateAgent(Agent):
         sensorMatrix = np.ones((width, height))
         sensorMatrix *= 0.005
         (x, y) = ghostPos
-        for i in range(x - self.w, x + self.w + 1):
-            if(i >= 0 and i < width):
-                for j in range(y - self.w, y + self.w + 1):
-                    if(j >= 0 and j < height):
-                        sensorMatrix[i][j] = (1.0/div)
+        #The box of the positions within w of the evidence, clipped to the maze
+        xMin = max(x - self.w, 0)
+        yMin = max(y - self.w, 0)
+        sensorMatrix[xMin:max(x + self.w + 1, xMin),
+                     yMin:max(y + self.w + 1, yMin)] = (1.0/div)
         
         return sensorMatrix
             
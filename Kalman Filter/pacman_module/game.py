@@ -90,6 +90,7 @@ class Configuration:
     The convention for positions, like a graph, is that (0,0) is the lower left corner, x increases
     horizontally and y increases vertically.  Therefore, north is the direction of increasing y, or (0,1).
     """
+    __slots__ = ('pos', 'direction', 'visible')
 
     def __init__(self, pos, direction, visible=True):
         self.pos = pos
@@ -142,6 +143,8 @@ class AgentState:
     """
     AgentStates hold the state of an agent (configuration, speed, scared, etc).
     """
+    __slots__ = ('start', 'configuration', 'agtType', 'isPacman', 'scaredTimer',
+                 'numCarrying', 'numReturned')
 
     def __init__(self, startConfiguration, agtType):
         self.start = startConfiguration
@@ -318,6 +321,154 @@ class Grid:
         return bools
 
 
+class BitGrid(Grid):
+    """
+    A drop-in replacement for a boolean Grid backed by a single Python int.
+
+    Cell (x,y) is stored in bit x * height + y, so that equality is a single
+    integer comparison and the hash is computed once and cached.  Since ints
+    are immutable, copy() and shallowCopy() only create a new wrapper around
+    the same bits: a grid is effectively copied when one of its cells is
+    written, which makes copying the food grid on each eaten dot O(1).
+
+    Data is still accessed via grid[x][y].
+    """
+
+    def __init__(
+            self,
+            width,
+            height,
+            initialValue=False,
+            bitRepresentation=None):
+        if initialValue not in [False, True]:
+            raise Exception('Grids can only contain booleans')
+        self.CELLS_PER_INT = 30
+
+        self.width = width
+        self.height = height
+        if initialValue:
+            self.bits = (1 << (width * height)) - 1
+        else:
+            self.bits = 0
+        self._hash = None
+        if bitRepresentation:
+            self._unpackBits(bitRepresentation)
+
+    @property
+    def data(self):
+        return [[self.isSet(x, y) for y in range(self.height)]
+                for x in range(self.width)]
+
+    def isSet(self, x, y):
+        return (self.bits >> (x * self.height + y)) & 1 == 1
+
+    def set(self, x, y, value):
+        mask = 1 << (x * self.height + y)
+        if value:
+            self.bits |= mask
+        else:
+            self.bits &= ~mask
+        self._hash = None
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.width
+        if i < 0 or i >= self.width:
+            raise IndexError('grid index out of range')
+        return _BitGridColumn(self, i)
+
+    def __setitem__(self, key, item):
+        for y, value in enumerate(item):
+            self.set(key, y, value)
+
+    def __iter__(self):
+        for x in range(self.width):
+            yield _BitGridColumn(self, x)
+
+    def __eq__(self, other):
+        if other is None:
+            return False
+        if isinstance(other, BitGrid):
+            return (self.bits == other.bits and
+                    self.height == other.height and
+                    self.width == other.width)
+        return self.data == other.data
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(self.bits)
+        return self._hash
+
+    def copy(self):
+        g = BitGrid(self.width, self.height)
+        g.bits = self.bits
+        g._hash = self._hash
+        return g
+
+    def deepCopy(self):
+        return self.copy()
+
+    def shallowCopy(self):
+        # Like a shallow copy of a Grid, which shares its data with the
+        # original, without allocating a new grid for every state.
+        return self
+
+    def count(self, item=True):
+        ones = bin(self.bits).count('1')
+        if item:
+            return ones
+        return self.width * self.height - ones
+
+    def asList(self, key=True):
+        bits = self.bits
+        if not key:
+            bits ^= (1 << (self.width * self.height)) - 1
+
+        # The set bits are read from the lowest one, i.e. in the order of x
+        # then y, without visiting the other cells.
+        list = []
+        height = self.height
+        while bits:
+            lowest = bits & -bits
+            list.append(divmod(lowest.bit_length() - 1, height))
+            bits ^= lowest
+        return list
+
+
+class _BitGridColumn:
+    """
+    A view over the column x of a BitGrid, so that grid[x][y] keeps working.
+    """
+    __slots__ = ('grid', 'x')
+
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.x = x
+
+    def __getitem__(self, y):
+        height = self.grid.height
+        if y < 0:
+            y += height
+        if y < 0 or y >= height:
+            raise IndexError('grid index out of range')
+        return (self.grid.bits >> (self.x * height + y)) & 1 == 1
+
+    def __setitem__(self, y, value):
+        height = self.grid.height
+        if y < 0:
+            y += height
+        if y < 0 or y >= height:
+            raise IndexError('grid index out of range')
+        self.grid.set(self.x, y, value)
+
+    def __len__(self):
+        return self.grid.height
+
+    def __iter__(self):
+        for y in range(self.grid.height):
+            yield self[y]
+
+
 def reconstituteGrid(bitRep):
     if not isinstance(bitRep, type((1, 2))):
         return bitRep
@@ -420,8 +571,14 @@ class Actions:
 
 class GameStateData:
     """
-
+    The data of a game state.  Since every node of a search tree holds one,
+    GameStateData, AgentState and Configuration use __slots__ to keep them
+    small.
     """
+    __slots__ = ('food', 'capsules', 'agentStates', 'layout', '_eaten',
+                 'score', 'beliefStates', '_foodEaten', '_foodAdded',
+                 '_capsuleEaten', '_agentMoved', '_lose', '_win',
+                 'scoreChange')
 
     def __init__(self, prevState=None):
         """
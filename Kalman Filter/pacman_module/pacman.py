@@ -43,6 +43,7 @@ from .game import GameStateData
 from .game import Game
 from .game import Directions
 from .game import Actions
+from .game import Configuration
 from .util import nearestPoint
 from .util import manhattanDistance
 from . import textDisplay, graphicsDisplay
@@ -73,6 +74,7 @@ class GameState:
 
     Note that in classic Pacman, Pacman is always agent 0.
     """
+    __slots__ = ('data',)
 
     ####################################################
     # Accessor methods: use these to access state data #
@@ -139,7 +141,7 @@ class GameState:
 
         # Let agent's logic deal with its action's effects on the board
         if agentIndex == 0:  # Pacman is moving
-            state.data._eaten = [False for i in range(state.getNumAgents())]
+            state.data._eaten = [False] * state.getNumAgents()
             PacmanRules.applyAction(state, action)
         elif state.data.agentStates[agentIndex].agtType > 0:                # A ghost is moving
             GhostRules.applyAction(state, action, agentIndex)
@@ -418,16 +420,24 @@ class PacmanRules:
         """
         Returns a list of possible actions.
         """
-        return Actions.getPossibleActions(
-            state.getPacmanState().configuration,
-            state.data.layout.walls)
+        configuration = state.data.agentStates[0].configuration
+        legal = state.data.layout.legalActions.get(configuration.pos)
+        if legal is None:
+            return Actions.getPossibleActions(
+                configuration, state.data.layout.walls)
+        return list(legal)
     getLegalActions = staticmethod(getLegalActions)
 
     def applyAction(state, action):
         """
         Edits the state to reflect the results of the action.
         """
-        legal = PacmanRules.getLegalActions(state)
+        # The move table of the layout is read directly, without the copy
+        # made by getLegalActions.
+        legal = state.data.layout.legalActions.get(
+            state.data.agentStates[0].configuration.pos)
+        if legal is None:
+            legal = PacmanRules.getLegalActions(state)
         if action not in legal:
             raise Exception("Illegal action " + str(action))
 
@@ -481,15 +491,8 @@ class GhostRules:
         reach a dead end, but can turn 90 degrees at intersections.
         """
         conf = state.getGhostState(ghostIndex).configuration
-        possibleActions = Actions.getPossibleActions(
-            conf, state.data.layout.walls)
-        reverse = Actions.reverseDirection(conf.direction)
-        if Directions.STOP in possibleActions:
-            possibleActions.remove(Directions.STOP)
-        if "beliefStates" not in dir(state.data) and reverse in possibleActions and len(possibleActions) > 1:
-            possibleActions.remove(reverse)
-        
-        return possibleActions
+        return GhostRules.getLegalActionsAtPositionAndDirection(
+            state, ghostIndex, conf.pos, conf.direction)
     getLegalActions = staticmethod(getLegalActions)
 
     def getLegalActionsAtPositionAndDirection(state, ghostIndex, position, direction):
@@ -497,23 +500,41 @@ class GhostRules:
         Ghosts cannot stop, and cannot turn around unless they
         reach a dead end, but can turn 90 degrees at intersections.
         """
-        conf = deepcopy(state.getGhostState(ghostIndex).configuration)
-        conf.pos = position
-        conf.direction = direction
+        # Ghosts tracked by a belief state agent may turn around
+        turnAround = hasattr(state.data, "beliefStates")
+        legal = state.data.layout.ghostLegalActions.get(position)
+        if legal is not None:
+            if turnAround:
+                # Turning around is only forbidden when travelling
+                return list(legal[Directions.STOP])
+            return list(legal[direction])
+
+        # In between grid points, the ghost must continue straight
+        conf = Configuration(position, direction)
         possibleActions = Actions.getPossibleActions(
             conf, state.data.layout.walls)
         reverse = Actions.reverseDirection(conf.direction)
         if Directions.STOP in possibleActions:
             possibleActions.remove(Directions.STOP)
-        if "beliefStates" not in dir(state.data) and reverse in possibleActions and len(possibleActions) > 1:
+        if not turnAround and reverse in possibleActions and len(possibleActions) > 1:
             possibleActions.remove(reverse)
-        
+
         return possibleActions
     getLegalActionsAtPositionAndDirection = staticmethod(getLegalActionsAtPositionAndDirection)
 
     def applyAction(state, action, ghostIndex):
 
-        legal = GhostRules.getLegalActions(state, ghostIndex)
+        # The move table of the layout is read directly, without the copy
+        # made by getLegalActions.
+        conf = state.data.agentStates[ghostIndex].configuration
+        legal = state.data.layout.ghostLegalActions.get(conf.pos)
+        if legal is None:
+            legal = GhostRules.getLegalActions(state, ghostIndex)
+        elif hasattr(state.data, "beliefStates"):
+            # Ghosts tracked by a belief state agent may turn around
+            legal = legal[Directions.STOP]
+        else:
+            legal = legal[conf.direction]
         if action not in legal:
             raise Exception("Illegal ghost action " + str(action))
 
@@ -121,6 +121,11 @@ if __name__ == '__main__':
         '--p',
         help='Parameter p as specified in instructions for Project Part 3.',
         type=float, default=0.5)
+    parser.add_argument(
+        '--particles',
+        help='Number of particles tracking each ghost, the belief states '
+             'being computed exactly if 0.',
+        type=positive_integer, default=0)
 
     args = parser.parse_args()
 
@@ -1,6 +1,13 @@
 from pacman_module.game import Agent
 from pacman_module.pacman import Directions
 from pacman_module.util import Stack
+from pacman_module.ghostReduction import getReducedActions
+from pacman_module.ghostReduction import isSearchedGhost
+from pacman_module.moveOrdering import MoveOrdering
+from pacman_module.parallelSearch import RootSplitSearch
+from pacman_module.tablebase import Tablebase
+from pacman_module.transpositionTable import TranspositionTable
+from pacman_module.transpositionTable import getTranspositionKey
 
 import math
 
@@ -18,6 +25,42 @@ class PacmanAgent(Agent):
         # passed in the path from the actual state to the expanded state.
         self.statesAlreadyPassedFromRoot = None
 
+        # The number of successors skipped since they were already in the
+        # path from the actual state. The value of a node whose search skips
+        # any depends on the path to it, and is not kept in the
+        # transposition table.
+        self.repetitionsSkipped = 0
+
+        # With the `--ttsize` option, the results of the searches of the
+        # states are kept in a transposition table throughout the game, so
+        # that states reached again through other paths are not searched
+        # again.
+        self.transpositionTable = None
+        if self.args.ttsize > 0:
+            self.transpositionTable = TranspositionTable(self.args.ttsize)
+
+        # With the `--ordering` option, the moves of each node are sorted by
+        # the best move stored in the transposition table, the killer moves
+        # of the depth and the history scores (see `MoveOrdering`). The
+        # cutoffs are counted in any case.
+        self.moveOrdering = MoveOrdering()
+
+        # The number of calls to the get_action method.
+        self.numberMoves = 0
+
+        # With the `--tablebase` option, the states of the endgame tablebase
+        # are not searched, their exact minimax value being read from it (see
+        # `Tablebase`).
+        self.tablebase = None
+        if self.args.tablebase:
+            self.tablebase = Tablebase(self.args.tablebase)
+
+        # With the `--workers` option, the moves of Pacman at the root are
+        # searched in parallel by a pool of processes (see `RootSplitSearch`).
+        self.rootSplitSearch = None
+        if self.args.workers > 1:
+            self.rootSplitSearch = RootSplitSearch(self, self.args.workers)
+
     def get_action(self, state):
         """
         Given a pacman game state, returns a legal move.
@@ -33,12 +76,214 @@ class PacmanAgent(Agent):
         """
 
         self.statesAlreadyPassedFromRoot = set()
-        maxScore, maxMove = self.minimax_player_max(
-            state, -(math.inf), math.inf)
+        if self.transpositionTable is not None:
+            self.transpositionTable.newSearch()
+        self.moveOrdering.newSearch()
+        if self.rootSplitSearch is not None:
+            maxScore, maxMove = self.parallel_search(state)
+        else:
+            maxScore, maxMove = self.minimax_player_max(
+                state, -(math.inf), math.inf, 0)
+
+        self.numberMoves += 1
 
         return maxMove
 
-    def minimax_player_max(self, currentState, maxValue, minValue):
+    def shutdown(self):
+        """
+        This method stops the worker processes of the parallel search, if
+        any. It is called once the game is over.
+        """
+
+        if self.rootSplitSearch is not None:
+            self.rootSplitSearch.shutdown()
+
+    def parallel_search(self, state):
+        """
+        This method runs the minimax search from the given state, with the
+        subtrees of the moves of Pacman searched in parallel. Without a
+        transposition table, the best move found is the one of a sequential
+        search (see `RootSplitSearch`).
+
+        Arguments:
+        ----------
+        - 'state': The state to search from.
+
+        Return:
+        -------
+        - 'maxScore': The maximum score found.
+
+        - 'maxMove': The move corresponding to the maximum score found.
+        """
+
+        actions = self.order_actions(state, 0, state.getPacmanPosition(), 0)
+        successors = state.generatePacmanSuccessors()
+        if actions is not None:
+            successors.sort(key=lambda successor: actions.index(successor[1]))
+
+        results = self.rootSplitSearch.search(state, successors)
+
+        maxScore = -math.inf
+        maxMove = Directions.STOP
+        for successor, result in zip(successors, results):
+            resultScore = result[0]
+            if resultScore != math.inf and resultScore > maxScore:
+                maxScore = resultScore
+                maxMove = successor[1]
+
+        return maxScore, maxMove
+
+    def search_root_move(self, state, nextState, nextMove, maxValue):
+        """
+        This method searches the subtree of a move of Pacman from the root
+        state, as `minimax_player_max` does at depth 0.
+
+        Arguments:
+        ----------
+        - 'state': The root state.
+
+        - 'nextState': The state reached by the move.
+
+        - 'nextMove': The move.
+
+        - 'maxValue': The maximum minimax value of the moves preceding this
+                      one.
+
+        Return:
+        -------
+        - The minimax value of the move, as a 1-tuple.
+        """
+
+        self.statesAlreadyPassedFromRoot = {(
+            state.getPacmanPosition(),
+            tuple(state.getGhostPositions()),
+            state.getFood(),
+            0)}
+        resultScore, resultMove = self.minimax_player_min(
+            nextState, maxValue, math.inf, 1)
+        return (resultScore,)
+
+    def get_search_context(self):
+        """
+        This method returns the state of the agent a worker process of the
+        parallel search needs: the number of moves.
+
+        Return:
+        -------
+        - The search context.
+        """
+
+        return self.numberMoves
+
+    def set_search_context(self, context):
+        """
+        This method sets the state of the agent of a worker process of the
+        parallel search, as returned by `get_search_context`.
+
+        Arguments:
+        ----------
+        - 'context': The search context.
+        """
+
+        # A new move is being searched.
+        if context != self.numberMoves:
+            self.numberMoves = context
+            if self.transpositionTable is not None:
+                self.transpositionTable.newSearch()
+            self.moveOrdering.newSearch()
+
+    def order_actions(self, state, agentIndex, position, currentDepth):
+        """
+        Returns the legal actions of the given agent in the order in which
+        they must be searched, or None if the default order is used.
+
+        Arguments:
+        ----------
+        - 'state': The state to expand.
+
+        - 'agentIndex': The index of the agent to move.
+
+        - 'position': The position of the agent to move.
+
+        - 'currentDepth': The depth of the recursion.
+
+        Return:
+        -------
+        - The list of sorted actions, or None.
+        """
+
+        if not self.args.ordering:
+            return None
+
+        firstMoves = []
+        if self.transpositionTable is not None:
+            tableMove = self.transpositionTable.getMove(
+                getTranspositionKey(state, agentIndex))
+            if tableMove is not None:
+                firstMoves.append(tableMove)
+        return self.moveOrdering.orderActions(
+            state, agentIndex, position, currentDepth,
+            state.getLegalActions(agentIndex), firstMoves)
+
+    def successors(self, state, agentIndex, position, currentDepth):
+        """
+        Returns a generator over the pairs of successor states and moves of
+        the given state for the given agent.
+
+        With the `--inplace` option, the successors are the state itself,
+        moved and restored in place (see `GameState.inPlaceSuccessors`), so
+        that no state is allocated during the search. With the `--lazy`
+        option, each successor state is only generated when it is pulled
+        (see `GameState.iterPacmanSuccessors`), so that the ones following a
+        cutoff are never generated.
+
+        With the `--searchedghosts` option, only the moves of the given number
+        of ghosts closest to Pacman are all searched, the other ghosts only
+        making their move bringing them closest to Pacman (see
+        `isSearchedGhost`).
+
+        Arguments:
+        ----------
+        - 'state': The state to expand.
+
+        - 'agentIndex': The index of the agent to move.
+
+        - 'position': The position of the agent to move.
+
+        - 'currentDepth': The depth of the recursion.
+
+        Return:
+        -------
+        - A generator of (successor, move) pairs.
+        """
+
+        actions = self.order_actions(state, agentIndex, position, currentDepth)
+        if agentIndex > 0 and not isSearchedGhost(
+                state, agentIndex, self.args.searchedghosts):
+            actions = getReducedActions(state, agentIndex)
+
+        if self.args.inplace:
+            return state.inPlaceSuccessors(agentIndex, actions)
+
+        if self.args.lazy:
+            if agentIndex == 0:
+                return state.iterPacmanSuccessors(actions)
+            return state.iterGhostSuccessors(agentIndex, actions)
+
+        if agentIndex == 0:
+            successors = state.generatePacmanSuccessors()
+        else:
+            successors = state.generateGhostSuccessors(agentIndex)
+
+        if actions is not None:
+            successors = [successor for successor in successors
+                          if successor[1] in actions]
+            successors.sort(key=lambda successor: actions.index(successor[1]))
+
+        return (s for s in successors)
+
+    def minimax_player_max(
+            self, currentState, maxValue, minValue, currentDepth):
         """
         This function computes the minimax value when the next move is done by
         Pacman (max player). The alpha-beta pruning is used.
@@ -53,6 +298,7 @@ class PacmanAgent(Agent):
         - 'minValue': The minimum minimax value computed by the min player at
                       the previous states of the expansion.
 
+        - 'currentDepth' : The depth of the recursion.
 
         Return:
         -------
@@ -64,37 +310,62 @@ class PacmanAgent(Agent):
         if currentState.isWin() or currentState.isLose():
             return currentState.getScore(), Directions.STOP
 
+        # The value of a state of the tablebase is known, except at the root,
+        # whose move must be searched.
+        if self.tablebase is not None and currentDepth > 0:
+            value = self.tablebase.probe(currentState, 0)
+            if value is not None:
+                return value, Directions.STOP
+
+        # If the state has already been searched through another path, the
+        # result may be known.
+        if self.transpositionTable is not None:
+            transpositionKey = getTranspositionKey(currentState, 0)
+            currentScore = currentState.getScore()
+            result = self.transpositionTable.probe(
+                transpositionKey, 0, maxValue, minValue, currentScore)
+            if result is not None:
+                return result
+            searchWindow = (maxValue, minValue)
+            repetitionsSkipped = self.repetitionsSkipped
+
         # The two following instructions are used to not cycle indefinitely,
         # since the minimum score is unbounded.
         currentStateInfo = (
             currentState.getPacmanPosition(),
-            currentState.getGhostPositions()[0],
+            tuple(currentState.getGhostPositions()),
             currentState.getFood(),
-            True)
+            0)
         self.statesAlreadyPassedFromRoot.add(currentStateInfo)
 
         maxScore = -math.inf
         maxMove = Directions.STOP
 
-        for successor in currentState.generatePacmanSuccessors():
+        # The position of the agent is read before moving it, since the state
+        # is modified in place with the `--inplace` option.
+        position = currentState.getPacmanPosition()
+        successors = self.successors(
+            currentState, 0, position, currentDepth)
+        for childIndex, successor in enumerate(successors):
             nextState = successor[0]
             nextMove = successor[1]
 
             nextStateInfo = (
                 nextState.getPacmanPosition(),
-                nextState.getGhostPositions()[0],
+                tuple(nextState.getGhostPositions()),
                 nextState.getFood(),
-                False)
+                1)
 
             # If the state has already been passed in the path from the actual
             # state to the current state expanded, then we do not pass again on
             # it.
             if nextStateInfo not in self.statesAlreadyPassedFromRoot:
                 resultScore, resultMove = self.minimax_player_min(
-                    nextState, maxValue, minValue)
+                    nextState, maxValue, minValue, currentDepth + 1)
 
             else:
                 resultScore = math.inf
+                self.repetitionsSkipped += 1
 
             if resultScore != math.inf and resultScore > maxScore:
                 maxScore = resultScore
@@ -104,7 +375,15 @@ class PacmanAgent(Agent):
                 # player knows a path giving a smaller minimax value, then it
                 # is useless to continue expanding the current state.
                 if maxScore >= minValue:
+                    successors.close()
+                    self.moveOrdering.recordCutoff(
+                        0, position, currentDepth, maxMove, 1, childIndex)
                     self.statesAlreadyPassedFromRoot.remove(currentStateInfo)
+                    if (self.transpositionTable is not None and
+                            self.repetitionsSkipped == repetitionsSkipped):
+                        self.transpositionTable.store(
+                            transpositionKey, 0, maxScore,
+                            *searchWindow, maxMove, currentScore)
                     return maxScore, maxMove
 
                 # The maximum value found is kept in order to inform the
@@ -116,12 +395,24 @@ class PacmanAgent(Agent):
         # paths passing through other states.
         self.statesAlreadyPassedFromRoot.remove(currentStateInfo)
 
+        # Values depending on the path to the state, since successors were
+        # skipped as repetitions in the search of the state, are not stored.
+        if (self.transpositionTable is not None and
+                self.repetitionsSkipped == repetitionsSkipped):
+            self.transpositionTable.store(
+                transpositionKey, 0, maxScore, *searchWindow,
+                maxMove, currentScore)
+
         return maxScore, maxMove
 
-    def minimax_player_min(self, currentState, maxValue, minValue):
+    def minimax_player_min(
+            self, currentState, maxValue, minValue, currentDepth,
+            agentIndex=1):
         """
         This function computes the minimax value when the next move is done by
-        the ghost (min player). The alpha-beta pruning is used.
+        a ghost (min player). The alpha-beta pruning is used. The ghosts move
+        one after the other, each one in its own min layer, before Pacman
+        moves again.
 
         Arguments:
         ----------
@@ -133,6 +424,10 @@ class PacmanAgent(Agent):
         - 'minValue': The minimum minimax value computed by the min player at
                       the previous states of the expansion.
 
+        - 'currentDepth' : The depth of the recursion.
+
+        - 'agentIndex': The index of the ghost to move.
+
         Return:
         -------
         - 'minScore': The minimum score found.
@@ -143,37 +438,69 @@ class PacmanAgent(Agent):
         if currentState.isWin() or currentState.isLose():
             return currentState.getScore(), Directions.STOP
 
+        # The value of a state of the tablebase is known.
+        if self.tablebase is not None:
+            value = self.tablebase.probe(currentState, agentIndex)
+            if value is not None:
+                return value, Directions.STOP
+
+        # If the state has already been searched through another path, the
+        # result may be known.
+        if self.transpositionTable is not None:
+            transpositionKey = getTranspositionKey(currentState, agentIndex)
+            currentScore = currentState.getScore()
+            result = self.transpositionTable.probe(
+                transpositionKey, 0, maxValue, minValue, currentScore)
+            if result is not None:
+                return result
+            searchWindow = (maxValue, minValue)
+            repetitionsSkipped = self.repetitionsSkipped
+
         # The two following instructions are used to not cycle indefinitely,
         # since the minimum score is unbounded.
         currentStateInfo = (
             currentState.getPacmanPosition(),
-            currentState.getGhostPositions()[0],
+            tuple(currentState.getGhostPositions()),
             currentState.getFood(),
-            False)
+            agentIndex)
         self.statesAlreadyPassedFromRoot.add(currentStateInfo)
 
         minScore = math.inf
         minMove = Directions.STOP
 
-        for successor in currentState.generateGhostSuccessors(1):
+        # The agent moving after this ghost, Pacman after the last one.
+        nextAgentIndex = (agentIndex + 1) % currentState.getNumAgents()
+
+        # The position of the agent is read before moving it, since the state
+        # is modified in place with the `--inplace` option.
+        position = currentState.getGhostPosition(agentIndex)
+        successors = self.successors(
+            currentState, agentIndex, position, currentDepth)
+        for childIndex, successor in enumerate(successors):
             nextState = successor[0]
             nextMove = successor[1]
 
             nextStateInfo = (
                 nextState.getPacmanPosition(),
-                nextState.getGhostPositions()[0],
+                tuple(nextState.getGhostPositions()),
                 nextState.getFood(),
-                True)
+                nextAgentIndex)
 
             # If the state has already been passed in the path from the actual
             # state to the current state expanded, then we do not pass again on
             # it.
             if nextStateInfo not in self.statesAlreadyPassedFromRoot:
-                resultScore, resultMove = self.minimax_player_max(
-                    nextState, maxValue, minValue)
+                if nextAgentIndex == 0:
+                    resultScore, resultMove = self.minimax_player_max(
+                        nextState, maxValue, minValue, currentDepth + 1)
+                else:
+                    resultScore, resultMove = self.minimax_player_min(
+                        nextState, maxValue, minValue, currentDepth + 1,
+                        nextAgentIndex)
 
             else:
                 resultScore = (-math.inf)
+                self.repetitionsSkipped += 1
 
             if resultScore != (-math.inf) and resultScore < minScore:
                 minScore = resultScore
@@ -183,7 +510,16 @@ class PacmanAgent(Agent):
                 # player knows a path giving a bigger minimax value, then it
                 # is useless to continue expanding the current state.
                 if minScore <= maxValue:
+                    successors.close()
+                    self.moveOrdering.recordCutoff(
+                        agentIndex, position, currentDepth, minMove, 1,
+                        childIndex)
                     self.statesAlreadyPassedFromRoot.remove(currentStateInfo)
+                    if (self.transpositionTable is not None and
+                            self.repetitionsSkipped == repetitionsSkipped):
+                        self.transpositionTable.store(
+                            transpositionKey, 0, minScore,
+                            *searchWindow, minMove, currentScore)
                     return minScore, minMove
 
                 # The minimum value found is kept in order to inform the
@@ -195,4 +531,12 @@ class PacmanAgent(Agent):
         # paths passing through other states.
         self.statesAlreadyPassedFromRoot.remove(currentStateInfo)
 
+        # Values depending on the path to the state, since successors were
+        # skipped as repetitions in the search of the state, are not stored.
+        if (self.transpositionTable is not None and
+                self.repetitionsSkipped == repetitionsSkipped):
+            self.transpositionTable.store(
+                transpositionKey, 0, minScore, *searchWindow,
+                minMove, currentScore)
+
         return minScore, minMove
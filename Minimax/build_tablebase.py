@@ -0,0 +1,41 @@
+import time
+from argparse import ArgumentParser
+
+from pacman_module import layout
+from pacman_module.tablebase import buildTablebase
+
+
+if __name__ == '__main__':
+    usage = """
+    USAGE:      python build_tablebase.py <options>
+    EXAMPLES:   (1) python build_tablebase.py --layout small_adv --maxdots 4
+                    - builds the tablebase of the positions of small_adv
+                      maze with up to 4 dots in small_adv.tb, to be used
+                      with `python run.py --tablebase small_adv.tb`
+    """
+
+    parser = ArgumentParser(usage)
+    parser.add_argument(
+        '--layout',
+        help='Maze layout (from layout folder).',
+        default="small_adv")
+    parser.add_argument(
+        '--maxdots',
+        help="Maximum number of dots of the positions of the tablebase.",
+        type=int, default=3)
+    parser.add_argument(
+        '--output',
+        help="Tablebase file (<layout>.tb by default).",
+        default="")
+
+    args = parser.parse_args()
+
+    output = args.output or args.layout + ".tb"
+    start = time.perf_counter()
+    positions, solved = buildTablebase(
+        layout.getLayout(args.layout), args.maxdots, output)
+
+    print("Tablebase file : " + output)
+    print("Positions : " + str(positions))
+    print("Solved positions : " + str(solved))
+    print("Computation time (seconds) : " + str(time.perf_counter() - start))
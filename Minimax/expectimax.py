@@ -0,0 +1,342 @@
+from pacman_module.pacman import Directions
+from pacman_module.ghostAgents import DumbyGhost, GreedyGhost, SmartyGhost
+from pacman_module.ghostReduction import isSearchedGhost
+from pacman_module.transpositionTable import getTranspositionKey
+
+from hminimax import PacmanAgent as HMinimaxAgent
+
+import math
+
+
+class PacmanAgent(HMinimaxAgent):
+    def __init__(self, args):
+        """
+        An h-minimax agent whose ghost moves are chance nodes: the value of a
+        state where a ghost moves is the expected value of its successors,
+        weighted by the distribution of the moves of the ghost, instead of
+        the minimum. The chance model of each ghost is a ghost of the kind
+        given by the `--ghostagent` option (with the `--probattack` option for
+        the greedy ghost), whose `getDistribution` method gives the
+        distribution.
+
+        Chance nodes are pruned with the Star1 algorithm: the evaluation of
+        the states reachable before the depth limit is bounded from above
+        (see `find_value_upper_bound`), so that once some successors are
+        searched, the expected value is known to be too small for Pacman as
+        soon as it would be even if all the other successors reached the
+        bound.
+
+        The max nodes, the transposition table, the move ordering and the
+        iterative deepening are the ones of the h-minimax agent. With the
+        `--searchedghosts` option, the ghosts which are not searched only make
+        their most likely move.
+
+        Arguments:
+        ----------
+        - `args`: Namespace of arguments from command-line prompt.
+        """
+        super().__init__(args)
+
+        # The chance models of the ghosts, by index, created when a ghost is
+        # first searched.
+        self.ghostModels = {}
+
+    def get_ghost_model(self, agentIndex):
+        """
+        This method returns the chance model of the given ghost.
+
+        Arguments:
+        ----------
+        - 'agentIndex': The index of the ghost.
+
+        Return:
+        -------
+        - The ghost agent modelling the ghost.
+        """
+
+        ghostModel = self.ghostModels.get(agentIndex)
+        if ghostModel is None:
+            if self.args.ghostagent == "greedy":
+                ghostModel = GreedyGhost(agentIndex, self.args.probattack)
+            elif self.args.ghostagent == "smarty":
+                ghostModel = SmartyGhost(agentIndex)
+            else:
+                ghostModel = DumbyGhost(agentIndex)
+            self.ghostModels[agentIndex] = ghostModel
+        return ghostModel
+
+    def find_chances(self, state, agentIndex):
+        """
+        This method returns the moves of the given ghost and their
+        probabilities according to the chance model. Moves of probability 0
+        are left out, and the others are sorted by decreasing probability, so
+        that the most likely ones, which weigh the most in the expected value,
+        are searched first. A ghost which is not searched (see
+        `isSearchedGhost`) makes its most likely move for sure.
+
+        Arguments:
+        ----------
+        - 'state': The state where the ghost moves.
+
+        - 'agentIndex': The index of the ghost.
+
+        Return:
+        -------
+        - The list of (move, probability) pairs.
+        """
+
+        distribution = self.get_ghost_model(agentIndex).getDistribution(state)
+        chances = [(action, distribution[action])
+                   for action in state.getLegalActions(agentIndex)
+                   if action != Directions.STOP and distribution[action] > 0]
+        total = sum(probability for action, probability in chances)
+        chances = [(action, probability / total)
+                   for action, probability in chances]
+        chances.sort(key=lambda chance: -chance[1])
+        if not isSearchedGhost(state, agentIndex, self.args.searchedghosts):
+            return [(chances[0][0], 1.0)]
+        return chances
+
+    def chance_successors(self, state, agentIndex, actions):
+        """
+        Returns a generator over the pairs of successor states and moves of
+        the given state for the given ghost, following the given moves.
+
+        Arguments:
+        ----------
+        - 'state': The state to expand.
+
+        - 'agentIndex': The index of the ghost.
+
+        - 'actions': The moves of the ghost, in order.
+
+        Return:
+        -------
+        - A generator of (successor, move) pairs.
+        """
+
+        if self.args.inplace:
+            return state.inPlaceSuccessors(agentIndex, actions)
+
+        if self.args.lazy:
+            return state.iterGhostSuccessors(agentIndex, actions)
+
+        successors = {}
+        for nextState, nextMove in state.generateGhostSuccessors(agentIndex):
+            successors[nextMove] = nextState
+        return ((successors[action], action) for action in actions)
+
+    def find_value_upper_bound(self, state, currentDepth):
+        """
+        This method computes an upper bound on the heuristic evaluation of
+        the states reachable from the given state before the depth limit.
+
+        Each move of Pacman costs 1 point and eating a dot earns 10 points,
+        so that Pacman eating n dots has gained at most 9n points, plus 500
+        if it ate them all. With f dots left, the chain of the remaining dots
+        has a cost of at least f + f(f - 1) / 2, since every distance is at
+        least 1, and the penalty is at least f times this cost. With the
+        `--tablebase` option, the exact values of the states of the
+        tablebase are only bounded by Pacman eating every dot.
+
+        Arguments:
+        ----------
+        - 'state': The state.
+
+        - 'currentDepth' : The depth of the recursion.
+
+        Return:
+        -------
+        - The upper bound, infinite if ghosts can be eaten.
+        """
+
+        if state.getCapsules() or any(
+                ghostState.scaredTimer > 0
+                for ghostState in state.getGhostStates()):
+            return math.inf
+
+        score = state.getScore()
+        numberDots = state.getNumFood()
+        if self.tablebase is not None:
+            return score + 9 * numberDots + 500
+
+        # The number of moves of Pacman before the depth limit, i.e. of the
+        # depths of max nodes between the current depth and the limit.
+        roundPlies = self.numberGhosts + 1
+        pacmanMoves = ((self.depthLimit - 1) // roundPlies -
+                       currentDepth // roundPlies)
+        if numberDots <= pacmanMoves:
+            return score + 9 * numberDots + 500
+
+        dotsLeft = numberDots - pacmanMoves
+        return (score + 9 * pacmanMoves -
+                dotsLeft * (dotsLeft + dotsLeft * (dotsLeft - 1) // 2))
+
+    def h_minimax_player_min(
+            self, currentState, maxValue, minValue, currentDepth,
+            agentIndex=1):
+        """
+        This function computes the expectimax value when the next move is
+        done by a ghost (chance node). The Star1 pruning is used. The ghosts
+        move one after the other, each one in its own chance layer, before
+        Pacman moves again.
+
+        Arguments:
+        ----------
+        - 'currentState': The state to expand.
+
+        - 'maxValue': The maximum expectimax value computed by the max player
+                      at the previous states of the expansion.
+
+        - 'minValue': The minimum expectimax value above which the value of
+                      the state no longer matters.
+
+        - 'currentDepth' : The depth of the recursion.
+
+        - 'agentIndex': The index of the ghost to move.
+
+        Return:
+        -------
+        - 'expectedScore': The expected score found, or an upper bound on it
+                           not greater than maxValue if the node is pruned.
+
+        - 'likelyMove': The most likely move of the ghost.
+
+        """
+
+        self.variations[currentDepth] = []
+        if self.out_of_budget():
+            return 0, Directions.STOP
+
+        if self.cutoff_test(currentState, currentDepth):
+            return (self.score_evaluation(currentState, agentIndex),
+                    Directions.STOP)
+
+        # If the state has already been searched through another path, with
+        # the same evaluation context, the result may be known. The context
+        # is only set below the potential next reached state.
+        useTable = (self.transpositionTable is not None and
+                    currentDepth > self.numberGhosts)
+        if useTable:
+            transpositionKey = (getTranspositionKey(currentState, agentIndex),
+                                self.evaluationContext)
+            currentScore = currentState.getScore()
+            remainingDepth = self.depthLimit - currentDepth
+            result = self.transpositionTable.probe(
+                transpositionKey, remainingDepth, maxValue, minValue,
+                currentScore)
+            if result is not None:
+                return result
+            searchWindow = (maxValue, minValue)
+            repetitionsSkipped = self.repetitionsSkipped
+
+        # The two following instructions are used to not cycle indefinitely.
+        currentStateInfo1 = (
+            currentState.getPacmanPosition(),
+            tuple(currentState.getGhostPositions()),
+            currentState.getFood(),
+            agentIndex)
+        self.statesAlreadyPassedFromRoot.add(currentStateInfo1)
+
+        # The agent moving after this ghost, Pacman after the last one.
+        nextAgentIndex = (agentIndex + 1) % currentState.getNumAgents()
+
+        chances = self.find_chances(currentState, agentIndex)
+        upperBound = self.find_value_upper_bound(currentState, currentDepth)
+
+        # The expected score of the successors searched so far, and the
+        # probability of the ones left.
+        expectedScore = 0
+        remainingProbability = 1
+        likelyMove = chances[0][0]
+
+        # While the search follows the previous principal variation, its
+        # successor is searched with the variation.
+        followingVariation = self.followingVariation
+        variationMove = None
+        if followingVariation and currentDepth < len(self.previousVariation):
+            variationMove = self.previousVariation[currentDepth]
+
+        successors = self.chance_successors(
+            currentState, agentIndex,
+            [action for action, probability in chances])
+        for (nextState, nextMove), (action, probability) in zip(
+                successors, chances):
+            remainingProbability -= probability
+            self.followingVariation = (followingVariation and
+                                       nextMove == variationMove)
+
+            # useful for the heuristic evaluation. It is set by each ghost of
+            # the first round, so that it is the state where the game ends if
+            # a ghost catches Pacman before the others move.
+            if currentDepth <= self.numberGhosts:
+                self.currentNextMoveStateIsLose = nextState.isLose()
+                self.currentNextMoveStateTuple = (
+                    nextState.getPacmanPosition(),
+                    tuple(nextState.getGhostPositions()),
+                    nextState.getFood())
+                self.evaluationContext = self.find_evaluation_context()
+
+            nextStateInfo1 = (
+                nextState.getPacmanPosition(),
+                tuple(nextState.getGhostPositions()),
+                nextState.getFood(),
+                nextAgentIndex)
+
+            # The successor only matters if its score exceeds this value.
+            nextMaxValue = -math.inf
+            if upperBound != math.inf:
+                nextMaxValue = (maxValue - expectedScore -
+                                remainingProbability * upperBound) / probability
+
+            # If the state has already been passed in the path from the actual
+            # state to the current state expanded, or if every move of Pacman
+            # from it does, it is evaluated instead of being searched.
+            resultScore = -math.inf
+            if nextStateInfo1 not in self.statesAlreadyPassedFromRoot:
+                if nextAgentIndex == 0:
+                    resultScore, resultMove = self.h_minimax_player_max(
+                        nextState, nextMaxValue, math.inf, currentDepth + 1)
+                else:
+                    resultScore, resultMove = self.h_minimax_player_min(
+                        nextState, nextMaxValue, math.inf, currentDepth + 1,
+                        nextAgentIndex)
+            if resultScore == -math.inf:
+                resultScore = self.score_evaluation(nextState, nextAgentIndex)
+                self.repetitionsSkipped += 1
+
+            if nextMove == likelyMove:
+                self.variations[currentDepth] = (
+                    [nextMove] + self.variations[currentDepth + 1])
+            expectedScore += probability * resultScore
+
+            # If even the best scores for the other successors cannot make
+            # the expected score bigger than the maximum value of a
+            # predecessor node whose next move is done by max player, then
+            # it is useless to continue expanding the current state.
+            if upperBound == math.inf:
+                continue
+            boundScore = expectedScore + remainingProbability * upperBound
+            if boundScore <= maxValue:
+                successors.close()
+                self.statesAlreadyPassedFromRoot.remove(currentStateInfo1)
+                if (useTable and not self.searchAborted and
+                        self.repetitionsSkipped == repetitionsSkipped):
+                    self.transpositionTable.store(
+                        transpositionKey, remainingDepth, boundScore,
+                        *searchWindow, likelyMove, currentScore)
+                return boundScore, likelyMove
+
+        # The passed state is removed in order to construct correctly the other
+        # paths passing through other states.
+        self.statesAlreadyPassedFromRoot.remove(currentStateInfo1)
+
+        # Values depending on the path to the state, since successors were
+        # replaced by their evaluation as repetitions, are not stored.
+        if (useTable and not self.searchAborted and
+                self.repetitionsSkipped == repetitionsSkipped):
+            self.transpositionTable.store(
+                transpositionKey, remainingDepth, expectedScore,
+                *searchWindow, likelyMove, currentScore)
+
+        return expectedScore, likelyMove
@@ -0,0 +1,110 @@
+import time
+from argparse import ArgumentParser, Namespace
+
+from pacman_module import layout
+from pacman_module.pacman import GameState
+from run import load_agent_from_file, strictly_positive_integer
+
+
+def search(agentfile, layoutName, nghosts, searchedghosts, args):
+    """
+    Searches the first move of a game with the given number of ghosts.
+
+    Arguments:
+    ----------
+    - `agentfile`: the file of the h-minimax agent.
+    - `layoutName`: the maze layout.
+    - `nghosts`: the number of ghosts.
+    - `searchedghosts`: the number of ghosts whose moves are all searched.
+    - `args`: the other options of the agent.
+
+    Return:
+    -------
+    - The number of expanded nodes and the computation time.
+    """
+
+    agentArgs = Namespace(
+        agentfile=agentfile, layout=layoutName, workers=1,
+        inplace=args.inplace, lazy=args.lazy, ordering=args.ordering,
+        ttsize=args.ttsize, movetime=0, movenodes=0,
+        evaluation=args.evaluation, ghostagent="greedy", probattack=1.0,
+        searchedghosts=searchedghosts, tablebase="")
+    agent = load_agent_from_file(agentfile)(agentArgs)
+    agent.depthLimitRounds = args.rounds
+
+    state = GameState()
+    state.initialize(layout.getLayout(layoutName), nghosts)
+
+    GameState.resetNodeExpansionCounter()
+    start = time.perf_counter()
+    agent.get_action(state)
+    return GameState.countExpanded, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    usage = """
+    USAGE:      python ghost_benchmark.py <options>
+    EXAMPLES:   (1) python ghost_benchmark.py --layout large_ghosts
+                    - reports the expanded nodes of the h-minimax search
+                      of the first move with 1, 2, 3 and 4 ghosts, all of
+                      them searched or only the closest one,
+                      in large_ghosts maze
+    """
+
+    parser = ArgumentParser(usage)
+    parser.add_argument(
+        '--agentfile',
+        help='Search agent (hminimax.py or expectimax.py).',
+        default="hminimax.py")
+    parser.add_argument(
+        '--layout',
+        help='Maze layout (from layout folder), with enough ghosts.',
+        default="large_ghosts")
+    parser.add_argument(
+        '--ghosts',
+        help='Numbers of ghosts to compare.',
+        type=strictly_positive_integer, nargs='+', default=[1, 2, 3, 4])
+    parser.add_argument(
+        '--searchedghosts',
+        help='Numbers of ghosts whose moves are all searched to compare '
+             '(0 searches all of them).',
+        type=int, nargs='+', default=[0, 1])
+    parser.add_argument(
+        '--rounds',
+        help="Depth limit of the search, in rounds of moves of the agents.",
+        type=int, default=2)
+    parser.add_argument(
+        '--inplace',
+        help="Search by moving the state in place.",
+        action="store_true")
+    parser.add_argument(
+        '--lazy',
+        help="Generate each successor state only when it is searched.",
+        action="store_true")
+    parser.add_argument(
+        '--evaluation',
+        help="Distances of the heuristic evaluation of the h-minimax agent.",
+        choices=["manhattan", "maze"], default="manhattan")
+    parser.add_argument(
+        '--ordering',
+        help="Order the moves by killer moves and history scores.",
+        action="store_true")
+    parser.add_argument(
+        '--ttsize',
+        help="Number of buckets of the transposition table.",
+        type=int, default=0)
+
+    args = parser.parse_args()
+
+    print("Searched ghosts | Ghosts | Expanded nodes | Time (s) | Growth")
+    for searchedghosts in args.searchedghosts:
+        previous = None
+        for nghosts in args.ghosts:
+            expanded, elapsed = search(
+                args.agentfile, args.layout, nghosts, searchedghosts, args)
+            growth = 1.0
+            if previous is not None:
+                growth = expanded / previous
+            previous = expanded
+            print("%15d | %6d | %14d | %8.3f | %6.2f" % (
+                searchedghosts, nghosts, expanded, elapsed, growth))
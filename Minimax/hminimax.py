@@ -1,8 +1,28 @@
 from pacman_module.game import Agent
 from pacman_module.pacman import Directions
+from pacman_module.pacman import GameState
 from pacman_module.util import Stack
+from pacman_module.foodChain import FoodChain
+from pacman_module.ghostReduction import getReducedActions
+from pacman_module.ghostReduction import isSearchedGhost
+from pacman_module.mazeDistances import getMazeDistances
+from pacman_module.moveOrdering import MoveOrdering
+from pacman_module.parallelSearch import EXPANDED_SYNC_NODES
+from pacman_module.parallelSearch import RootSplitSearch
+from pacman_module.parallelSearch import addWorkerExpanded
+from pacman_module.tablebase import Tablebase
+from pacman_module.transpositionTable import TranspositionTable
+from pacman_module.transpositionTable import getTranspositionKey
 
 import math
+import time
+
+# The depth limit at which iterative deepening stops
+MAXIMUM_DEPTH_LIMIT = 100
+
+# The number of moves of each agent searched without iterative deepening
+DEPTH_LIMIT_ROUNDS = 5
+
 
 class PacmanAgent(Agent):
     def __init__(self, args):
@@ -18,24 +38,103 @@ class PacmanAgent(Agent):
         # passed in the path from the actual state to the expanded state.
         self.statesAlreadyPassedFromRoot = None
 
+        # The number of successors skipped since they were already in the
+        # path from the actual state. The value of a node whose search skips
+        # any depends on the path to it, and is not kept in the
+        # transposition table.
+        self.repetitionsSkipped = 0
+
         # This dictionary stores as keys the states that have already been
         # reached, i.e. the finally chosen states when calling the get_action
         # method. The values associated to keys correspond to the number of
         # times the given state has already been reached.
         self.statesAlreadyReached = dict()
 
-        # The potential next reached state, i.e. the state corresponding to the
-        # first movement of pacman and of the ghost in the expanded nodes.
-        self.currentNextMoveState = None
+        # Whether the potential next reached state, i.e. the state
+        # corresponding to the first movement of pacman and of the ghosts in
+        # the expanded nodes, is a losing state. Only this flag is kept since the
+        # state itself is modified in place with the `--inplace` option.
+        self.currentNextMoveStateIsLose = False
 
-        # The tuple representing the self.currentNextMoveState, i.e.
-        # respectively the pacman position, the ghost position, and the food
+        # The tuple representing the potential next reached state, i.e.
+        # respectively the pacman position, the ghost positions, and the food
         # matrix.
         self.currentNextMoveStateTuple = None
 
         # The number of calls to the get_action method.
         self.numberMoves = 0
 
+        # The number of ghosts, each of which moves in its own min layer after
+        # Pacman, so that a round of moves of the agents is numberGhosts + 1
+        # plies deep.
+        self.numberGhosts = 1
+
+        # The depth at which the recursion is stopped, depthLimitRounds rounds
+        # of moves unless iterative deepening is used.
+        self.depthLimitRounds = DEPTH_LIMIT_ROUNDS
+        self.depthLimit = 2 * self.depthLimitRounds
+
+        # With the `--evaluation maze` option, the chain of the dots of the
+        # heuristic evaluation is measured with maze distances, and its cost
+        # is cached (see `FoodChain`). It is created at the first call of the
+        # get_action method.
+        self.foodChain = None
+
+        # With the `--ttsize` option, the results of the searches of the
+        # states are kept in a transposition table throughout the game, so
+        # that states reached again through other paths are not searched
+        # again. The heuristic evaluation depends on the potential next
+        # reached state, so the results are only shared between states with
+        # the same evaluation context.
+        self.transpositionTable = None
+        if self.args.ttsize > 0:
+            self.transpositionTable = TranspositionTable(self.args.ttsize)
+        self.evaluationContext = None
+
+        # With the `--movetime` or `--movenodes` options, the depth limit is
+        # increased a round at a time until the time or the number of expanded
+        # nodes allowed per move is exhausted (see `iterative_deepening`).
+        # The search aborted when reaching the budget is discarded.
+        self.deadline = math.inf
+        self.nodeBudget = math.inf
+        self.budgetEnforced = False
+        self.searchAborted = False
+        self.depthCutoffReached = False
+
+        # The principal variation, i.e. the sequence of best moves, found by
+        # each node of the search at the given depth, and the one found by
+        # the previous search, whose moves are tried first at each depth while
+        # the current search follows it.
+        self.variations = []
+        self.previousVariation = []
+        self.followingVariation = False
+
+        # With the `--ordering` option, the moves of each node are sorted by
+        # the move of the principal variation, the best move stored in the
+        # transposition table, the killer moves of the depth and the history
+        # scores (see `MoveOrdering`). The cutoffs are counted in any case.
+        self.moveOrdering = MoveOrdering()
+
+        # With the `--tablebase` option, the states of the endgame tablebase
+        # reached at the depth limit are evaluated by their exact minimax value
+        # instead of the heuristic evaluation (see `Tablebase`).
+        self.tablebase = None
+        if self.args.tablebase:
+            self.tablebase = Tablebase(self.args.tablebase)
+
+        # With the `--workers` option, the moves of Pacman at the root are
+        # searched in parallel by a pool of processes (see `RootSplitSearch`).
+        self.rootSplitSearch = None
+        if self.args.workers > 1:
+            self.rootSplitSearch = RootSplitSearch(self, self.args.workers)
+
+        # In a worker process of the parallel search, the number of nodes
+        # left to all the workers when the task was submitted, and the number
+        # of expanded nodes when the count of the process was last added to
+        # the one shared by the workers (see `out_of_budget`).
+        self.workerNodesLeft = math.inf
+        self.publishedExpanded = 0
+
     def get_action(self, state):
         """
         Given a pacman game state, returns a legal move.
@@ -52,7 +151,7 @@ class PacmanAgent(Agent):
 
         stateInfo = (
             state.getPacmanPosition(),
-            state.getGhostPositions()[0],
+            tuple(state.getGhostPositions()),
             state.getFood())
 
         if stateInfo not in self.statesAlreadyReached:
@@ -61,14 +160,359 @@ class PacmanAgent(Agent):
         else:
             self.statesAlreadyReached[stateInfo] += 1
 
-        self.statesAlreadyPassedFromRoot = set()
-        maxScore, maxMove = self.h_minimax_player_max(
-            state, -(math.inf), math.inf, 0)
+        if self.args.evaluation == "maze" and self.foodChain is None:
+            self.foodChain = FoodChain(
+                state.getFood(), getMazeDistances(state.data.layout))
+
+        if self.transpositionTable is not None:
+            self.transpositionTable.newSearch()
+        self.moveOrdering.newSearch()
+
+        self.numberGhosts = state.getNumAgents() - 1
+        if self.args.movetime > 0 or self.args.movenodes > 0:
+            maxMove = self.iterative_deepening(state)
+        else:
+            self.depthLimit = self.depthLimitRounds * (self.numberGhosts + 1)
+            maxScore, maxMove = self.search(state)
 
         self.numberMoves += 1
 
         return maxMove
 
+    def search(self, state):
+        """
+        This method runs the h-minimax search from the given state, up to the
+        current depth limit.
+
+        Arguments:
+        ----------
+        - 'state': The state to search from.
+
+        Return:
+        -------
+        - 'maxScore': The maximum score found.
+
+        - 'maxMove': The move corresponding to the maximum score found.
+        """
+
+        self.statesAlreadyPassedFromRoot = set()
+        self.variations = [[] for i in range(self.depthLimit + 1)]
+        self.followingVariation = True
+        if self.rootSplitSearch is not None:
+            return self.parallel_search(state)
+        return self.h_minimax_player_max(state, -(math.inf), math.inf, 0)
+
+    def shutdown(self):
+        """
+        This method stops the worker processes of the parallel search, if
+        any. It is called once the game is over.
+        """
+
+        if self.rootSplitSearch is not None:
+            self.rootSplitSearch.shutdown()
+
+    def parallel_search(self, state):
+        """
+        This method runs the h-minimax search from the given state, up to the
+        current depth limit, with the subtrees of the moves of Pacman
+        searched in parallel. Without a transposition table, the best move
+        found is the one of a sequential search (see `RootSplitSearch`).
+
+        Arguments:
+        ----------
+        - 'state': The state to search from.
+
+        Return:
+        -------
+        - 'maxScore': The maximum score found.
+
+        - 'maxMove': The move corresponding to the maximum score found.
+        """
+
+        firstMoves = []
+        if self.previousVariation:
+            firstMoves.append(self.previousVariation[0])
+        actions = self.order_actions(
+            state, 0, state.getPacmanPosition(), 0, firstMoves)
+        successors = state.generatePacmanSuccessors()
+        if actions is not None:
+            successors.sort(key=lambda successor: actions.index(successor[1]))
+
+        results = self.rootSplitSearch.search(state, successors)
+
+        maxScore = -math.inf
+        maxMove = Directions.STOP
+        for successor, result in zip(successors, results):
+            resultScore, variation, aborted, depthCutoffReached = result
+            self.searchAborted = self.searchAborted or aborted
+            self.depthCutoffReached = (self.depthCutoffReached or
+                                       depthCutoffReached)
+            if resultScore != math.inf and resultScore > maxScore:
+                maxScore = resultScore
+                maxMove = successor[1]
+                self.variations[0] = [maxMove] + variation
+
+        return maxScore, maxMove
+
+    def search_root_move(self, state, nextState, nextMove, maxValue):
+        """
+        This method searches the subtree of a move of Pacman from the root
+        state, as `h_minimax_player_max` does at depth 0.
+
+        Arguments:
+        ----------
+        - 'state': The root state.
+
+        - 'nextState': The state reached by the move.
+
+        - 'nextMove': The move.
+
+        - 'maxValue': The maximum h-minimax value of the moves preceding
+                      this one.
+
+        Return:
+        -------
+        - The h-minimax value of the move, the principal variation below it,
+          and whether the search was aborted and reached the depth limit.
+        """
+
+        self.numberGhosts = state.getNumAgents() - 1
+        self.statesAlreadyPassedFromRoot = {(
+            state.getPacmanPosition(),
+            tuple(state.getGhostPositions()),
+            state.getFood(),
+            0)}
+        self.variations = [[] for i in range(self.depthLimit + 1)]
+        self.followingVariation = (len(self.previousVariation) > 0 and
+                                   nextMove == self.previousVariation[0])
+        resultScore, resultMove = self.h_minimax_player_min(
+            nextState, maxValue, math.inf, 1)
+        return (resultScore, self.variations[1], self.searchAborted,
+                self.depthCutoffReached)
+
+    def get_search_context(self):
+        """
+        This method returns the state of the agent a worker process of the
+        parallel search needs: the states already reached, the number of
+        moves, the depth limit, the principal variation of the previous
+        search and the budget left. The tasks of the parallel search share
+        the nodes left when they are submitted.
+
+        Return:
+        -------
+        - The search context, as a tuple.
+        """
+
+        return (self.statesAlreadyReached, self.numberMoves, self.depthLimit,
+                self.previousVariation, self.budgetEnforced, self.deadline,
+                self.nodeBudget - GameState.countExpanded)
+
+    def set_search_context(self, context):
+        """
+        This method sets the state of the agent of a worker process of the
+        parallel search, as returned by `get_search_context`.
+
+        Arguments:
+        ----------
+        - 'context': The search context.
+        """
+
+        (self.statesAlreadyReached, numberMoves, self.depthLimit,
+         self.previousVariation, self.budgetEnforced, self.deadline,
+         nodesLeft) = context
+        self.nodeBudget = GameState.countExpanded + nodesLeft
+        self.workerNodesLeft = nodesLeft
+        self.publishedExpanded = GameState.countExpanded
+        self.searchAborted = False
+        self.depthCutoffReached = False
+
+        # A new move is being searched.
+        if numberMoves != self.numberMoves:
+            self.numberMoves = numberMoves
+            if self.transpositionTable is not None:
+                self.transpositionTable.newSearch()
+            self.moveOrdering.newSearch()
+
+    def iterative_deepening(self, state):
+        """
+        This method runs h-minimax searches from the given state with depth
+        limits of 1, 2, 3... rounds of moves of the agents until the time
+        (`--movetime`, in milliseconds) or the number of expanded nodes
+        (`--movenodes`) allowed per move is exhausted, or the depth limit no
+        longer cuts the search off. The search of one round is always
+        completed. The depth limit is increased by a move of Pacman and a move
+        of each ghost at a time, since evaluating the states right after a
+        move of Pacman is biased in its favour.
+
+        Each search first tries the moves of the principal variation of the
+        previous one, so that it prunes more.
+
+        Arguments:
+        ----------
+        - 'state': The state to search from.
+
+        Return:
+        -------
+        - The best move of the deepest completed search.
+        """
+
+        self.deadline = math.inf
+        if self.args.movetime > 0:
+            self.deadline = time.perf_counter() + self.args.movetime / 1000
+        self.nodeBudget = math.inf
+        if self.args.movenodes > 0:
+            self.nodeBudget = GameState.countExpanded + self.args.movenodes
+        self.budgetEnforced = False
+        self.searchAborted = False
+        self.previousVariation = []
+
+        self.depthLimit = self.numberGhosts + 1
+        while True:
+            self.depthCutoffReached = False
+            maxScore, maxMove = self.search(state)
+            if self.searchAborted:
+                break
+
+            bestMove = maxMove
+            self.previousVariation = self.variations[0]
+            if not self.depthCutoffReached or \
+                    self.depthLimit >= MAXIMUM_DEPTH_LIMIT:
+                break
+
+            self.budgetEnforced = True
+            self.depthLimit += self.numberGhosts + 1
+
+        self.searchAborted = False
+        self.previousVariation = []
+        return bestMove
+
+    def out_of_budget(self):
+        """
+        This method tells whether the search must be aborted since the time
+        or the number of expanded nodes allowed per move is exhausted.
+
+        Return:
+        -------
+        - True if the search must be aborted, False otherwise.
+        """
+
+        if self.searchAborted:
+            return True
+
+        # In a worker process, the nodes expanded by the other workers are
+        # taken from the budget as they are published.
+        if (self.budgetEnforced and self.workerNodesLeft != math.inf and
+                GameState.countExpanded - self.publishedExpanded >=
+                EXPANDED_SYNC_NODES):
+            workersExpanded = addWorkerExpanded(
+                GameState.countExpanded - self.publishedExpanded)
+            self.publishedExpanded = GameState.countExpanded
+            self.nodeBudget = (GameState.countExpanded +
+                               self.workerNodesLeft - workersExpanded)
+
+        if self.budgetEnforced and (
+                GameState.countExpanded >= self.nodeBudget or
+                time.perf_counter() >= self.deadline):
+            self.searchAborted = True
+            return True
+
+        return False
+
+    def order_actions(self, state, agentIndex, position, currentDepth,
+                      firstMoves=()):
+        """
+        Returns the legal actions of the given agent in the order in which
+        they must be searched, or None if the default order is used.
+
+        Arguments:
+        ----------
+        - 'state': The state to expand.
+
+        - 'agentIndex': The index of the agent to move.
+
+        - 'position': The position of the agent to move.
+
+        - 'currentDepth': The depth of the recursion.
+
+        - 'firstMoves': The moves which must come first, in order.
+
+        Return:
+        -------
+        - The list of sorted actions, or None.
+        """
+
+        if self.args.ordering:
+            return self.moveOrdering.orderActions(
+                state, agentIndex, position, currentDepth,
+                state.getLegalActions(agentIndex), firstMoves)
+
+        if firstMoves:
+            return sorted(state.getLegalActions(agentIndex),
+                          key=lambda action: action not in firstMoves)
+
+        return None
+
+    def successors(self, state, agentIndex, position, currentDepth,
+                   firstMoves=()):
+        """
+        Returns a generator over the pairs of successor states and moves of
+        the given state for the given agent.
+
+        With the `--inplace` option, the successors are the state itself,
+        moved and restored in place (see `GameState.inPlaceSuccessors`), so
+        that no state is allocated during the search. With the `--lazy`
+        option, each successor state is only generated when it is pulled
+        (see `GameState.iterPacmanSuccessors`), so that the ones following a
+        cutoff are never generated.
+
+        With the `--searchedghosts` option, only the moves of the given number
+        of ghosts closest to Pacman are all searched, the other ghosts only
+        making their move bringing them closest to Pacman (see
+        `isSearchedGhost`).
+
+        Arguments:
+        ----------
+        - 'state': The state to expand.
+
+        - 'agentIndex': The index of the agent to move.
+
+        - 'position': The position of the agent to move.
+
+        - 'currentDepth': The depth of the recursion.
+
+        - 'firstMoves': The moves whose successors must come first, in order.
+
+        Return:
+        -------
+        - A generator of (successor, move) pairs.
+        """
+
+        actions = self.order_actions(
+            state, agentIndex, position, currentDepth, firstMoves)
+        if agentIndex > 0 and not isSearchedGhost(
+                state, agentIndex, self.args.searchedghosts):
+            actions = getReducedActions(state, agentIndex)
+
+        if self.args.inplace:
+            return state.inPlaceSuccessors(agentIndex, actions)
+
+        if self.args.lazy:
+            if agentIndex == 0:
+                return state.iterPacmanSuccessors(actions)
+            return state.iterGhostSuccessors(agentIndex, actions)
+
+        if agentIndex == 0:
+            successors = state.generatePacmanSuccessors()
+        else:
+            successors = state.generateGhostSuccessors(agentIndex)
+
+        if actions is not None:
+            successors = [successor for successor in successors
+                          if successor[1] in actions]
+            successors.sort(key=lambda successor: actions.index(successor[1]))
+
+        return (s for s in successors)
+
     def h_minimax_player_max(
             self, currentState, maxValue, minValue, currentDepth):
         """
@@ -95,38 +539,82 @@ class PacmanAgent(Agent):
 
         """
 
+        self.variations[currentDepth] = []
+        if self.out_of_budget():
+            return 0, Directions.STOP
+
         if self.cutoff_test(currentState, currentDepth):
             return self.score_evaluation(currentState), Directions.STOP
 
+        # If the state has already been searched through another path, with
+        # the same evaluation context, the result may be known. The context
+        # is only set below the potential next reached state.
+        useTable = (self.transpositionTable is not None and
+                    currentDepth > self.numberGhosts)
+        if useTable:
+            transpositionKey = (getTranspositionKey(currentState, 0),
+                                self.evaluationContext)
+            currentScore = currentState.getScore()
+            remainingDepth = self.depthLimit - currentDepth
+            result = self.transpositionTable.probe(
+                transpositionKey, remainingDepth, maxValue, minValue,
+                currentScore)
+            if result is not None:
+                return result
+            searchWindow = (maxValue, minValue)
+            repetitionsSkipped = self.repetitionsSkipped
+
         # The two following instructions are used to not cycle indefinitely,
         # since the minimum score is unbounded.
         currentStateInfo1 = (
             currentState.getPacmanPosition(),
-            currentState.getGhostPositions()[0],
+            tuple(currentState.getGhostPositions()),
             currentState.getFood(),
-            True)
+            0)
         self.statesAlreadyPassedFromRoot.add(currentStateInfo1)
 
         maxScore = -math.inf
         maxMove = Directions.STOP
 
-        for successor in currentState.generatePacmanSuccessors():
+        # While the search follows the previous principal variation, its
+        # move is tried first.
+        followingVariation = self.followingVariation
+        variationMove = None
+        if followingVariation and currentDepth < len(self.previousVariation):
+            variationMove = self.previousVariation[currentDepth]
+        firstMoves = []
+        if variationMove is not None:
+            firstMoves.append(variationMove)
+        if useTable and self.args.ordering:
+            tableMove = self.transpositionTable.getMove(transpositionKey)
+            if tableMove is not None and tableMove not in firstMoves:
+                firstMoves.append(tableMove)
+
+        # The position of the agent is read before moving it, since the state
+        # is modified in place with the `--inplace` option.
+        position = currentState.getPacmanPosition()
+        successors = self.successors(
+            currentState, 0, position, currentDepth, firstMoves)
+        for childIndex, successor in enumerate(successors):
             nextState = successor[0]
             nextMove = successor[1]
+            self.followingVariation = (followingVariation and
+                                       nextMove == variationMove)
 
             # useful for the heuristic evaluation.
-            if currentDepth == 1:
-                self.currentNextMoveState = nextState
+            if currentDepth == self.numberGhosts:
+                self.currentNextMoveStateIsLose = nextState.isLose()
                 self.currentNextMoveStateTuple = (
                     nextState.getPacmanPosition(),
-                    nextState.getGhostPositions()[0],
+                    tuple(nextState.getGhostPositions()),
                     nextState.getFood())
+                self.evaluationContext = self.find_evaluation_context()
 
             nextStateInfo1 = (
                 nextState.getPacmanPosition(),
-                nextState.getGhostPositions()[0],
+                tuple(nextState.getGhostPositions()),
                 nextState.getFood(),
-                False)
+                1)
 
             # If the state has already been passed in the path from the actual
             # state to the current state expanded, then we do not pass again on
@@ -137,16 +625,28 @@ class PacmanAgent(Agent):
 
             else:
                 resultScore = math.inf
+                self.repetitionsSkipped += 1
 
             if resultScore != math.inf and resultScore > maxScore:
                 maxScore = resultScore
                 maxMove = nextMove
+                self.variations[currentDepth] = (
+                    [nextMove] + self.variations[currentDepth + 1])
 
                 # If a predecessor node whose next move is done by min
                 # player knows a path giving a smaller minimax value, then it
                 # is useless to continue expanding the current state.
                 if maxScore >= minValue:
+                    successors.close()
+                    self.moveOrdering.recordCutoff(
+                        0, position, currentDepth, maxMove,
+                        self.depthLimit - currentDepth, childIndex)
                     self.statesAlreadyPassedFromRoot.remove(currentStateInfo1)
+                    if (useTable and not self.searchAborted and
+                            self.repetitionsSkipped == repetitionsSkipped):
+                        self.transpositionTable.store(
+                            transpositionKey, remainingDepth, maxScore,
+                            *searchWindow, maxMove, currentScore)
                     return maxScore, maxMove
 
                 # The maximum value found is kept in order to inform the
@@ -158,13 +658,24 @@ class PacmanAgent(Agent):
         # paths passing through other states.
         self.statesAlreadyPassedFromRoot.remove(currentStateInfo1)
 
+        # Values depending on the path to the state, since successors were
+        # skipped as repetitions in the search of the state, are not stored.
+        if (useTable and not self.searchAborted and
+                self.repetitionsSkipped == repetitionsSkipped):
+            self.transpositionTable.store(
+                transpositionKey, remainingDepth, maxScore, *searchWindow,
+                maxMove, currentScore)
+
         return maxScore, maxMove
 
     def h_minimax_player_min(
-            self, currentState, maxValue, minValue, currentDepth):
+            self, currentState, maxValue, minValue, currentDepth,
+            agentIndex=1):
         """
         This function computes the h-minimax value when the next move is done
-        by the ghost (min player). The alpha-beta pruning is used.
+        by a ghost (min player). The alpha-beta pruning is used. The ghosts
+        move one after the other, each one in its own min layer, before Pacman
+        moves again.
 
         Arguments:
         ----------
@@ -178,6 +689,8 @@ class PacmanAgent(Agent):
 
         - 'currentDepth' : The depth of the recursion.
 
+        - 'agentIndex': The index of the ghost to move.
+
         Return:
         -------
         - 'minScore': The minimum score found.
@@ -186,58 +699,125 @@ class PacmanAgent(Agent):
 
         """
 
+        self.variations[currentDepth] = []
+        if self.out_of_budget():
+            return 0, Directions.STOP
+
         if self.cutoff_test(currentState, currentDepth):
-            return self.score_evaluation(currentState), Directions.STOP
+            return (self.score_evaluation(currentState, agentIndex),
+                    Directions.STOP)
+
+        # If the state has already been searched through another path, with
+        # the same evaluation context, the result may be known. The context
+        # is only set below the potential next reached state.
+        useTable = (self.transpositionTable is not None and
+                    currentDepth > self.numberGhosts)
+        if useTable:
+            transpositionKey = (getTranspositionKey(currentState, agentIndex),
+                                self.evaluationContext)
+            currentScore = currentState.getScore()
+            remainingDepth = self.depthLimit - currentDepth
+            result = self.transpositionTable.probe(
+                transpositionKey, remainingDepth, maxValue, minValue,
+                currentScore)
+            if result is not None:
+                return result
+            searchWindow = (maxValue, minValue)
+            repetitionsSkipped = self.repetitionsSkipped
 
         # The two following instructions are used to not cycle indefinitely,
         # since the minimum score is unbounded.
         currentStateInfo1 = (
             currentState.getPacmanPosition(),
-            currentState.getGhostPositions()[0],
+            tuple(currentState.getGhostPositions()),
             currentState.getFood(),
-            False)
+            agentIndex)
         self.statesAlreadyPassedFromRoot.add(currentStateInfo1)
 
         minScore = math.inf
         minMove = Directions.STOP
 
-        for successor in currentState.generateGhostSuccessors(1):
+        # While the search follows the previous principal variation, its
+        # move is tried first.
+        followingVariation = self.followingVariation
+        variationMove = None
+        if followingVariation and currentDepth < len(self.previousVariation):
+            variationMove = self.previousVariation[currentDepth]
+        firstMoves = []
+        if variationMove is not None:
+            firstMoves.append(variationMove)
+        if useTable and self.args.ordering:
+            tableMove = self.transpositionTable.getMove(transpositionKey)
+            if tableMove is not None and tableMove not in firstMoves:
+                firstMoves.append(tableMove)
+
+        # The agent moving after this ghost, Pacman after the last one.
+        nextAgentIndex = (agentIndex + 1) % currentState.getNumAgents()
+
+        # The position of the agent is read before moving it, since the state
+        # is modified in place with the `--inplace` option.
+        position = currentState.getGhostPosition(agentIndex)
+        successors = self.successors(
+            currentState, agentIndex, position, currentDepth, firstMoves)
+        for childIndex, successor in enumerate(successors):
             nextState = successor[0]
             nextMove = successor[1]
-
-            # useful for the heuristic evaluation.
-            if currentDepth == 1:
-                self.currentNextMoveState = nextState
+            self.followingVariation = (followingVariation and
+                                       nextMove == variationMove)
+
+            # useful for the heuristic evaluation. It is set by each ghost of
+            # the first round, so that it is the state where the game ends if
+            # a ghost catches Pacman before the others move.
+            if currentDepth <= self.numberGhosts:
+                self.currentNextMoveStateIsLose = nextState.isLose()
                 self.currentNextMoveStateTuple = (
                     nextState.getPacmanPosition(),
-                    nextState.getGhostPositions()[0],
+                    tuple(nextState.getGhostPositions()),
                     nextState.getFood())
+                self.evaluationContext = self.find_evaluation_context()
 
             nextStateInfo1 = (
                 nextState.getPacmanPosition(),
-                nextState.getGhostPositions()[0],
+                tuple(nextState.getGhostPositions()),
                 nextState.getFood(),
-                True)
+                nextAgentIndex)
 
             # If the state has already been passed in the path from the actual
             # state to the current state expanded, then we do not pass again on
             # it.
             if nextStateInfo1 not in self.statesAlreadyPassedFromRoot:
-                resultScore, resultMove = self.h_minimax_player_max(
-                    nextState, maxValue, minValue, currentDepth + 1)
+                if nextAgentIndex == 0:
+                    resultScore, resultMove = self.h_minimax_player_max(
+                        nextState, maxValue, minValue, currentDepth + 1)
+                else:
+                    resultScore, resultMove = self.h_minimax_player_min(
+                        nextState, maxValue, minValue, currentDepth + 1,
+                        nextAgentIndex)
 
             else:
                 resultScore = (-math.inf)
+                self.repetitionsSkipped += 1
 
             if resultScore != (-math.inf) and resultScore < minScore:
                 minScore = resultScore
                 minMove = nextMove
+                self.variations[currentDepth] = (
+                    [nextMove] + self.variations[currentDepth + 1])
 
                 # If a predecessor node whose next move is done by max
                 # player knows a path giving a bigger minimax value, then it
                 # is useless to continue expanding the current state.
                 if minScore <= maxValue:
+                    successors.close()
+                    self.moveOrdering.recordCutoff(
+                        agentIndex, position, currentDepth, minMove,
+                        self.depthLimit - currentDepth, childIndex)
                     self.statesAlreadyPassedFromRoot.remove(currentStateInfo1)
+                    if (useTable and not self.searchAborted and
+                            self.repetitionsSkipped == repetitionsSkipped):
+                        self.transpositionTable.store(
+                            transpositionKey, remainingDepth, minScore,
+                            *searchWindow, minMove, currentScore)
                     return minScore, minMove
 
                 # The minimum value found is kept in order to inform the
@@ -249,6 +829,14 @@ class PacmanAgent(Agent):
         # paths passing through other states.
         self.statesAlreadyPassedFromRoot.remove(currentStateInfo1)
 
+        # Values depending on the path to the state, since successors were
+        # skipped as repetitions in the search of the state, are not stored.
+        if (useTable and not self.searchAborted and
+                self.repetitionsSkipped == repetitionsSkipped):
+            self.transpositionTable.store(
+                transpositionKey, remainingDepth, minScore, *searchWindow,
+                minMove, currentScore)
+
         return minScore, minMove
 
     def cutoff_test(self, state, depth):
@@ -270,20 +858,44 @@ class PacmanAgent(Agent):
         if state.isWin() or state.isLose():
             return True
 
-        if depth >= 10:
+        if depth >= self.depthLimit:
+            self.depthCutoffReached = True
             return True
 
         return False
 
-    def score_evaluation(self, state):
+    def find_evaluation_context(self):
+        """
+        This method returns what the heuristic evaluation of the states
+        depends on besides the states themselves: the potential next reached
+        state, whether it is a losing state, the number of times it has
+        already been reached and, if it is a losing state, the number of
+        calls to the get_action method.
+
+        Return:
+        -------
+        - The evaluation context, as a tuple.
+        """
+
+        timesReached = self.statesAlreadyReached.get(
+            self.currentNextMoveStateTuple, 0)
+        if self.currentNextMoveStateIsLose:
+            return (self.currentNextMoveStateTuple, True, timesReached,
+                    self.numberMoves)
+        return (self.currentNextMoveStateTuple, False, timesReached)
+
+    def score_evaluation(self, state, agentIndex=0):
         """
         This function computes the evaluated score corresponding to the
-        potential of the state.
+        potential of the state. With the `--tablebase` option, the states of
+        the tablebase are evaluated by their exact minimax value.
 
         Arguments:
         ----------
         - 'state': The state to be evaluated.
 
+        - 'agentIndex': The index of the agent to move in the state.
+
         Return:
         -------
         - The evaluated score.
@@ -292,6 +904,11 @@ class PacmanAgent(Agent):
         if state.isWin():
             return state.getScore()
 
+        if self.tablebase is not None:
+            value = self.tablebase.probe(state, agentIndex)
+            if value is not None:
+                return value
+
         return state.getScore() - self.find_total_penalties(state)
 
     def manhattan_distance(self, position1, position2):
@@ -328,31 +945,24 @@ class PacmanAgent(Agent):
         - The list of dots positions of the dots remaining on the layout.
         """
 
-        dotsPositions = []
-        foodMatrix = state.getFood()
-        i = 0
-        while i < foodMatrix.width:
-            j = 0
-            while j < foodMatrix.height:
-                if foodMatrix[i][j] == True:
-                    dotsPositions.append((i, j))
-                j += 1
-
-            i += 1
-
-        return dotsPositions
+        # The dots are read from the set bits of the food grid (see
+        # `BitGrid.asList`).
+        return state.getFood().asList()
 
-    def find_total_penalties(self, state):
+    def find_manhattan_chain(self, state):
         """
-        This method computes the penalties linked to the given state.
+        This method computes the cost of the chain of the remaining dots,
+        measured with Manhattan distances.
 
         Arguments:
         ----------
-        - 'state': The state whose penalties must be computed.
+        - 'state': The state whose chain must be computed.
 
         Return:
         -------
-        - The computed state penalties.
+        - The cost of the chain.
+
+        - The number of remaining dots.
         """
 
         dosPosWithMD = []
@@ -388,20 +998,43 @@ class PacmanAgent(Agent):
                 dosPosWithMD[i + 1][1], dosPosWithMD[i + 1][2])) * (len(dotsPositions) - 1 - i))
             i += 1
 
+        return totalDistanceManhattan, len(dotsPositions)
+
+    def find_total_penalties(self, state):
+        """
+        This method computes the penalties linked to the given state.
+
+        Arguments:
+        ----------
+        - 'state': The state whose penalties must be computed.
+
+        Return:
+        -------
+        - The computed state penalties.
+        """
+
+        # The cost of the chain of the remaining dots, from the cache with the
+        # `--evaluation maze` option.
+        if self.foodChain is not None:
+            totalDistance, numberDots = self.foodChain.getCost(
+                state.getPacmanPosition(), state.getFood())
+        else:
+            totalDistance, numberDots = self.find_manhattan_chain(state)
+
         # Additionnal penalties are put if the state has already been reached
         # before or if the state is a loosing state.
         if self.currentNextMoveStateTuple in self.statesAlreadyReached:
-            if self.currentNextMoveState.isLose():
-                return totalDistanceManhattan * len(dotsPositions) * (
+            if self.currentNextMoveStateIsLose:
+                return totalDistance * numberDots * (
                     self.statesAlreadyReached[self.currentNextMoveStateTuple] + 1) * (self.numberMoves + 1) + 1
 
             else:
-                return totalDistanceManhattan * \
-                    len(dotsPositions) * \
+                return totalDistance * \
+                    numberDots * \
                     (self.statesAlreadyReached[self.currentNextMoveStateTuple] + 1)
 
-        if self.currentNextMoveState.isLose():
-            return totalDistanceManhattan * \
-                len(dotsPositions) * (self.numberMoves + 1) + 1
+        if self.currentNextMoveStateIsLose:
+            return totalDistance * \
+                numberDots * (self.numberMoves + 1) + 1
 
-        return totalDistanceManhattan * len(dotsPositions)
+        return totalDistance * numberDots
@@ -0,0 +1,161 @@
+from pacman_module.game import Agent
+from pacman_module.pacman import GameState
+from pacman_module.rollouts import RolloutSimulator
+from pacman_module.rollouts import UCTSearch
+from pacman_module.rollouts import mergeTrees
+from pacman_module.rollouts import runUCTSearch
+
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+class PacmanAgent(Agent):
+    def __init__(self, args):
+        """
+        A Monte Carlo tree search agent: the moves of Pacman are searched by
+        playouts on a headless simulator of the game (see `UCTSearch` and
+        `RolloutSimulator`), for `--playouts` playouts per move, or for
+        `--movetime` milliseconds per move if given. The move played is the
+        most visited one, and the search of the next move starts from its
+        subtree.
+
+        With the `--workers` option, the playouts are shared out between
+        worker processes, each growing its own tree from the root, and the
+        trees are merged before the move is chosen. Each tree is then grown
+        from an empty root.
+
+        Arguments:
+        ----------
+        - `args`: Namespace of arguments from command-line prompt.
+        """
+        self.args = args
+
+        # The number of calls to the get_action method.
+        self.numberMoves = 0
+
+        # The number of playouts run and the time spent running them, in
+        # seconds, throughout the game.
+        self.playouts = 0
+        self.playoutTime = 0
+
+        # The pool of worker processes, started at the first call of the
+        # get_action method with the `--workers` option.
+        self.pool = None
+
+        # The subtree of the move played, from which the search of the next
+        # move starts.
+        self.nextRoot = None
+
+    def get_action(self, state):
+        """
+        Given a pacman game state, returns a legal move.
+
+        Arguments:
+        ----------
+        - `state`: the current game state. See FAQ and class
+                   `pacman.GameState`.
+
+        Return:
+        -------
+        - A legal move as defined in `game.Directions`.
+        """
+
+        simulator = RolloutSimulator(
+            state, self.args.ghostagent, self.args.probattack)
+
+        start = time.perf_counter()
+        deadline = math.inf
+        playouts = self.args.playouts
+        if self.args.movetime > 0:
+            deadline = start + self.args.movetime / 1000
+            playouts = math.inf
+
+        if self.args.workers > 1:
+            root, done = self.parallel_search(simulator, playouts, deadline)
+        else:
+            search = UCTSearch(simulator, self.numberMoves, self.nextRoot)
+            done = search.run(playouts, deadline)
+            root = search.root
+
+        self.playouts += done
+        self.playoutTime += time.perf_counter() - start
+        self.numberMoves += 1
+
+        # Without any playout, for lack of time or of expanded nodes, the
+        # first legal move of Pacman is played.
+        if not root.children:
+            self.nextRoot = None
+            return simulator.getActions(simulator.getStartState())[0][0]
+
+        move, self.nextRoot = max(root.children.items(),
+                                  key=lambda child: child[1].visits)
+        return move
+
+    def shutdown(self):
+        """
+        This method stops the worker processes of the parallel search, if
+        any. It is called once the game is over.
+        """
+
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def parallel_search(self, simulator, playouts, deadline):
+        """
+        This method runs the playouts in the worker processes, each from a
+        different random seed, and merges the trees they grow.
+
+        Arguments:
+        ----------
+        - 'simulator': The rollout simulator, starting from the current
+                       state.
+
+        - 'playouts': The number of playouts to run.
+
+        - 'deadline': The time.perf_counter() value at which to stop.
+
+        Return:
+        -------
+        - The root of the merged tree.
+
+        - The number of playouts run.
+        """
+
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(
+                self.args.workers,
+                mp_context=multiprocessing.get_context('fork'))
+
+        workers = self.args.workers
+        tasks = []
+        for i in range(workers):
+            share = playouts
+            if playouts != math.inf:
+                share = playouts // workers + (i < playouts % workers)
+            seed = self.numberMoves * workers + i
+            tasks.append(self.pool.submit(
+                runUCTSearch, simulator, seed, share, deadline))
+
+        root = None
+        done = 0
+        for task in tasks:
+            tree, treePlayouts, expanded = task.result()
+            GameState.countExpanded += expanded
+            done += treePlayouts
+            if root is None:
+                root = tree
+            else:
+                mergeTrees(root, tree)
+
+        return root, done
+
+    def get_playouts_per_second(self):
+        """
+        Returns the number of playouts run per second throughout the game.
+        """
+        if self.playoutTime == 0:
+            return 0.0
+        return self.playouts / self.playoutTime
@@ -37,6 +37,41 @@ class PacmanAgent(Agent):
 
         return maxMove
 
+    def successors(self, state, agentIndex):
+        """
+        Returns a generator over the pairs of successor states and moves of
+        the given state for the given agent.
+
+        With the `--inplace` option, the successors are the state itself,
+        moved and restored in place (see `GameState.inPlaceSuccessors`), so
+        that no state is allocated during the search. With the `--lazy`
+        option, each successor state is only generated when it is pulled
+        (see `GameState.iterPacmanSuccessors`).
+
+        Arguments:
+        ----------
+        - 'state': The state to expand.
+
+        - 'agentIndex': The index of the agent to move.
+
+        Return:
+        -------
+        - A generator of (successor, move) pairs.
+        """
+
+        if self.args.inplace:
+            return state.inPlaceSuccessors(agentIndex)
+
+        if self.args.lazy:
+            if agentIndex == 0:
+                return state.iterPacmanSuccessors()
+            return state.iterGhostSuccessors(agentIndex)
+
+        if agentIndex == 0:
+            return (s for s in state.generatePacmanSuccessors())
+
+        return (s for s in state.generateGhostSuccessors(agentIndex))
+
     def minimax_player_max(self, currentState):
         """
         This function computes the minimax value when the next move is done by
@@ -61,23 +96,24 @@ class PacmanAgent(Agent):
         # since the minimum score is unbounded.
         currentStateInfo = (
             currentState.getPacmanPosition(),
-            currentState.getGhostPositions()[0],
+            tuple(currentState.getGhostPositions()),
             currentState.getFood(),
-            True)
+            0)
         self.statesAlreadyPassedFromRoot.add(currentStateInfo)
 
         maxScore = -math.inf
         maxMove = Directions.STOP
 
-        for successor in currentState.generatePacmanSuccessors():
+        successors = self.successors(currentState, 0)
+        for successor in successors:
             nextState = successor[0]
             nextMove = successor[1]
 
             nextStateInfo = (
                 nextState.getPacmanPosition(),
-                nextState.getGhostPositions()[0],
+                tuple(nextState.getGhostPositions()),
                 nextState.getFood(),
-                False)
+                1)
 
             # If the state has already been passed in the path from the actual
             # state to the current state expanded, then we do not pass again
@@ -98,15 +134,18 @@ class PacmanAgent(Agent):
 
         return maxScore, maxMove
 
-    def minimax_player_min(self, currentState):
+    def minimax_player_min(self, currentState, agentIndex=1):
         """
         This function computes the minimax value when the next move is done by
-        the ghost (min player)
+        a ghost (min player). The ghosts move one after the other, each one in
+        its own min layer, before Pacman moves again.
 
         Arguments:
         ----------
         - 'currentState': The state to expand.
 
+        - 'agentIndex': The index of the ghost to move.
+
         Return:
         -------
         - 'minScore': The minimum score found.
@@ -121,29 +160,38 @@ class PacmanAgent(Agent):
         # since the minimum score is unbounded.
         currentStateInfo = (
             currentState.getPacmanPosition(),
-            currentState.getGhostPositions()[0],
+            tuple(currentState.getGhostPositions()),
             currentState.getFood(),
-            False)
+            agentIndex)
         self.statesAlreadyPassedFromRoot.add(currentStateInfo)
 
         minScore = math.inf
         minMove = Directions.STOP
 
-        for successor in currentState.generateGhostSuccessors(1):
+        # The agent moving after this ghost, Pacman after the last one.
+        nextAgentIndex = (agentIndex + 1) % currentState.getNumAgents()
+
+        successors = self.successors(currentState, agentIndex)
+        for successor in successors:
             nextState = successor[0]
             nextMove = successor[1]
 
             nextStateInfo = (
                 nextState.getPacmanPosition(),
-                nextState.getGhostPositions()[0],
+                tuple(nextState.getGhostPositions()),
                 nextState.getFood(),
-                True)
+                nextAgentIndex)
 
             # If the state has already been passed in the path from the actual
             # state to the current state expanded, then we do not pass again
             # on it.
             if nextStateInfo not in self.statesAlreadyPassedFromRoot:
-                resultScore, resultMove = self.minimax_player_max(nextState)
+                if nextAgentIndex == 0:
+                    resultScore, resultMove = self.minimax_player_max(
+                        nextState)
+                else:
+                    resultScore, resultMove = self.minimax_player_min(
+                        nextState, nextAgentIndex)
 
             else:
                 resultScore = (-math.inf)
@@ -0,0 +1,78 @@
+# foodChain.py
+# ------------
+# Incremental cost of the chain of the dots evaluated by the h-minimax agent.
+
+
+from collections import OrderedDict
+
+# The maximum number of chain costs kept in the cache
+CHAIN_CACHE_SIZE = 1 << 16
+
+
+class FoodChain:
+    """
+    The cost of the greedy chain through the remaining dots evaluated by the
+    h-minimax agent, measured with maze distances: the distance from Pacman
+    to the closest dot weighted by the number of dots, plus the distance
+    between each dot and the next one, the dots being sorted by distance from
+    Pacman, weighted by the number of dots after it.
+
+    The dots of the food grid the chain is created with are sorted once by
+    distance from every cell. Since dots are only ever eaten, the sorted
+    remaining dots of a state are then these dots filtered by the food
+    bitmask, without computing or sorting any distance. The costs are kept
+    in a bounded cache indexed by the (cell, food bitmask) pair, shared by
+    all the states that only differ by the ghosts, so that most evaluations
+    are a dictionary lookup.
+    """
+
+    def __init__(self, food, mazeDistances, cacheSize=CHAIN_CACHE_SIZE):
+        self.cellIndex = mazeDistances.cellIndex
+        self.cacheSize = cacheSize
+        self.chainCosts = OrderedDict()
+
+        # The maze distances between cells, by cell index
+        self.rows = [mazeDistances.getDistances(position)
+                     for position in mazeDistances.cells]
+
+        # The (cell index, food bit, position) triples of the dots
+        dots = []
+        for x, y in food.asList():
+            dots.append((self.cellIndex[(x, y)], 1 << (x * food.height + y),
+                         (x, y)))
+
+        # The (distance, cell index, food bit) triples of the dots sorted by
+        # distance from each cell, ties being broken by position
+        self.sortedDots = []
+        for distances in self.rows:
+            sortedDots = sorted(
+                dots, key=lambda dot: (distances[dot[0]], dot[2]))
+            self.sortedDots.append(
+                [(distances[cell], cell, bit) for cell, bit, _ in sortedDots])
+
+    def getCost(self, position, food):
+        """
+        Returns the (chain cost, number of dots) pair of Pacman standing on
+        position with the given food grid, which must hold at least one dot.
+        """
+        cell = self.cellIndex[position]
+        bits = food.bits
+        key = (cell, bits)
+        result = self.chainCosts.get(key)
+        if result is not None:
+            self.chainCosts.move_to_end(key)
+            return result
+
+        dots = [dot for dot in self.sortedDots[cell] if bits & dot[2]]
+        numberDots = len(dots)
+        cost = dots[0][0] * numberDots
+        rows = self.rows
+        for i in range(numberDots - 1):
+            cost += (rows[dots[i][1]][dots[i + 1][1]] *
+                     (numberDots - 1 - i))
+
+        result = (cost, numberDots)
+        self.chainCosts[key] = result
+        if len(self.chainCosts) > self.cacheSize:
+            self.chainCosts.popitem(last=False)
+        return result
@@ -0,0 +1,38 @@
+# ghostReduction.py
+# -----------------
+# Reduction of the ghosts searched by the adversarial search agents.
+
+
+from .moveOrdering import staticMoveKey
+from .util import manhattanDistance
+
+
+def isSearchedGhost(state, agentIndex, numberSearched):
+    """
+    Returns whether all the moves of a ghost are searched when only the
+    numberSearched ghosts closest to Pacman (in Manhattan distance, ties
+    being broken by index) are, all of them being searched if numberSearched
+    is 0.
+    """
+    if numberSearched == 0 or numberSearched >= state.getNumAgents() - 1:
+        return True
+
+    pacmanPosition = state.getPacmanPosition()
+    positions = state.getGhostPositions()
+    distance = manhattanDistance(positions[agentIndex - 1], pacmanPosition)
+    closerGhosts = 0
+    for i, position in enumerate(positions, 1):
+        ghostDistance = manhattanDistance(position, pacmanPosition)
+        if ghostDistance < distance or (
+                ghostDistance == distance and i < agentIndex):
+            closerGhosts += 1
+    return closerGhosts < numberSearched
+
+
+def getReducedActions(state, agentIndex):
+    """
+    Returns the only move searched for a ghost whose moves are not all
+    searched: its legal move bringing it closest to Pacman, as a list.
+    """
+    return [min(state.getLegalActions(agentIndex),
+                key=lambda action: staticMoveKey(state, agentIndex, action))]
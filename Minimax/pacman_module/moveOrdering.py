@@ -0,0 +1,104 @@
+# moveOrdering.py
+# ---------------
+# Move ordering for the alpha-beta search agents.
+
+
+from .game import Actions
+from .util import manhattanDistance
+
+
+def staticMoveKey(state, agentIndex, action):
+    """
+    Returns a cheap static estimate of how good a move is for the agent
+    making it, lower being better: Pacman first tries the moves eating a
+    dot, and a ghost the moves bringing it closest to Pacman.
+    """
+    if agentIndex == 0:
+        x, y = Actions.getSuccessor(state.getPacmanPosition(), action)
+        if state.hasFood(int(x), int(y)):
+            return 0
+        return 1
+    position = Actions.getSuccessor(state.getGhostPosition(agentIndex), action)
+    return manhattanDistance(position, state.getPacmanPosition())
+
+
+class MoveOrdering:
+    """
+    Orders the moves of a node so that the ones most likely to cause a
+    cutoff are searched first:
+
+     1. the moves given by the caller, e.g. the best move stored in the
+        transposition table or the one of the principal variation;
+     2. the killer moves of the depth, i.e. the last two moves that caused
+        a cutoff at that depth in another node;
+     3. the other moves, by decreasing history score, i.e. how often and
+        how deep the move of the agent from its cell caused a cutoff;
+     4. then by the static key, staticMoveKey by default.
+
+    It also counts the nodes where a cutoff happened, and how many of them
+    had it at their first child, which measures the quality of the ordering.
+    """
+
+    def __init__(self, staticKey=staticMoveKey):
+        self.staticKey = staticKey
+        self.killers = {}
+        self.history = {}
+        self.cutoffNodes = 0
+        self.firstChildCutoffs = 0
+
+    def newSearch(self):
+        """
+        Forgets the killer moves, which are only relevant to a search, and
+        ages the history scores.
+        """
+        self.killers = {}
+        for move in self.history:
+            self.history[move] //= 2
+
+    def orderActions(self, state, agentIndex, position, depth, actions,
+                     firstMoves=()):
+        """
+        Returns the given legal actions of an agent, standing on position at
+        the given depth of the search, sorted.
+        """
+        killers = self.killers.get(depth, ())
+        history = self.history
+        staticKey = self.staticKey
+
+        def key(action):
+            if action in firstMoves:
+                return (0, firstMoves.index(action))
+            if action in killers:
+                return (1, killers.index(action))
+            return (2, -history.get((agentIndex, position, action), 0),
+                    staticKey(state, agentIndex, action))
+
+        return sorted(actions, key=key)
+
+    def recordCutoff(self, agentIndex, position, depth, action,
+                     remainingDepth, childIndex):
+        """
+        Records that the move of an agent, standing on position at the given
+        depth of the search, caused a cutoff at the childIndex-th child of
+        the node, which was searched remainingDepth plies deep.
+        """
+        self.cutoffNodes += 1
+        if childIndex == 0:
+            self.firstChildCutoffs += 1
+
+        killers = self.killers.setdefault(depth, [])
+        if action not in killers:
+            killers.insert(0, action)
+            del killers[2:]
+
+        move = (agentIndex, position, action)
+        self.history[move] = (self.history.get(move, 0) +
+                              remainingDepth * remainingDepth)
+
+    def getFirstChildCutoffRate(self):
+        """
+        Returns the fraction of the cutoffs that happened at the first child.
+        """
+        if self.cutoffNodes == 0:
+            return 0.0
+        return self.firstChildCutoffs / self.cutoffNodes
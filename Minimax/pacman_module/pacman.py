@@ -43,6 +43,7 @@ from .game import GameStateData
 from .game import Game
 from .game import Directions
 from .game import Actions
+from .game import Configuration
 from .util import nearestPoint
 from .util import manhattanDistance
 from . import textDisplay, graphicsDisplay
@@ -72,6 +73,7 @@ class GameState:
 
     Note that in classic Pacman, Pacman is always agent 0.
     """
+    __slots__ = ('data', '_undoStack')
 
     ####################################################
     # Accessor methods: use these to access state data #
@@ -119,29 +121,110 @@ class GameState:
 
         # Copy current state
         state = GameState(self)
+        state._applyRules(agentIndex, action)
 
+        GameState.explored.add(self)
+        GameState.explored.add(state)
+        return state
+
+    def _applyRules(self, agentIndex, action):
+        """
+        Edits the state to reflect the effects of the specified agent taking
+        the action.
+        """
         # Let agent's logic deal with its action's effects on the board
         if agentIndex == 0:  # Pacman is moving
-            state.data._eaten = [False for i in range(state.getNumAgents())]
-            PacmanRules.applyAction(state, action)
+            self.data._eaten = [False] * self.getNumAgents()
+            PacmanRules.applyAction(self, action)
         else:                # A ghost is moving
-            GhostRules.applyAction(state, action, agentIndex)
+            GhostRules.applyAction(self, action, agentIndex)
 
         # Time passes
         if agentIndex == 0:
-            state.data.scoreChange += -TIME_PENALTY  # Penalty for waiting around
+            self.data.scoreChange += -TIME_PENALTY  # Penalty for waiting around
         else:
-            GhostRules.decrementTimer(state.data.agentStates[agentIndex])
+            GhostRules.decrementTimer(self, agentIndex)
 
         # Resolve multi-agent effects
-        GhostRules.checkDeath(state, agentIndex)
+        GhostRules.checkDeath(self, agentIndex)
 
         # Book keeping
-        state.data._agentMoved = agentIndex
-        state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
-        return state
+        self.data._agentMoved = agentIndex
+        self.data.score += self.data.scoreChange
+
+    def apply(self, agentIndex, action):
+        """
+        Moves the specified agent in place, with the same effects as
+        generateSuccessor, and remembers how to revert the move with undo().
+
+        No state is allocated: the undo stack only keeps the configuration and
+        scared timer of the agents the move may affect, the previous food grid
+        and capsules (which are never modified in place), the score and the
+        state hash.
+        """
+        if self.isWin() or self.isLose():
+            raise Exception('Can\'t generate a successor of a terminal state.')
+
+        data = self.data
+        agentStates = data.agentStates
+
+        # Pacman eating a capsule or a scared ghost affects the other agents
+        affected = (agentIndex,)
+        if agentIndex == 0:
+            if data.capsules:
+                affected = range(len(agentStates))
+            else:
+                for ghostState in agentStates[1:]:
+                    if ghostState.scaredTimer > 0:
+                        affected = range(len(agentStates))
+                        break
+        saved = [(index,
+                  agentStates[index].configuration,
+                  agentStates[index].scaredTimer) for index in affected]
+
+        eaten = data._eaten
+        if agentIndex != 0 and agentStates[agentIndex].scaredTimer > 0:
+            # The ghost may be eaten, which is recorded in place
+            data._eaten = eaten[:]
+
+        self._undoStack.append((
+            saved,
+            data.food,
+            data.capsules,
+            data.score,
+            data.scoreChange,
+            data._hash,
+            eaten,
+            data._agentMoved,
+            data._foodEaten,
+            data._capsuleEaten))
+
+        data.scoreChange = 0
+        data._foodEaten = None
+        data._capsuleEaten = None
+        self._applyRules(agentIndex, action)
+
+    def undo(self):
+        """
+        Reverts the last move made with apply().
+        """
+        data = self.data
+        (saved,
+         data.food,
+         data.capsules,
+         data.score,
+         data.scoreChange,
+         data._hash,
+         data._eaten,
+         data._agentMoved,
+         data._foodEaten,
+         data._capsuleEaten) = self._undoStack.pop()
+        for index, configuration, scaredTimer in saved:
+            agentState = data.agentStates[index]
+            agentState.configuration = configuration
+            agentState.scaredTimer = scaredTimer
+        data._win = False
+        data._lose = False
 
     def getLegalPacmanActions(self):
         return self.getLegalActions(0)
@@ -172,6 +255,72 @@ class GameState:
 
         return [(self.generateSuccessor(index, action),action) for action in self.getLegalActions(index) if action != Directions.STOP]
 
+    def iterPacmanSuccessors(self, actions=None):
+        """
+        Returns a generator over the pairs of successor states and moves for
+        the pacman agent, like generatePacmanSuccessors, except that each
+        successor state is only generated when it is pulled, so that a caller
+        leaving the loop early does not pay for the remaining ones.
+
+        The expansion is counted, or refused by returning None, when this
+        method is called, exactly like with generatePacmanSuccessors.
+
+        The successors follow the order of actions, the legal actions of the
+        agent reordered by the caller, if given.
+        """
+        if (GameState.countExpanded >= GameState.maximumExpanded):
+            return None
+        GameState.countExpanded += 1
+        return self._iterSuccessors(0, actions)
+
+    def iterGhostSuccessors(self, index, actions=None):
+        """
+        Returns a generator over the pairs of successor states and moves for
+        the ghost agent (>0), like generateGhostSuccessors, each successor
+        state being only generated when it is pulled (see
+        iterPacmanSuccessors).
+        """
+        if (GameState.countExpanded >= GameState.maximumExpanded or index == 0):
+            return None
+        GameState.countExpanded += 1
+        return self._iterSuccessors(index, actions)
+
+    def _iterSuccessors(self, agentIndex, actions):
+        if actions is None:
+            actions = self.getLegalActions(agentIndex)
+        for action in actions:
+            if action != Directions.STOP:
+                yield self.generateSuccessor(agentIndex, action), action
+
+    def inPlaceSuccessors(self, agentIndex, actions=None):
+        """
+        Yields pairs of successor states and moves for the specified agent,
+        like generatePacmanSuccessors and generateGhostSuccessors, without
+        allocating any state: each successor is this state moved in place with
+        apply(), which is reverted with undo() when the next pair is pulled or
+        when the generator is closed.
+
+        A successor must therefore not be kept after the next pair is pulled,
+        and a caller leaving the loop early must close() the generator.
+
+        The successors follow the order of actions, the legal actions of the
+        agent reordered by the caller, if given.
+        """
+        if (GameState.countExpanded >= GameState.maximumExpanded):
+            return
+        GameState.countExpanded += 1
+
+        if actions is None:
+            actions = self.getLegalActions(agentIndex)
+        for action in actions:
+            if action == Directions.STOP:
+                continue
+            self.apply(agentIndex, action)
+            try:
+                yield self, action
+            finally:
+                self.undo()
+
     def getPacmanState(self):
         """
         Returns an AgentState object for pacman (in game.py)
@@ -264,6 +413,7 @@ class GameState:
             self.data = GameStateData(prevState.data)
         else:
             self.data = GameStateData()
+        self._undoStack = []
 
     def deepCopy(self):
         state = GameState(self)
@@ -385,16 +535,24 @@ class PacmanRules:
         """
         Returns a list of possible actions.
         """
-        return Actions.getPossibleActions(
-            state.getPacmanState().configuration,
-            state.data.layout.walls)
+        configuration = state.data.agentStates[0].configuration
+        legal = state.data.layout.legalActions.get(configuration.pos)
+        if legal is None:
+            return Actions.getPossibleActions(
+                configuration, state.data.layout.walls)
+        return list(legal)
     getLegalActions = staticmethod(getLegalActions)
 
     def applyAction(state, action):
         """
         Edits the state to reflect the results of the action.
         """
-        legal = PacmanRules.getLegalActions(state)
+        # The move table of the layout is read directly, without the copy
+        # made by getLegalActions.
+        legal = state.data.layout.legalActions.get(
+            state.data.agentStates[0].configuration.pos)
+        if legal is None:
+            legal = PacmanRules.getLegalActions(state)
         if action not in legal:
             raise Exception("Illegal action " + str(action))
 
@@ -402,8 +560,8 @@ class PacmanRules:
 
         # Update Configuration
         vector = Actions.directionToVector(action, PacmanRules.PACMAN_SPEED)
-        pacmanState.configuration = pacmanState.configuration.generateSuccessor(
-            vector)
+        state.data.moveAgent(
+            0, pacmanState.configuration.generateSuccessor(vector))
 
         # Eat
         next = pacmanState.configuration.getPosition()
@@ -418,8 +576,7 @@ class PacmanRules:
         # Eat food
         if state.data.food[x][y]:
             state.data.scoreChange += 10
-            state.data.food = state.data.food.copy()
-            state.data.food[x][y] = False
+            state.data.removeFood(x, y)
             state.data._foodEaten = position
             # TODO: cache numFood?
             numFood = state.getNumFood()
@@ -428,7 +585,7 @@ class PacmanRules:
                 state.data._win = True
         # Eat capsule
         if(position in state.getCapsules()):
-            state.data.capsules.remove(position)
+            state.data.removeCapsule(position)
             state.data._capsuleEaten = position
             # Reset all ghosts' scared timers
             for index in range(1, len(state.data.agentStates)):
@@ -448,6 +605,11 @@ class GhostRules:
         reach a dead end, but can turn 90 degrees at intersections.
         """
         conf = state.getGhostState(ghostIndex).configuration
+        legal = state.data.layout.ghostLegalActions.get(conf.pos)
+        if legal is not None:
+            return list(legal[conf.direction])
+
+        # In between grid points, the ghost must continue straight
         possibleActions = Actions.getPossibleActions(
             conf, state.data.layout.walls)
         reverse = Actions.reverseDirection(conf.direction)
@@ -460,7 +622,14 @@ class GhostRules:
 
     def applyAction(state, action, ghostIndex):
 
-        legal = GhostRules.getLegalActions(state, ghostIndex)
+        # The move table of the layout is read directly, without the copy
+        # made by getLegalActions.
+        conf = state.data.agentStates[ghostIndex].configuration
+        legal = state.data.layout.ghostLegalActions.get(conf.pos)
+        if legal is None:
+            legal = GhostRules.getLegalActions(state, ghostIndex)
+        else:
+            legal = legal[conf.direction]
         if action not in legal:
             raise Exception("Illegal ghost action " + str(action))
 
@@ -469,15 +638,17 @@ class GhostRules:
         if ghostState.scaredTimer > 0:
             speed /= 2.0
         vector = Actions.directionToVector(action, speed)
-        ghostState.configuration = ghostState.configuration.generateSuccessor(
-            vector)
+        state.data.moveAgent(
+            ghostIndex, ghostState.configuration.generateSuccessor(vector))
     applyAction = staticmethod(applyAction)
 
-    def decrementTimer(ghostState):
+    def decrementTimer(state, ghostIndex):
+        ghostState = state.data.agentStates[ghostIndex]
         timer = ghostState.scaredTimer
         if timer == 1:
-            ghostState.configuration.pos = nearestPoint(
-                ghostState.configuration.pos)
+            configuration = ghostState.configuration
+            state.data.moveAgent(ghostIndex, Configuration(
+                nearestPoint(configuration.pos), configuration.direction))
         ghostState.scaredTimer = max(0, timer - 1)
     decrementTimer = staticmethod(decrementTimer)
 
@@ -499,7 +670,7 @@ class GhostRules:
     def collide(state, ghostState, agentIndex):
         if ghostState.scaredTimer > 0:
             state.data.scoreChange += 200
-            GhostRules.placeGhost(state, ghostState)
+            GhostRules.placeGhost(state, agentIndex)
             ghostState.scaredTimer = 0
             # Added for first-person
             state.data._eaten[agentIndex] = True
@@ -515,8 +686,9 @@ class GhostRules:
             pacmanPosition) <= COLLISION_TOLERANCE
     canKill = staticmethod(canKill)
 
-    def placeGhost(state, ghostState):
-        ghostState.configuration = ghostState.start
+    def placeGhost(state, ghostIndex):
+        ghostState = state.data.agentStates[ghostIndex]
+        state.data.moveAgent(ghostIndex, ghostState.start)
     placeGhost = staticmethod(placeGhost)
 
 #############################
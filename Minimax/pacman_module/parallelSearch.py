@@ -0,0 +1,204 @@
+# parallelSearch.py
+# -----------------
+# Root-parallel search for the alpha-beta search agents.
+
+
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+
+from .pacman import GameState
+
+# The maximum number of legal actions of Pacman, i.e. of root moves
+MAXIMUM_ROOT_MOVES = 5
+
+# The number of nodes a worker process expands between two publications of
+# its count to the other processes
+EXPANDED_SYNC_NODES = 64
+
+# The agent, the shared root results and the shared number of nodes expanded
+# by the workers of a worker process, set when the process starts
+WORKER_AGENT = None
+WORKER_RESULTS = None
+WORKER_EXPANDED = None
+
+
+def getBound(result):
+    """
+    Returns the alpha bound given by the result of a root move. A value of
+    +infinity means that the move only led back to states of the path
+    searched, and bounds nothing.
+    """
+    if result[0] == math.inf:
+        return -math.inf
+    return result[0]
+
+
+def initializeWorker(agent, results, expanded):
+    """
+    Initializes a worker process with its copy of the agent, the shared
+    array of the results of the root moves and the shared number of nodes
+    expanded by the workers.
+    """
+    global WORKER_AGENT, WORKER_RESULTS, WORKER_EXPANDED
+    WORKER_AGENT = agent
+    WORKER_RESULTS = results
+    WORKER_EXPANDED = expanded
+
+
+def addWorkerExpanded(count):
+    """
+    Adds count nodes to the number of nodes expanded by all the workers
+    during the current search, and returns this number. It is called from a
+    worker process, so that the node budget of a search is shared between
+    the workers.
+    """
+    with WORKER_EXPANDED.get_lock():
+        WORKER_EXPANDED.value += count
+        return WORKER_EXPANDED.value
+
+
+def searchRootMove(context, state, nextState, nextMove, index):
+    """
+    Searches the subtree of a root move in a worker process.
+
+    The alpha bound of the search is the best result of the root moves
+    preceding this one that are already known when the task starts.
+
+    Return:
+    -------
+    - The (result, number of expanded nodes, number of cutoff nodes, number
+      of first child cutoffs) tuple, where result is returned by the
+      `search_root_move` method of the agent.
+    """
+    with WORKER_RESULTS.get_lock():
+        maxValue = max(WORKER_RESULTS[:index], default=-math.inf)
+
+    WORKER_AGENT.set_search_context(context)
+    moveOrdering = WORKER_AGENT.moveOrdering
+    expanded = GameState.countExpanded
+    cutoffNodes = moveOrdering.cutoffNodes
+    firstChildCutoffs = moveOrdering.firstChildCutoffs
+    result = WORKER_AGENT.search_root_move(state, nextState, nextMove,
+                                           maxValue)
+    return (result, GameState.countExpanded - expanded,
+            moveOrdering.cutoffNodes - cutoffNodes,
+            moveOrdering.firstChildCutoffs - firstChildCutoffs)
+
+
+class RootSplitSearch:
+    """
+    Splits the search of a state of the max player over the subtrees of its
+    moves, searched by a pool of worker processes.
+
+    Following the Young Brothers Wait principle, the first move, i.e. the
+    one most likely to be the best, is searched first in the calling process
+    to get an alpha bound, then the other moves are searched in parallel.
+    Every task starts with the best result of the moves preceding it that
+    is known at that time, published by the calling process through a
+    shared array. Since only preceding moves are used, the best move found
+    is the one of a sequential search, whatever the timing of the tasks, as
+    long as the agent has no transposition table. Otherwise, each worker
+    probes and fills its own copy of the table, taken when the process is
+    forked, so the values reused differ from the ones of a sequential
+    search, and so may the best move.
+
+    The number of nodes expanded by the workers during a search is shared
+    through a counter, to which each worker adds its own count every
+    EXPANDED_SYNC_NODES nodes (see `addWorkerExpanded`), so that a node
+    budget can be enforced over all the workers. The budget may then be
+    exceeded by up to EXPANDED_SYNC_NODES nodes per task.
+
+    The agent must implement:
+     - `search_root_move(state, nextState, nextMove, maxValue)`, searching
+       the subtree of a root move with the given alpha bound and returning
+       a tuple whose first element is the value found;
+     - `get_search_context()` and `set_search_context(context)`, the state
+       of the agent a worker needs to search like the calling process;
+     - a `moveOrdering` attribute (see `MoveOrdering`), to which the
+       cutoffs counted by the workers are added.
+
+    The worker processes are forked, with a copy of the agent, the first
+    time a search is run, and must be stopped with `shutdown`.
+    """
+
+    def __init__(self, agent, workers):
+        self.agent = agent
+        self.workers = workers
+        self.pool = None
+        self.results = None
+        self.expanded = None
+
+    def start(self):
+        """
+        Starts the worker processes.
+        """
+        context = multiprocessing.get_context('fork')
+        self.results = context.Array('d', MAXIMUM_ROOT_MOVES)
+        self.expanded = context.Value('q', 0)
+        self.pool = ProcessPoolExecutor(
+            self.workers, mp_context=context, initializer=initializeWorker,
+            initargs=(self.agent, self.results, self.expanded))
+
+    def shutdown(self):
+        """
+        Stops the worker processes.
+        """
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def search(self, state, successors):
+        """
+        Searches the given successors of a state of the max player.
+
+        Arguments:
+        ----------
+        - 'state': The state to search from.
+
+        - 'successors': The list of (successor, move) pairs of the state, in
+                        the order in which a sequential search would try
+                        them.
+
+        Return:
+        -------
+        - The list of the results of the moves, in the order of successors,
+          as returned by `search_root_move`.
+        """
+        if self.pool is None:
+            self.start()
+
+        with self.results.get_lock():
+            for i in range(MAXIMUM_ROOT_MOVES):
+                self.results[i] = -math.inf
+        with self.expanded.get_lock():
+            self.expanded.value = 0
+
+        results = [None] * len(successors)
+        nextState, nextMove = successors[0]
+        results[0] = self.agent.search_root_move(
+            state, nextState, nextMove, -math.inf)
+        with self.results.get_lock():
+            self.results[0] = getBound(results[0])
+
+        context = self.agent.get_search_context()
+        tasks = {}
+        for i in range(1, len(successors)):
+            nextState, nextMove = successors[i]
+            task = self.pool.submit(searchRootMove, context, state,
+                                    nextState, nextMove, i)
+            tasks[task] = i
+
+        moveOrdering = self.agent.moveOrdering
+        for task in as_completed(tasks):
+            i = tasks[task]
+            results[i], expanded, cutoffNodes, firstChildCutoffs = \
+                task.result()
+            GameState.countExpanded += expanded
+            moveOrdering.cutoffNodes += cutoffNodes
+            moveOrdering.firstChildCutoffs += firstChildCutoffs
+            with self.results.get_lock():
+                self.results[i] = getBound(results[i])
+
+        return results
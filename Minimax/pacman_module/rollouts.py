@@ -0,0 +1,373 @@
+# rollouts.py
+# -----------
+# Headless game simulator and Monte Carlo tree search for the MCTS agent.
+
+
+import math
+import random
+import time
+
+from .game import Actions
+from .game import Directions
+from .mazeDistances import getMazeDistances
+from .pacman import GameState
+from .pacman import TIME_PENALTY
+from .util import manhattanDistance
+
+# The number of moves of Pacman simulated by a rollout beyond the tree
+ROLLOUT_DEPTH = 30
+
+# The probability that Pacman heads for the closest dot at each move of a
+# rollout
+ROLLOUT_GREED = 0.8
+
+# The exploration constant of the UCT selection, in points
+EXPLORATION_CONSTANT = 200
+
+# The discount factor of the rewards, per move of Pacman
+DISCOUNT = 0.98
+
+# Scores of the events of the game
+FOOD_POINTS = 10
+WIN_POINTS = 500
+LOSE_POINTS = 500
+
+
+class RolloutSimulator:
+    """
+    A stripped-down simulator of the game without capsules, for the
+    rollouts of the MCTS agent.
+
+    A state is a (cell, food, ghosts) tuple, where cells are indices of open
+    cells, food is a bitmask whose bit i is set if the i-th dot of the state
+    the simulator is created with remains, and ghosts is the tuple of the
+    (cell, direction) pairs of the ghosts, by index.
+    Moves are read from tables computed once from the move tables of the
+    layout, so that a step only costs a few integer operations, while the
+    moves are the ones the game engine would allow, in the same order.
+
+    Each ghost follows a model of the ghost agent given by ghostPolicy:
+     - "greedy": the move of GreedyGhost bringing it closest to Pacman (in
+       Manhattan distance) with probability probAttack, a random move
+       otherwise;
+     - "dumby": the move of DumbyGhost, turning left whenever it can;
+     - "smarty": the move bringing it closest to Pacman in maze distance,
+       which is where the path search of SmartyGhost leads it.
+    """
+
+    def __init__(self, state, ghostPolicy="greedy", probAttack=1.0):
+        layout = state.data.layout
+        walls = layout.walls
+        self.ghostPolicy = ghostPolicy
+        self.probAttack = probAttack
+
+        # Positions of the open cells, by index
+        self.cells = []
+        for x in range(walls.width):
+            for y in range(walls.height):
+                if not walls[x][y]:
+                    self.cells.append((x, y))
+        self.cellIndex = {}
+        for i, position in enumerate(self.cells):
+            self.cellIndex[position] = i
+
+        # The (action, next cell) pairs of Pacman on each cell, and of the
+        # ghost on each cell, by direction
+        self.pacmanMoves = []
+        self.ghostMoves = []
+        for position in self.cells:
+            self.pacmanMoves.append(tuple(
+                (action,
+                 self.cellIndex[Actions.getSuccessor(position, action)])
+                for action in layout.legalActions[position]
+                if action != Directions.STOP))
+            ghostMoves = {}
+            for direction, actions in layout.ghostLegalActions[
+                    position].items():
+                ghostMoves[direction] = tuple(
+                    (action,
+                     self.cellIndex[Actions.getSuccessor(position, action)])
+                    for action in actions)
+            self.ghostMoves.append(ghostMoves)
+
+        # The bit of the dot on each cell, 0 if there is none, and the
+        # (cell, bit) pairs of the dots
+        self.dotBits = [0] * len(self.cells)
+        self.dots = []
+        dots = state.getFood().asList()
+        for i, position in enumerate(dots):
+            self.dotBits[self.cellIndex[position]] = 1 << i
+            self.dots.append((self.cellIndex[position], 1 << i))
+
+        # The maze distances between cells, by cell index
+        mazeDistances = getMazeDistances(layout)
+        self.distances = [
+            mazeDistances.getDistances(position) for position in self.cells]
+
+        ghosts = []
+        for agentIndex in range(1, state.getNumAgents()):
+            ghostState = state.getGhostState(agentIndex)
+            x, y = ghostState.getPosition()
+            ghosts.append((self.cellIndex[(int(x), int(y))],
+                           ghostState.configuration.direction))
+        self.startState = (
+            self.cellIndex[state.getPacmanPosition()],
+            (1 << len(dots)) - 1,
+            tuple(ghosts))
+
+    def getStartState(self):
+        return self.startState
+
+    def getActions(self, state):
+        """
+        Returns the (action, next cell) pairs of Pacman in the state.
+        """
+        return self.pacmanMoves[state[0]]
+
+    def getGhostMove(self, cell, ghost, rng):
+        """
+        Returns the (action, next cell) pair of the ghost with the given
+        (cell, direction) pair, Pacman being on cell, drawn from the ghost
+        model with the given random generator.
+        """
+        ghostCell, ghostDirection = ghost
+        moves = self.ghostMoves[ghostCell][ghostDirection]
+
+        if self.ghostPolicy == "dumby":
+            legal = [action for action, nextCell in moves]
+            current = ghostDirection
+            if current == Directions.STOP:
+                current = Directions.NORTH
+            left = Directions.LEFT[current]
+            for action in (left, current, Directions.RIGHT[current],
+                           Directions.LEFT[left]):
+                if action in legal:
+                    return moves[legal.index(action)]
+            return moves[0]
+
+        if self.ghostPolicy == "smarty":
+            distances = self.distances[cell]
+            return min(moves, key=lambda move: distances[move[1]])
+
+        if rng.random() >= self.probAttack:
+            return rng.choice(moves)
+        pacmanPosition = self.cells[cell]
+        return min(moves, key=lambda move: manhattanDistance(
+            self.cells[move[1]], pacmanPosition))
+
+    def step(self, state, move, rng):
+        """
+        Returns the (next state, reward, terminal) triple of Pacman making
+        the given (action, next cell) move in the state, followed by the
+        ghosts in index order.
+        """
+        cell, food, ghosts = state
+        cell = move[1]
+        reward = -TIME_PENALTY
+        dotBit = self.dotBits[cell]
+        if food & dotBit:
+            food ^= dotBit
+            reward += FOOD_POINTS
+        for ghostCell, ghostDirection in ghosts:
+            if cell == ghostCell:
+                return (cell, food, ghosts), reward - LOSE_POINTS, True
+        if food == 0:
+            return (cell, food, ghosts), reward + WIN_POINTS, True
+
+        nextGhosts = list(ghosts)
+        for i, ghost in enumerate(ghosts):
+            ghostDirection, ghostCell = self.getGhostMove(cell, ghost, rng)
+            nextGhosts[i] = (ghostCell, ghostDirection)
+            if cell == ghostCell:
+                return (cell, food, tuple(nextGhosts)), \
+                    reward - LOSE_POINTS, True
+        return (cell, food, tuple(nextGhosts)), reward, False
+
+    def getClosestDot(self, state):
+        """
+        Returns the (distance, cell) pair of the remaining dot closest to
+        Pacman in the state.
+        """
+        distances = self.distances[state[0]]
+        food = state[1]
+        return min((distances[cell], cell) for cell, dotBit in self.dots
+                   if food & dotBit)
+
+    def rollout(self, state, rng, depth=ROLLOUT_DEPTH):
+        """
+        Returns the discounted reward of a game played from the state for
+        depth moves
+        of Pacman, which avoids the cells the ghosts are on or can move to,
+        then heads for the closest dot with probability ROLLOUT_GREED and
+        moves randomly otherwise.
+
+        If the game is not over after depth moves, the time Pacman needs to
+        reach the closest dot is taken off the reward, so that rollouts
+        ending far from the dots are worse.
+        """
+        total = 0
+        discount = 1
+        target = None
+        for i in range(depth):
+            cell, food, ghosts = state
+            if target is None or not food & self.dotBits[target]:
+                target = self.getClosestDot(state)[1]
+
+            moves = self.getActions(state)
+            ghostCells = set()
+            for ghostCell, ghostDirection in ghosts:
+                ghostCells.add(ghostCell)
+                ghostCells.update(
+                    nextCell for action, nextCell
+                    in self.ghostMoves[ghostCell][ghostDirection])
+            safeMoves = [move for move in moves if move[1] not in ghostCells]
+            moves = safeMoves or moves
+            if rng.random() < ROLLOUT_GREED:
+                distances = self.distances[target]
+                closer = [move for move in moves
+                          if distances[move[1]] < distances[cell]]
+                moves = closer or moves
+            state, reward, terminal = self.step(state, rng.choice(moves), rng)
+            total += discount * reward
+            discount *= DISCOUNT
+            if terminal:
+                return total
+
+        return total - discount * TIME_PENALTY * self.getClosestDot(state)[0]
+
+
+class TreeNode:
+    """
+    A node of the search tree, standing for a sequence of moves of Pacman
+    from the root: since Pacman moves deterministically, it always leads to
+    the same cell, while the ghost moves are drawn again at each playout.
+    """
+
+    __slots__ = ('visits', 'totalValue', 'children')
+
+    def __init__(self):
+        self.visits = 0
+        self.totalValue = 0
+        self.children = {}
+
+
+def mergeTrees(node, other):
+    """
+    Adds the statistics of the tree other to the tree of node.
+    """
+    node.visits += other.visits
+    node.totalValue += other.totalValue
+    for action, otherChild in other.children.items():
+        child = node.children.get(action)
+        if child is None:
+            node.children[action] = otherChild
+        else:
+            mergeTrees(child, otherChild)
+
+
+class UCTSearch:
+    """
+    Monte Carlo tree search with the UCT selection rule, on a rollout
+    simulator.
+
+    Each playout descends the tree from the root by the UCT rule, adds one
+    node, for an untried move of Pacman, then plays a rollout, and adds to
+    each node it went through the reward of the playout from the move
+    leading to the node onward, discounted from that move. The values of a
+    subtree thus do not depend on the moves above it, and the subtree of
+    the move played can be the root of the next search. Adding a node counts
+    as an expanded node.
+
+    Rewards are discounted by DISCOUNT per move: otherwise, a win a few moves
+    away is worth about as much as a win right now, and Pacman can put off
+    eating the last dots forever when a ghost circles around them.
+    """
+
+    def __init__(self, simulator, seed, root=None):
+        self.simulator = simulator
+        self.rng = random.Random(seed)
+        self.root = root
+        if root is None:
+            self.root = TreeNode()
+
+    def run(self, playouts, deadline=math.inf):
+        """
+        Runs playouts until their number or the deadline (a
+        time.perf_counter() value) is reached, or the node expansion budget
+        is exhausted, and returns the number of playouts run.
+        """
+        done = 0
+        while done < playouts and (
+                deadline == math.inf or time.perf_counter() < deadline):
+            if GameState.countExpanded >= GameState.maximumExpanded:
+                break
+            self.playout()
+            done += 1
+        return done
+
+    def playout(self):
+        simulator = self.simulator
+        rng = self.rng
+        state = simulator.getStartState()
+        node = self.root
+        path = []
+        rewards = []
+        terminal = False
+
+        while not terminal:
+            moves = simulator.getActions(state)
+            untried = [move for move in moves
+                       if move[0] not in node.children]
+            if untried:
+                move = rng.choice(untried)
+                child = TreeNode()
+                node.children[move[0]] = child
+                GameState.countExpanded += 1
+                state, reward, terminal = simulator.step(state, move, rng)
+                rewards.append(reward)
+                path.append(child)
+                break
+
+            logVisits = math.log(node.visits)
+            bestScore = -math.inf
+            for candidate in moves:
+                child = node.children[candidate[0]]
+                score = (child.totalValue / child.visits +
+                         EXPLORATION_CONSTANT *
+                         math.sqrt(logVisits / child.visits))
+                if score > bestScore:
+                    bestScore = score
+                    move = candidate
+            node = node.children[move[0]]
+            state, reward, terminal = simulator.step(state, move, rng)
+            rewards.append(reward)
+            path.append(node)
+
+        total = 0
+        if not terminal:
+            total = simulator.rollout(state, rng)
+
+        # The reward from the move leading to each node onward, from the
+        # deepest node up. The root gets the reward of the whole playout, as
+        # its child on the path.
+        for node, reward in zip(reversed(path), reversed(rewards)):
+            total = reward + DISCOUNT * total
+            node.visits += 1
+            node.totalValue += total
+        self.root.visits += 1
+        self.root.totalValue += total
+
+
+def runUCTSearch(simulator, seed, playouts, deadline):
+    """
+    Runs a UCT search in a worker process of the root-parallel search.
+
+    Return:
+    -------
+    - The root of the tree, the number of playouts and the number of
+      expanded nodes.
+    """
+    expanded = GameState.countExpanded
+    search = UCTSearch(simulator, seed)
+    done = search.run(playouts, deadline)
+    return search.root, done, GameState.countExpanded - expanded
@@ -0,0 +1,394 @@
+# tablebase.py
+# ------------
+# Endgame tablebase of the single-ghost adversarial game, built by retrograde
+# analysis.
+
+
+import heapq
+import math
+from itertools import combinations
+from math import comb
+
+import numpy as np
+
+from .game import Actions
+from .game import Directions
+from .pacman import TIME_PENALTY
+
+# The first bytes of a tablebase file
+MAGIC = b'PACMANTB'
+
+# The version of the file format
+VERSION = 1
+
+# The directions of the ghost, by index
+DIRECTIONS = (Directions.NORTH, Directions.SOUTH, Directions.EAST,
+              Directions.WEST, Directions.STOP)
+
+# The stored value of the positions which are not solved: the ghost can
+# keep the game going forever, or the position cannot occur
+UNRESOLVED = -32768
+
+# Scores of the events of the game
+FOOD_POINTS = 10
+WIN_POINTS = 500
+LOSE_POINTS = 500
+
+
+def getCells(walls):
+    """
+    Returns the positions of the open cells of a layout, by index, and the
+    index of each position.
+    """
+    cells = []
+    for x in range(walls.width):
+        for y in range(walls.height):
+            if not walls[x][y]:
+                cells.append((x, y))
+    cellIndex = {}
+    for i, position in enumerate(cells):
+        cellIndex[position] = i
+    return cells, cellIndex
+
+
+def getLayerCounts(numberDots, maxDots):
+    """
+    Returns the number of food subsets of each size up to maxDots, the
+    subsets of a given size being stored after all the smaller ones.
+    """
+    return [comb(numberDots, size) for size in range(maxDots + 1)]
+
+
+def getLayerIndex(dots, offsets):
+    """
+    Returns the index of the layer of the given subset of dots, as sorted
+    dot indices: the offset of the subsets of its size plus its rank in the
+    colexicographic order.
+    """
+    index = offsets[len(dots)]
+    for i, dot in enumerate(dots):
+        index += comb(dot, i + 1)
+    return index
+
+
+class Tablebase:
+    """
+    A memory-mapped tablebase of the exact minimax values of the positions
+    of a layout with a single ghost, no capsules and at most maxDots of the
+    dots the layout starts with.
+
+    A position is the cell of Pacman, the cell and the direction of the
+    ghost, the remaining dots and the agent to move. Its value is the score
+    Pacman makes from it until the end of the game, both agents playing
+    optimally, Pacman never stopping. The positions of a given subset of
+    dots form a layer, a (2, cells, cells, directions) block of int16 values
+    indexed by the agent to move, the cell of Pacman, the cell of the ghost
+    and its direction, so that a probe reads a single value of the file.
+
+    The file starts with a header describing the layout (see
+    `buildTablebase`), which is checked against the layout of the first
+    probed state.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise Exception("Not a tablebase file: " + path)
+            header = np.fromfile(f, dtype='<i4', count=7)
+            (version, self.width, self.height, numberCells, numberDots,
+             self.maxDots, numberLayers) = (int(value) for value in header)
+            if version != VERSION:
+                raise Exception("Unsupported tablebase version: " + path)
+            dots = np.fromfile(f, dtype='<i4', count=2 * numberDots)
+            offset = f.tell()
+
+        self.dots = [(int(dots[2 * i]), int(dots[2 * i + 1]))
+                     for i in range(numberDots)]
+        self.values = np.memmap(
+            path, dtype='<i2', mode='r', offset=offset,
+            shape=(numberLayers, 2, numberCells, numberCells,
+                   len(DIRECTIONS)))
+        self.offsets = [0]
+        for count in getLayerCounts(numberDots, self.maxDots):
+            self.offsets.append(self.offsets[-1] + count)
+
+        self.directionIndex = {}
+        for i, direction in enumerate(DIRECTIONS):
+            self.directionIndex[direction] = i
+
+        # The index of each cell and the food bit of each dot of the layout,
+        # set at the first probe.
+        self.layout = None
+        self.cellIndex = None
+        self.dotBits = None
+        self.probes = 0
+        self.hits = 0
+
+    def bind(self, layout):
+        """
+        Checks that the tablebase was built for the given layout, and
+        computes the tables of the probes.
+        """
+        cells, cellIndex = getCells(layout.walls)
+        if (layout.width != self.width or layout.height != self.height or
+                len(cells) != self.values.shape[2] or
+                layout.food.asList() != self.dots):
+            raise Exception("The tablebase was built for another layout")
+        self.layout = layout
+        self.cellIndex = cellIndex
+        self.dotBits = [1 << (x * layout.food.height + y)
+                        for x, y in self.dots]
+
+    def probe(self, state, agentIndex):
+        """
+        Returns the exact minimax value of the given state, the given agent
+        being to move, i.e. its score plus the value of its position, or
+        None if the state is not in the tablebase.
+        """
+        if (state.getNumAgents() != 2 or state.isWin() or state.isLose() or
+                state.getCapsules() or state.getNumFood() > self.maxDots):
+            return None
+        ghostState = state.getGhostState(1)
+        if ghostState.scaredTimer > 0:
+            return None
+
+        self.probes += 1
+        if state.data.layout is not self.layout:
+            self.bind(state.data.layout)
+
+        bits = state.getFood().bits
+        dots = [i for i, dotBit in enumerate(self.dotBits) if bits & dotBit]
+        if len(dots) != state.getNumFood():
+            return None
+
+        x, y = ghostState.getPosition()
+        value = self.values[
+            getLayerIndex(dots, self.offsets), min(agentIndex, 1),
+            self.cellIndex[state.getPacmanPosition()],
+            self.cellIndex[(int(x), int(y))],
+            self.directionIndex[ghostState.configuration.direction]]
+        if value == UNRESOLVED:
+            return None
+        self.hits += 1
+        return state.getScore() + int(value)
+
+
+def buildTablebase(layout, maxDots, path):
+    """
+    Builds the tablebase of the given layout for the positions with at most
+    maxDots of its dots by retrograde analysis, saves it to path and returns
+    the numbers of positions and solved positions.
+
+    The layers are solved by increasing number of dots, so that the value
+    of a position reached by eating a dot is known. Within a layer, Pacman
+    loses TIME_PENALTY per move and the ghost loses nothing, so that values
+    can be solved from the end of the game backwards like shortest paths
+    with a Dijkstra-like search on the costs (the opposite of the values):
+    the position with the lowest tentative cost is solved first, as a
+    Pacman position takes the cost of its best successor, while a ghost
+    position is only solved once all its successors are, with the highest
+    of their costs. The positions left unsolved are the ones where the
+    ghost can avoid Pacman and keep it from eating forever.
+    """
+    cells, cellIndex = getCells(layout.walls)
+    numberCells = len(cells)
+    numberDirections = len(DIRECTIONS)
+    dots = layout.food.asList()
+    numberDots = len(dots)
+    maxDots = min(maxDots, numberDots)
+    directionIndex = {}
+    for i, direction in enumerate(DIRECTIONS):
+        directionIndex[direction] = i
+
+    # The moves of Pacman, as cells, and the (direction index, cell) moves of
+    # the ghost by cell and direction, with their reverse tables.
+    pacmanMoves = []
+    ghostMoves = []
+    for position in cells:
+        pacmanMoves.append([
+            cellIndex[Actions.getSuccessor(position, action)]
+            for action in layout.legalActions[position]
+            if action != Directions.STOP])
+        ghostMoves.append([
+            [(directionIndex[action],
+              cellIndex[Actions.getSuccessor(position, action)])
+             for action in layout.ghostLegalActions[position][direction]]
+            for direction in DIRECTIONS])
+    pacmanPredecessors = [[] for i in range(numberCells)]
+    for cell, moves in enumerate(pacmanMoves):
+        for nextCell in moves:
+            pacmanPredecessors[nextCell].append(cell)
+    ghostPredecessors = [[[] for d in DIRECTIONS] for i in range(numberCells)]
+    for cell in range(numberCells):
+        for direction in range(numberDirections):
+            for nextDirection, nextCell in ghostMoves[cell][direction]:
+                ghostPredecessors[nextCell][nextDirection].append(
+                    (cell, direction))
+
+    dotCells = [cellIndex[position] for position in dots]
+    counts = getLayerCounts(numberDots, maxDots)
+    offsets = [0]
+    for count in counts:
+        offsets.append(offsets[-1] + count)
+    numberLayers = offsets[-1]
+
+    header = np.array(
+        [VERSION, layout.width, layout.height, numberCells, numberDots,
+         maxDots, numberLayers] + [c for position in dots for c in position],
+        dtype='<i4')
+    offset = len(MAGIC) + header.nbytes
+    values = np.memmap(
+        path, dtype='<i2', mode='w+', offset=offset,
+        shape=(numberLayers, 2, numberCells, numberCells, numberDirections))
+
+    # The values of the ghost positions of the solved layers, by food
+    # bitmask over the dots, as lists indexed like a layer block.
+    ghostValues = {}
+    layerSize = numberCells * numberCells * numberDirections
+    positions = 0
+    solved = 0
+
+    for size in range(maxDots + 1):
+        for subset in combinations(range(numberDots), size):
+            food = 0
+            for dot in subset:
+                food |= 1 << dot
+            foodCells = {}
+            for dot in subset:
+                foodCells[dotCells[dot]] = dot
+
+            pacmanCosts = [math.inf] * layerSize
+            ghostCosts = [-math.inf] * layerSize
+            ghostCounts = [0] * layerSize
+            pacmanSolved = [False] * layerSize
+            ghostSolved = [False] * layerSize
+            queue = []
+
+            for pacmanCell in range(numberCells):
+                if pacmanCell in foodCells or not subset:
+                    continue
+                for ghostCell in range(numberCells):
+                    if ghostCell == pacmanCell:
+                        continue
+                    base = (pacmanCell * numberCells + ghostCell) * \
+                        numberDirections
+                    for direction in range(numberDirections):
+                        i = base + direction
+                        positions += 2
+
+                        # The moves of Pacman ending the layer.
+                        cost = math.inf
+                        for nextCell in pacmanMoves[pacmanCell]:
+                            dot = foodCells.get(nextCell)
+                            if dot is None:
+                                if nextCell == ghostCell:
+                                    cost = min(
+                                        cost, TIME_PENALTY + LOSE_POINTS)
+                                continue
+                            reward = FOOD_POINTS - TIME_PENALTY
+                            nextFood = food ^ (1 << dot)
+                            if nextFood == 0:
+                                reward += WIN_POINTS
+                            elif nextCell == ghostCell:
+                                reward -= LOSE_POINTS
+                            else:
+                                nextValue = ghostValues[nextFood][
+                                    (nextCell * numberCells + ghostCell) *
+                                    numberDirections + direction]
+                                if nextValue == UNRESOLVED:
+                                    continue
+                                reward += nextValue
+                            cost = min(cost, -reward)
+                        pacmanCosts[i] = cost
+                        if cost != math.inf:
+                            heapq.heappush(queue, (cost, 0, i))
+
+                        # The moves of the ghost catching Pacman end the
+                        # game, the others stay in the layer.
+                        cost = -math.inf
+                        count = 0
+                        for nextDirection, nextCell in \
+                                ghostMoves[ghostCell][direction]:
+                            if nextCell == pacmanCell:
+                                cost = max(cost, LOSE_POINTS)
+                            else:
+                                count += 1
+                        ghostCosts[i] = cost
+                        ghostCounts[i] = count
+                        if count == 0:
+                            heapq.heappush(queue, (cost, 1, i))
+
+            while queue:
+                cost, agent, i = heapq.heappop(queue)
+                pacmanCell, rest = divmod(i, numberCells * numberDirections)
+                ghostCell, direction = divmod(rest, numberDirections)
+
+                if agent == 0:
+                    if pacmanSolved[i]:
+                        continue
+                    pacmanSolved[i] = True
+
+                    # The ghost positions leading to this one.
+                    for previousCell, previousDirection in \
+                            ghostPredecessors[ghostCell][direction]:
+                        if previousCell == pacmanCell:
+                            continue
+                        j = ((pacmanCell * numberCells + previousCell) *
+                             numberDirections + previousDirection)
+                        if ghostSolved[j]:
+                            continue
+                        ghostCounts[j] -= 1
+                        if cost > ghostCosts[j]:
+                            ghostCosts[j] = cost
+                        if ghostCounts[j] == 0:
+                            heapq.heappush(queue, (ghostCosts[j], 1, j))
+                else:
+                    if ghostSolved[i]:
+                        continue
+                    ghostSolved[i] = True
+
+                    # The Pacman positions leading to this one.
+                    for previousCell in pacmanPredecessors[pacmanCell]:
+                        if previousCell in foodCells or \
+                                previousCell == ghostCell:
+                            continue
+                        j = ((previousCell * numberCells + ghostCell) *
+                             numberDirections + direction)
+                        if not pacmanSolved[j] and \
+                                cost + TIME_PENALTY < pacmanCosts[j]:
+                            pacmanCosts[j] = cost + TIME_PENALTY
+                            heapq.heappush(
+                                queue, (cost + TIME_PENALTY, 0, j))
+
+            layerValues = [UNRESOLVED] * layerSize
+            layerGhostValues = [UNRESOLVED] * layerSize
+            for i in range(layerSize):
+                if pacmanSolved[i]:
+                    layerValues[i] = clampValue(-pacmanCosts[i])
+                    solved += 1
+                if ghostSolved[i]:
+                    layerGhostValues[i] = clampValue(-ghostCosts[i])
+                    solved += 1
+            ghostValues[food] = layerGhostValues
+
+            layer = getLayerIndex(subset, offsets)
+            values[layer, 0] = np.array(layerValues, dtype='<i2').reshape(
+                numberCells, numberCells, numberDirections)
+            values[layer, 1] = np.array(
+                layerGhostValues, dtype='<i2').reshape(
+                    numberCells, numberCells, numberDirections)
+
+    values.flush()
+    del values
+    with open(path, 'r+b') as f:
+        f.write(MAGIC)
+        f.write(header.tobytes())
+
+    return positions, solved
+
+
+def clampValue(value):
+    """
+    Returns the value as stored in the tablebase, within the int16 range.
+    """
+    return max(UNRESOLVED + 1, min(32767, int(value)))
@@ -0,0 +1,140 @@
+# transpositionTable.py
+# ---------------------
+# Transposition table for the alpha-beta search agents.
+
+
+# Types of the values stored in the table
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+def getTranspositionKey(state, agentIndex):
+    """
+    Returns a key identifying a state along with the agent to move: the
+    Zobrist hash of the state, and the direction and scared timer of each
+    ghost, which determine its legal actions.
+    """
+    data = state.data
+    ghosts = tuple((ghostState.configuration.direction, ghostState.scaredTimer)
+                   for ghostState in data.agentStates[1:])
+    return (data._hash, agentIndex, ghosts)
+
+
+class TranspositionTable:
+    """
+    A bounded table of the results of searches, indexed by state key.
+
+    An entry is a (key, value, bound, depth, move, generation) tuple, where
+    bound tells whether value is the EXACT value of the state, or a LOWER or
+    UPPER bound on it, depth is the depth searched below the state and
+    generation is the search (i.e. the get_action call) that stored it.
+
+    Every bucket holds two entries: a depth-preferred one, only replaced by
+    a deeper search or a newer generation, and an always-replaced one, so
+    that deep results survive while recent ones are still kept.
+
+    Values are stored relative to the score of the state, since the score
+    of a state depends on the path that led to it but the score changes
+    below it do not.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.depthPreferred = [None] * size
+        self.alwaysReplace = [None] * size
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+
+    def newSearch(self):
+        """
+        Starts a new generation of entries. The older ones are kept, but are
+        replaced first.
+        """
+        self.generation += 1
+
+    def lookup(self, key):
+        """
+        Returns the entry of the given key, or None.
+        """
+        i = hash(key) % self.size
+        entry = self.depthPreferred[i]
+        if entry is not None and entry[0] == key:
+            return entry
+        entry = self.alwaysReplace[i]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def getMove(self, key):
+        """
+        Returns the best move stored for the given key, or None.
+        """
+        entry = self.lookup(key)
+        if entry is None:
+            return None
+        return entry[4]
+
+    def probe(self, key, depth, maxValue, minValue, score):
+        """
+        Returns the (value, move) pair stored for the given key if it was
+        searched at least as deep and settles the search of the state within
+        the (maxValue, minValue) window, or None.
+
+        Arguments:
+        ----------
+        - 'key': The key of the state.
+
+        - 'depth': The depth to search below the state.
+
+        - 'maxValue', 'minValue': The alpha-beta window of the search.
+
+        - 'score': The score of the state.
+        """
+        self.probes += 1
+        entry = self.lookup(key)
+        if entry is None or entry[3] < depth:
+            return None
+        value = entry[1] + score
+        bound = entry[2]
+        if (bound == EXACT or (bound == LOWER and value >= minValue) or
+                (bound == UPPER and value <= maxValue)):
+            self.hits += 1
+            return value, entry[4]
+        return None
+
+    def store(self, key, depth, value, maxValue, minValue, move, score):
+        """
+        Stores the result of the search of a state.
+
+        Arguments:
+        ----------
+        - 'key': The key of the state.
+
+        - 'depth': The depth searched below the state.
+
+        - 'value': The value found.
+
+        - 'maxValue', 'minValue': The alpha-beta window the state was
+                                  searched with.
+
+        - 'move': The best move found.
+
+        - 'score': The score of the state.
+        """
+        if value >= minValue:
+            bound = LOWER
+        elif value <= maxValue:
+            bound = UPPER
+        else:
+            bound = EXACT
+        entry = (key, value - score, bound, depth, move, self.generation)
+
+        i = hash(key) % self.size
+        current = self.depthPreferred[i]
+        if (current is None or current[0] == key or depth >= current[3] or
+                current[5] != self.generation):
+            self.depthPreferred[i] = entry
+        else:
+            self.alwaysReplace[i] = entry
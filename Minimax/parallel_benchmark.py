@@ -0,0 +1,97 @@
+import os
+from argparse import ArgumentParser, Namespace
+
+from pacman_module.pacman import runGame
+from pacman_module.ghostAgents import GreedyGhost
+from run import load_agent_from_file
+
+
+def play(agentfile, layout, workers, args):
+    """
+    Plays a game with the given number of worker processes.
+
+    Arguments:
+    ----------
+    - `agentfile`: the file of the alpha-beta agent.
+    - `layout`: the maze layout.
+    - `workers`: the number of worker processes.
+    - `args`: the other options of the agent.
+
+    Return:
+    -------
+    - The total score, computation time and number of expanded nodes.
+    """
+
+    agentArgs = Namespace(
+        agentfile=agentfile, layout=layout, workers=workers,
+        inplace=args.inplace, lazy=args.lazy, ordering=args.ordering,
+        ttsize=args.ttsize, movetime=args.movetime, movenodes=0,
+        evaluation=args.evaluation, ghostagent="greedy", probattack=1.0,
+        searchedghosts=0, tablebase="")
+    agent = load_agent_from_file(agentfile)(agentArgs)
+    try:
+        return runGame(layout, agent, [GreedyGhost(1)], False, expout=0)
+    finally:
+        agent.shutdown()
+
+
+if __name__ == '__main__':
+    usage = """
+    USAGE:      python parallel_benchmark.py <options>
+    EXAMPLES:   (1) python parallel_benchmark.py --layout large_adv
+                    - reports the speedup of the root-parallel h-minimax
+                      search with 1, 2, 4 and 8 worker processes
+                      in large_adv maze
+    """
+
+    parser = ArgumentParser(usage)
+    parser.add_argument(
+        '--agentfile',
+        help='Search agent (alphabeta.py, hminimax.py or expectimax.py).',
+        default="hminimax.py")
+    parser.add_argument(
+        '--layout',
+        help='Maze layout (from layout folder).',
+        default="large_adv")
+    parser.add_argument(
+        '--workers',
+        help='Numbers of worker processes to compare.',
+        type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument(
+        '--inplace',
+        help="Search by moving the state in place.",
+        action="store_true")
+    parser.add_argument(
+        '--lazy',
+        help="Generate each successor state only when it is searched.",
+        action="store_true")
+    parser.add_argument(
+        '--evaluation',
+        help="Distances of the heuristic evaluation of the h-minimax agent.",
+        choices=["manhattan", "maze"], default="manhattan")
+    parser.add_argument(
+        '--ordering',
+        help="Order the moves by killer moves and history scores.",
+        action="store_true")
+    parser.add_argument(
+        '--ttsize',
+        help="Number of buckets of the transposition table.",
+        type=int, default=0)
+    parser.add_argument(
+        '--movetime',
+        help="Time allowed per move, in milliseconds (0 searches at a "
+             "fixed depth).",
+        type=int, default=0)
+
+    args = parser.parse_args()
+
+    print("CPUs : " + str(os.cpu_count()))
+    print("Workers | Score | Time (s) | Expanded nodes | Speedup")
+    baseline = None
+    for workers in args.workers:
+        score, elapsed, expanded = play(
+            args.agentfile, args.layout, workers, args)
+        if baseline is None:
+            baseline = elapsed
+        print("%7d | %5d | %8.3f | %14d | %7.2f" % (
+            workers, score, elapsed, expanded, baseline / elapsed))
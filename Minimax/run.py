@@ -20,6 +20,13 @@ def positive_integer(x):
     return x
 
 
+def strictly_positive_integer(x):
+    x = int(x)
+    if x < 1:
+        raise ArgumentTypeError("%r is not >= 1" % (x,))
+    return x
+
+
 def load_agent_from_file(filepath):
     class_mod = None
     expected_class = 'PacmanAgent'
@@ -52,6 +59,8 @@ if __name__ == '__main__':
 
     parser = ArgumentParser(usage)
     parser.add_argument('--seed', help='RNG seed', type=int, default=1)
+    parser.add_argument('--nghosts', help='Number of ghosts',
+                        type=strictly_positive_integer, default=1)
     parser.add_argument(
         '--agentfile',
         help='Python file containing a `PacmanAgent` class.',
@@ -60,6 +69,11 @@ if __name__ == '__main__':
         '--ghostagent',
         help='Ghost agent available in the `ghostAgents` module.',
         choices=["dumby", "greedy", "smarty"], default="greedy")
+    parser.add_argument(
+        '--probattack',
+        help="Probability that the greedy ghost makes its best move rather "
+             "than a random one.",
+        type=restricted_float, default=1.0)
     parser.add_argument(
         '--layout',
         help='Maze layout (from layout folder).',
@@ -68,6 +82,63 @@ if __name__ == '__main__':
         '--silentdisplay',
         help="Disable the graphical display of the game.",
         action="store_true")
+    parser.add_argument(
+        '--inplace',
+        help="Search by moving the state in place (apply/undo) instead of "
+             "generating successor states.",
+        action="store_true")
+    parser.add_argument(
+        '--lazy',
+        help="Generate each successor state only when it is searched instead "
+             "of generating all the successor states of a state at once.",
+        action="store_true")
+    parser.add_argument(
+        '--movetime',
+        help="Time allowed per move, in milliseconds, for the iterative "
+             "deepening of the h-minimax agent or the playouts of the MCTS "
+             "agent (0 searches at a fixed depth or number of playouts).",
+        type=int, default=0)
+    parser.add_argument(
+        '--playouts',
+        help="Number of playouts per move of the MCTS agent (ignored with "
+             "`--movetime`).",
+        type=strictly_positive_integer, default=1000)
+    parser.add_argument(
+        '--movenodes',
+        help="Number of expanded nodes allowed per move for the iterative "
+             "deepening of the h-minimax agent (0 for no limit).",
+        type=int, default=0)
+    parser.add_argument(
+        '--ttsize',
+        help="Number of buckets of the transposition table of the alpha-beta "
+             "agents (0 disables it).",
+        type=int, default=0)
+    parser.add_argument(
+        '--evaluation',
+        help="Distances of the heuristic evaluation of the h-minimax agent: "
+             "Manhattan distances, or cached maze distances.",
+        choices=["manhattan", "maze"], default="manhattan")
+    parser.add_argument(
+        '--ordering',
+        help="Order the moves of the alpha-beta agents by transposition "
+             "table move, killer moves and history scores.",
+        action="store_true")
+    parser.add_argument(
+        '--tablebase',
+        help="Endgame tablebase file built by build_tablebase.py for the "
+             "layout, probed by the alpha-beta agents.",
+        default="")
+    parser.add_argument(
+        '--searchedghosts',
+        help="Number of the ghosts closest to Pacman whose moves are all "
+             "searched by the minimax agents, the others only making their "
+             "move bringing them closest to Pacman (0 searches all of them).",
+        type=positive_integer, default=0)
+    parser.add_argument(
+        '--workers',
+        help="Number of processes searching the moves of Pacman in parallel "
+             "in the alpha-beta agents (1 searches sequentially).",
+        type=positive_integer, default=1)
 
     args = parser.parse_args()
 
@@ -77,14 +148,32 @@ if __name__ == '__main__':
     agent = load_agent_from_file(args.agentfile)(args)
 
     gagt = ghosts[args.ghostagent]
-    nghosts = 1
-    if (nghosts > 0):
+    nghosts = args.nghosts
+    if (nghosts > 0 and args.ghostagent == "greedy"):
+        gagts = [gagt(i + 1, args.probattack) for i in range(nghosts)]
+    elif (nghosts > 0):
         gagts = [gagt(i + 1) for i in range(nghosts)]
     else:
         gagts = []
-    total_score, total_computation_time, total_expanded_nodes = runGame(
-        args.layout, agent, gagts, not args.silentdisplay, expout=0)
+    try:
+        total_score, total_computation_time, total_expanded_nodes = runGame(
+            args.layout, agent, gagts, not args.silentdisplay, expout=0)
+    finally:
+        # The worker processes of the agent, if any, are stopped.
+        if hasattr(agent, "shutdown"):
+            agent.shutdown()
 
     print("Total score : " + str(total_score))
     print("Total computation time (seconds) : " + str(total_computation_time))
     print("Total expanded nodes : " + str(total_expanded_nodes))
+    # Only the alpha-beta searches have cutoffs: the rate is meaningless for
+    # the other agents.
+    moveOrdering = getattr(agent, "moveOrdering", None)
+    if moveOrdering is not None and moveOrdering.cutoffNodes > 0:
+        print("First child cutoff rate : " +
+              str(moveOrdering.getFirstChildCutoffRate()))
+    if getattr(agent, "tablebase", None) is not None:
+        print("Tablebase hits : " + str(agent.tablebase.hits))
+    if hasattr(agent, "get_playouts_per_second"):
+        print("Playouts per second : " +
+              str(agent.get_playouts_per_second()))
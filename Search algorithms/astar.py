@@ -1,9 +1,16 @@
 from pacman_module.game import Agent
 from pacman_module.pacman import Directions
-from pacman_module.util import Stack, Queue
+from pacman_module.util import Stack, Queue, NodePool
+from pacman_module.util import IndexedPriorityQueue
+from pacman_module.searchProblems import FoodSearchProblem
+from pacman_module.searchProblems import GameStateSearchProblem
+from pacman_module.mazeDistances import getMazeDistances
+
+from collections import OrderedDict
+
+# Maximum number of spanning tree costs kept in cache
+SPANNING_TREE_CACHE_SIZE = 1 << 16
 
-from queue import PriorityQueue
-from copy import deepcopy
 
 class PacmanAgent(Agent):
     def __init__(self, args):
@@ -17,7 +24,11 @@ class PacmanAgent(Agent):
         # Used to store the coordinates of the dots.
         self.dotsPositions = []
 
-        self.frontier = PriorityQueue()
+        # Least recently used cache of the spanning tree costs of the sets of
+        # remaining dots, which many states share.
+        self.spanningTreeCosts = OrderedDict()
+
+        self.frontier = IndexedPriorityQueue()
         self.path = Queue()
 
     def manhattan_distance(self, position1, position2):
@@ -54,14 +65,9 @@ class PacmanAgent(Agent):
         - The maximum Manhattan distance found.
         """
 
-        currentPosition = state.getPacmanPosition()
+        currentPosition = self.problem.getPacmanPosition(state)
 
-        foodMatrix = state.getFood()
-        dotsRemaining = []
-
-        for dotPosition in self.dotsPositions:
-            if foodMatrix[dotPosition[0]][dotPosition[1]] == True:
-                dotsRemaining.append(dotPosition)
+        dotsRemaining = self.problem.getRemainingDots(state)
 
         if dotsRemaining == []:
             return 0
@@ -79,6 +85,138 @@ class PacmanAgent(Agent):
 
         return distanceMaximum
 
+    def find_biggest_maze_distance(self, state):
+        """
+        This function computes the maze distance between the position of
+        the state given and all dots remaining. The maximum distance found is
+        returned.
+
+        Since every move costs at least 1, this distance is a lower bound on
+        the cost to eat all the dots, and never decreases by more than the
+        cost of a move.
+
+        Arguments:
+        ----------
+        - 'state': a state
+
+        Return:
+        -------
+        - The maximum maze distance found.
+        """
+
+        dotsRemaining = self.problem.getRemainingDots(state)
+
+        if dotsRemaining == []:
+            return 0
+
+        distances = self.mazeDistances.getDistances(
+            self.problem.getPacmanPosition(state))
+        cellIndex = self.mazeDistances.cellIndex
+
+        return max([distances[cellIndex[dotPosition]]
+                    for dotPosition in dotsRemaining])
+
+    def find_spanning_tree_cost(self, state):
+        """
+        This function computes the maze distance between the position of
+        the state given and the closest dot remaining, plus the length of a
+        minimum spanning tree over all dots remaining w.r.t. maze distances.
+
+        Any path eating all the dots makes at least that many moves. Exactly
+        one move per dot eats it, at cost 1, while every other move costs
+        11, so 11 times this number of moves minus 10 times the number of
+        dots is a lower bound on the cost to eat all the dots.
+
+        Arguments:
+        ----------
+        - 'state': a state
+
+        Return:
+        -------
+        - The lower bound on the cost to eat all the dots.
+        """
+
+        dotsRemaining = self.problem.getRemainingDots(state)
+
+        if dotsRemaining == []:
+            return 0
+
+        distances = self.mazeDistances.getDistances(
+            self.problem.getPacmanPosition(state))
+        cellIndex = self.mazeDistances.cellIndex
+        closestDistance = min([distances[cellIndex[dotPosition]]
+                               for dotPosition in dotsRemaining])
+
+        # The spanning tree only depends on the remaining dots
+        foodKey = self.problem.getFoodKey(state)
+        spanningTreeCost = self.spanningTreeCosts.get(foodKey)
+        if spanningTreeCost is None:
+            spanningTreeCost = self.find_minimum_spanning_tree(dotsRemaining)
+            self.spanningTreeCosts[foodKey] = spanningTreeCost
+            if len(self.spanningTreeCosts) > SPANNING_TREE_CACHE_SIZE:
+                self.spanningTreeCosts.popitem(last=False)
+        else:
+            self.spanningTreeCosts.move_to_end(foodKey)
+
+        moves = closestDistance + spanningTreeCost
+        return 11 * moves - 10 * len(dotsRemaining)
+
+    def find_minimum_spanning_tree(self, dotsPositions):
+        """
+        This function computes, with Prim's algorithm, the length of a
+        minimum spanning tree over the given dots w.r.t. maze distances.
+
+        Arguments:
+        ----------
+        - 'dotsPositions': the positions of the dots
+
+        Return:
+        -------
+        - The length of the minimum spanning tree.
+        """
+
+        cellIndex = self.mazeDistances.cellIndex
+        indices = [cellIndex[dotPosition] for dotPosition in dotsPositions]
+
+        # Distance from the tree to each dot not in the tree yet
+        distances = self.mazeDistances.getDistances(dotsPositions[0])
+        treeDistances = [distances[i] for i in indices[1:]]
+        others = indices[1:]
+
+        length = 0
+        while others:
+            closest = min(range(len(others)), key=treeDistances.__getitem__)
+            length += treeDistances[closest]
+            distances = self.mazeDistances.getDistances(
+                self.mazeDistances.cells[others[closest]])
+            others.pop(closest)
+            treeDistances.pop(closest)
+            for j, i in enumerate(others):
+                if distances[i] < treeDistances[j]:
+                    treeDistances[j] = distances[i]
+
+        return length
+
+    def find_forward_cost(self, state):
+        """
+        This function computes the forward cost of a state, with the
+        heuristic selected from the command-line prompt.
+
+        Arguments:
+        ----------
+        - 'state': a state
+
+        Return:
+        -------
+        - The forward cost.
+        """
+
+        if self.args.heuristic == "mst":
+            return self.find_spanning_tree_cost(state)
+        if self.args.heuristic == "maze":
+            return self.find_biggest_maze_distance(state)
+        return self.find_biggest_manhattan_distance(state)
+
     def get_action(self, state):
         """
         Given a pacman game state, returns a legal move.
@@ -116,30 +254,53 @@ class PacmanAgent(Agent):
         if self.dotsPositions == []:
             return Directions.STOP
 
-        self.frontier = PriorityQueue()
-
-        pathInformation = PathInformation(
-            0, self.find_biggest_manhattan_distance(state), state, [])
-
-        self.frontier.put_nowait(pathInformation)
-
-        # A state is defined by a (x,y) position in the labyrinth, and the remaining number of dots
-        # along with their position, i.e. the food matrix
-        self.visited = {(state.getPacmanPosition(), state.getFood())}
+        # The maze and spanning tree heuristics are based on exact maze
+        # distances
+        if self.args.heuristic != "farthest":
+            self.mazeDistances = getMazeDistances(state.data.layout)
+
+        # The search runs on full game states, or on compact (cell, food)
+        # states if requested, which ignore the ghosts
+        if self.args.compact:
+            self.problem = FoodSearchProblem(state)
+        else:
+            self.problem = GameStateSearchProblem(state)
+        state = self.problem.getStartState()
+
+        # The food keys are only meaningful within a problem
+        self.spanningTreeCosts = OrderedDict()
+
+        # The frontier is a priority queue of the keys of the states,
+        # organised w.r.t the sum of the backward and forward costs, ties
+        # being broken in favour of the lowest forward cost.
+        self.frontier = IndexedPriorityQueue()
+
+        # A state is identified by a (x,y) position in the labyrinth, and the
+        # remaining dots, i.e. the food matrix or bitmask
+        key = self.problem.getStateKey(state)
+
+        # Search nodes are kept in a pool to rebuild the path to the goal.
+        # The best node reaching each state is recorded, along with the state
+        # itself while it lies in the frontier.
+        self.nodes = NodePool()
+        self.bestNodes = {key: self.nodes.push(key, -1, None, 0)}
+        self.frontierStates = {key: state}
+        forwardCost = self.find_forward_cost(state)
+        self.frontier.push(key, (forwardCost, forwardCost))
 
         # While the frontier is not empty, remove one state from it and explore
         # further
-        while not self.frontier.empty():
+        while not self.frontier.isEmpty():
 
-            queueHead = self.frontier.get_nowait()
-            currentBackwardCost = queueHead.backwardCost
-            currentState = queueHead.state
-            currentMoves = queueHead.moves
+            _, currentKey = self.frontier.pop()
+            currentState = self.frontierStates.pop(currentKey)
+            currentNode = self.bestNodes[currentKey]
+            currentBackwardCost = self.nodes.costs[currentNode]
 
             # If the removed state is a goal state, return the path leading to
             # it
-            if currentState.isWin():
-                self._build_path(currentMoves)
+            if self.problem.isGoalState(currentState):
+                self._build_path(self.nodes.getPath(currentNode))
                 nextMove = self.path.pop()
                 return nextMove
 
@@ -148,56 +309,55 @@ class PacmanAgent(Agent):
             self._explore_frontier(
                 currentState,
                 currentBackwardCost,
-                currentMoves)
+                currentNode)
 
         return Directions.STOP
 
-    def _explore_frontier(self, state, currentBackwardCost, currentMoves):
+    def _explore_frontier(self, state, currentBackwardCost, currentNode):
         """
         Given a pacman game state,the path leading to it (along with its cost),
-        expand the frontier by adding its not-yet-visited successors.
+        expand the frontier by adding its successors not yet reached by a
+        path at most as cheap.
 
         Arguments:
         ----------
         - `state`: the current game state.
         - `currentBackwardCost`: the cost to reach this state
-        - `currentMoves`: the path to reach this state
+        - `currentNode`: the search node of this state
         """
 
-        currentFood = state.getFood()
-
         # Generate the successors of the current state
-        successors = state.generatePacmanSuccessors()
+        successors = self.problem.getSuccessors(state)
         for s in successors:
 
             nextState = s[0]
             nextMove = s[1]
 
-            # The path to the successor is the path to the current state plus
-            # the action to go from the current state to its successor
-            nextMoves = deepcopy(currentMoves)
-            nextMoves.append(nextMove)
-
-            # If we move unto a cell with food, it costs "less" than if we move
-            # unto a cell without food (since eating increases our score)
-            nextPacmanPosition = nextState.getPacmanPosition()
-            if currentFood[nextPacmanPosition[0]
-                           ][nextPacmanPosition[1]] == True:
-                costIncrease = 1
-            else:
-                costIncrease = 11
-
-            sInfo = (s[0].getPacmanPosition(), s[0].getFood())
-
-            # If the successor has not been visited yet, add it to the frontier,
-            # and mark it as visited.
-            if sInfo not in self.visited:
-                nextPathInformation = PathInformation(currentBackwardCost + costIncrease,
-                                                      self.find_biggest_manhattan_distance(
-                                                          nextState),
-                                                      nextState, nextMoves)
-                self.frontier.put_nowait(nextPathInformation)
-                self.visited.add(sInfo)
+            # The problem makes a move unto a cell with food cost "less" than
+            # a move unto a cell without food (since eating increases our score)
+            nextBackwardCost = currentBackwardCost + s[2]
+
+            sInfo = self.problem.getStateKey(s[0])
+
+            # If the successor has already been reached by a path at most as
+            # cheap, the new path is dropped.
+            bestNode = self.bestNodes.get(sInfo)
+            if (bestNode is not None and
+                    self.nodes.costs[bestNode] <= nextBackwardCost):
+                continue
+
+            # Else, the successor is added to the frontier, or its cost is
+            # decreased if it already lies in it, and reopened if it was
+            # already expanded. The path to the successor is the path to the
+            # current state plus the action to go from the current state to
+            # its successor.
+            self.bestNodes[sInfo] = self.nodes.push(
+                sInfo, currentNode, nextMove, nextBackwardCost)
+            self.frontierStates[sInfo] = nextState
+            nextForwardCost = self.find_forward_cost(nextState)
+            self.frontier.update(
+                sInfo,
+                (nextBackwardCost + nextForwardCost, nextForwardCost))
 
     def _build_path(self, statePath):
         """
@@ -213,42 +373,3 @@ class PacmanAgent(Agent):
             self.path.push(statePath[i])
             i += 1
 
-
-class PathInformation:
-    """
-    This class is used to store useful information about a developped path.
-    """
-
-    def __init__(self, backwardCost, forwardCost, state, moves):
-        """
-        Initialisation function.
-
-        Arguments:
-        ----------
-        - backwardCost: The backward cost.
-        - forwardCost: The forward cost.
-        - state : The state reached by the path.
-        - moves: The moves to make from the current state to reach the state
-                 stored in this object.
-        """
-        self.backwardCost = backwardCost
-        self.forwardCost = forwardCost
-        self.state = state
-        self.moves = moves
-
-    def __lt__(self, otherPathInformation):
-        """
-        This method compares this PathInformation object with another one and
-        return True if this object is strictly lower than otherPathInformation
-        object.
-
-        Arguments:
-        ----------
-        - otherPathInformation: a PathInformation object to compare with this
-                                PathInformation object.
-        Return:
-        -------
-        - True if self.cost < otherPathInformation.cost, False otherwise.
-        """
-        return (self.backwardCost + self.forwardCost) < (
-            otherPathInformation.backwardCost + otherPathInformation.forwardCost)
@@ -1,6 +1,8 @@
 from pacman_module.game import Agent
 from pacman_module.pacman import Directions
-from pacman_module.util import Stack, Queue
+from pacman_module.util import Stack, Queue, NodePool
+from pacman_module.searchProblems import FoodSearchProblem
+from pacman_module.searchProblems import GameStateSearchProblem
 
 class PacmanAgent(Agent):
     def __init__(self, args):
@@ -33,57 +35,70 @@ class PacmanAgent(Agent):
             move = self.path.pop()
             return move
 
+        # The search runs on full game states, or on compact (cell, food)
+        # states if requested, which ignore the ghosts
+        if self.args.compact:
+            self.problem = FoodSearchProblem(state)
+        else:
+            self.problem = GameStateSearchProblem(state)
+        state = self.problem.getStartState()
+
         # Depth-First-Search: Frontier is a LIFO stack
         self.frontier = Stack()
 
-        # A state is defined by a (x,y) position in the labyrinth, and the remaining number of dots
-        # along with their position, i.e. the food matrix
-        self.visited = {(state.getPacmanPosition(), state.getFood())}
+        # A state is identified by a (x,y) position in the labyrinth, and the
+        # remaining dots, i.e. the food matrix or bitmask
+        key = self.problem.getStateKey(state)
+        self.visited = {key}
 
-        self._explore_frontier(state, [])
+        # The frontier holds the indices of search nodes, whose parents and
+        # actions are kept in a pool to rebuild the path to the goal
+        self.nodes = NodePool()
+        self._explore_frontier(state, self.nodes.push(key, -1, None, 0))
 
         # While the frontier is not empty, remove one state from it and explore
         # further
         while not self.frontier.isEmpty():
 
-            [currentState, statePath] = self.frontier.pop()
+            [currentState, node] = self.frontier.pop()
 
             # If the removed state is a goal state, return the path leading to
             # it
-            if currentState.isWin():
-                self._build_path(statePath)
+            if self.problem.isGoalState(currentState):
+                self._build_path(self.nodes.getPath(node))
                 nextMove = self.path.pop()
                 return nextMove
 
             # Else, expand the frontier with the successors of the current
             # state
-            self._explore_frontier(currentState, statePath)
+            self._explore_frontier(currentState, node)
 
         return Directions.STOP
 
-    def _explore_frontier(self, state, statePath):
+    def _explore_frontier(self, state, node):
         """
-        Given a pacman game state and the path leading to it,
+        Given a pacman game state and the search node leading to it,
         expand the frontier by adding its not-yet-visited successors.
 
         Arguments:
         ----------
         - `state`: the current game state.
-        - `statePath`: the path leading to the current state.
+        - `node`: the index of the search node of the current state.
         """
 
         # Generate the successors of the current state
-        successors = state.generatePacmanSuccessors()
+        successors = self.problem.getSuccessors(state)
         for s in successors:
-            # The path to the successor is the path to the current state plus
-            # the action to go from the current state to its successor
-            sPath = statePath + [s[1]]
-            sInfo = (s[0].getPacmanPosition(), s[0].getFood())
+            sInfo = self.problem.getStateKey(s[0])
 
             # If the successor has not been visited yet, add it to the frontier,
             # and mark it as visited.
             if sInfo not in self.visited:
-                self.frontier.push([s[0], sPath])
+                # The path to the successor is the path to the current state
+                # plus the action to go from the current state to its successor
+                sCost = self.nodes.costs[node] + s[2]
+                sNode = self.nodes.push(sInfo, node, s[1], sCost)
+                self.frontier.push([s[0], sNode])
                 self.visited.add(sInfo)
 
     def _build_path(self, statePath):
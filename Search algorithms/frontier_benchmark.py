@@ -0,0 +1,101 @@
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+from pacman_module import layout
+from pacman_module.pacman import GameState
+from pacman_module.searchProblems import FoodSearchProblem
+from pacman_module.searchProblems import GameStateSearchProblem
+from pacman_module.util import NodePool
+
+
+def fill_frontier(problem, nodes):
+    """
+    Given a search problem, expands states breadth-first until the
+    frontier holds the requested number of nodes, like the search agents do.
+
+    Arguments:
+    ----------
+    - `problem`: the search problem, see module `searchProblems`.
+    - `nodes`: the number of nodes to keep in the frontier.
+
+    Return:
+    -------
+    - The list of (state, node) entries of the frontier, and the pool of
+      their search nodes.
+    """
+
+    state = problem.getStartState()
+    key = problem.getStateKey(state)
+    pool = NodePool()
+    frontier = [(state, pool.push(key, -1, None, 0))]
+    visited = {key}
+    i = 0
+    while len(frontier) < nodes and i < len(frontier):
+        currentState, node = frontier[i]
+        i += 1
+        if problem.isGoalState(currentState):
+            continue
+        for nextState, nextMove, cost in problem.getSuccessors(currentState):
+            nextInfo = problem.getStateKey(nextState)
+            if nextInfo not in visited:
+                nextNode = pool.push(nextInfo, node, nextMove,
+                                     pool.costs[node] + cost)
+                frontier.append((nextState, nextNode))
+                visited.add(nextInfo)
+
+    return frontier, pool
+
+if __name__ == '__main__':
+    usage = """
+    USAGE:      python frontier_benchmark.py <options>
+    EXAMPLES:   (1) python frontier_benchmark.py --layout medium
+                    - reports the memory used per frontier node
+                      in medium maze
+    """
+
+    parser = ArgumentParser(usage)
+    parser.add_argument(
+        '--layout',
+        help='Maze layout (from layout folder).',
+        default="medium")
+    parser.add_argument(
+        '--nodes',
+        help='Number of nodes to keep in the frontier.',
+        type=int, default=20000)
+    parser.add_argument(
+        '--compact',
+        help="Use compact (cell, food bitmask) states instead of game states.",
+        action="store_true")
+
+    args = parser.parse_args()
+
+    initialState = GameState()
+    initialState.initialize(layout.getLayout(args.layout), 0)
+    GameState.explored = set()
+
+    if args.compact:
+        problem = FoodSearchProblem(initialState)
+    else:
+        problem = GameStateSearchProblem(initialState)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    frontier, pool = fill_frontier(problem, args.nodes)
+    # States are also kept alive by the engine's explored set.
+    GameState.explored = set()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    GameState.countExpanded = 0
+    start = time.perf_counter()
+    fill_frontier(problem, args.nodes)
+    elapsed = time.perf_counter() - start
+    GameState.explored = set()
+
+    print("Frontier nodes : " + str(len(frontier)))
+    print("Bytes per frontier node : " +
+          str((after - before) // len(frontier)))
+    print("Peak traced memory (bytes) : " + str(peak - before))
+    print("Expanded nodes per second : " +
+          str(int(GameState.countExpanded / elapsed)))
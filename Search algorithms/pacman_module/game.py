@@ -25,6 +25,7 @@ import time
 import os
 import traceback
 import sys
+import random
 import pacman_module as pacmodule
 
 #######################
@@ -88,6 +89,7 @@ class Configuration:
     The convention for positions, like a graph, is that (0,0) is the lower left corner, x increases
     horizontally and y increases vertically.  Therefore, north is the direction of increasing y, or (0,1).
     """
+    __slots__ = ('pos', 'direction')
 
     def __init__(self, pos, direction):
         self.pos = pos
@@ -136,6 +138,8 @@ class AgentState:
     """
     AgentStates hold the state of an agent (configuration, speed, scared, etc).
     """
+    __slots__ = ('start', 'configuration', 'isPacman', 'scaredTimer',
+                 'numCarrying', 'numReturned')
 
     def __init__(self, startConfiguration, isPacman):
         self.start = startConfiguration
@@ -305,6 +309,154 @@ class Grid:
         return bools
 
 
+class BitGrid(Grid):
+    """
+    A drop-in replacement for a boolean Grid backed by a single Python int.
+
+    Cell (x,y) is stored in bit x * height + y, so that equality is a single
+    integer comparison and the hash is computed once and cached.  Since ints
+    are immutable, copy() and shallowCopy() only create a new wrapper around
+    the same bits: a grid is effectively copied when one of its cells is
+    written, which makes copying the food grid on each eaten dot O(1).
+
+    Data is still accessed via grid[x][y].
+    """
+
+    def __init__(
+            self,
+            width,
+            height,
+            initialValue=False,
+            bitRepresentation=None):
+        if initialValue not in [False, True]:
+            raise Exception('Grids can only contain booleans')
+        self.CELLS_PER_INT = 30
+
+        self.width = width
+        self.height = height
+        if initialValue:
+            self.bits = (1 << (width * height)) - 1
+        else:
+            self.bits = 0
+        self._hash = None
+        if bitRepresentation:
+            self._unpackBits(bitRepresentation)
+
+    @property
+    def data(self):
+        return [[self.isSet(x, y) for y in range(self.height)]
+                for x in range(self.width)]
+
+    def isSet(self, x, y):
+        return (self.bits >> (x * self.height + y)) & 1 == 1
+
+    def set(self, x, y, value):
+        mask = 1 << (x * self.height + y)
+        if value:
+            self.bits |= mask
+        else:
+            self.bits &= ~mask
+        self._hash = None
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.width
+        if i < 0 or i >= self.width:
+            raise IndexError('grid index out of range')
+        return _BitGridColumn(self, i)
+
+    def __setitem__(self, key, item):
+        for y, value in enumerate(item):
+            self.set(key, y, value)
+
+    def __iter__(self):
+        for x in range(self.width):
+            yield _BitGridColumn(self, x)
+
+    def __eq__(self, other):
+        if other is None:
+            return False
+        if isinstance(other, BitGrid):
+            return (self.bits == other.bits and
+                    self.height == other.height and
+                    self.width == other.width)
+        return self.data == other.data
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(self.bits)
+        return self._hash
+
+    def copy(self):
+        g = BitGrid(self.width, self.height)
+        g.bits = self.bits
+        g._hash = self._hash
+        return g
+
+    def deepCopy(self):
+        return self.copy()
+
+    def shallowCopy(self):
+        # Like a shallow copy of a Grid, which shares its data with the
+        # original, without allocating a new grid for every state.
+        return self
+
+    def count(self, item=True):
+        ones = bin(self.bits).count('1')
+        if item:
+            return ones
+        return self.width * self.height - ones
+
+    def asList(self, key=True):
+        bits = self.bits
+        if not key:
+            bits ^= (1 << (self.width * self.height)) - 1
+
+        # The set bits are read from the lowest one, i.e. in the order of x
+        # then y, without visiting the other cells.
+        list = []
+        height = self.height
+        while bits:
+            lowest = bits & -bits
+            list.append(divmod(lowest.bit_length() - 1, height))
+            bits ^= lowest
+        return list
+
+
+class _BitGridColumn:
+    """
+    A view over the column x of a BitGrid, so that grid[x][y] keeps working.
+    """
+    __slots__ = ('grid', 'x')
+
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.x = x
+
+    def __getitem__(self, y):
+        height = self.grid.height
+        if y < 0:
+            y += height
+        if y < 0 or y >= height:
+            raise IndexError('grid index out of range')
+        return (self.grid.bits >> (self.x * height + y)) & 1 == 1
+
+    def __setitem__(self, y, value):
+        height = self.grid.height
+        if y < 0:
+            y += height
+        if y < 0 or y >= height:
+            raise IndexError('grid index out of range')
+        self.grid.set(self.x, y, value)
+
+    def __len__(self):
+        return self.grid.height
+
+    def __iter__(self):
+        for y in range(self.grid.height):
+            yield self[y]
+
+
 def reconstituteGrid(bitRep):
     if not isinstance(bitRep, type((1, 2))):
         return bitRep
@@ -405,10 +557,62 @@ class Actions:
     getSuccessor = staticmethod(getSuccessor)
 
 
-class GameStateData:
+ZOBRIST_KEYS_CACHE = {}
+
+
+class ZobristKeys:
     """
+    Random 64-bit keys used to hash game states incrementally.
 
+    The hash of a state is the XOR of the keys of every agent position, every
+    remaining food dot and every remaining capsule, so that moving an agent or
+    eating a dot updates it in O(1).  Agent positions are keyed on a half-cell
+    grid since scared ghosts move at half speed.
     """
+    SEED = 188
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self._random = random.Random(ZobristKeys.SEED)
+        self.food = [self._random.getrandbits(64)
+                     for i in range(width * height)]
+        self.capsules = [self._random.getrandbits(64)
+                         for i in range(width * height)]
+        self.agents = []
+
+    def agentKey(self, agentIndex, position):
+        # Keys of an agent are drawn the first time it is seen, always in
+        # agent order, so that they do not depend on the game being played.
+        while agentIndex >= len(self.agents):
+            self.agents.append([self._random.getrandbits(64)
+                                for i in range(4 * self.width * self.height)])
+        x, y = position
+        return self.agents[agentIndex][int(2 * x) * 2 * self.height + int(2 * y)]
+
+    def foodKey(self, x, y):
+        return self.food[x * self.height + y]
+
+    def capsuleKey(self, x, y):
+        return self.capsules[x * self.height + y]
+
+
+def getZobristKeys(width, height):
+    if (width, height) not in ZOBRIST_KEYS_CACHE:
+        ZOBRIST_KEYS_CACHE[(width, height)] = ZobristKeys(width, height)
+    return ZOBRIST_KEYS_CACHE[(width, height)]
+
+
+class GameStateData:
+    """
+    The data of a game state.  Since every node of a search tree holds one,
+    GameStateData, AgentState and Configuration use __slots__ to keep them
+    small.
+    """
+    __slots__ = ('food', 'capsules', 'agentStates', 'layout', '_eaten',
+                 'score', '_zobristKeys', '_hash', '_foodEaten', '_foodAdded',
+                 '_capsuleEaten', '_agentMoved', '_lose', '_win',
+                 'scoreChange')
 
     def __init__(self, prevState=None):
         """
@@ -416,11 +620,13 @@ class GameStateData:
         """
         if prevState is not None:
             self.food = prevState.food.shallowCopy()
-            self.capsules = prevState.capsules[:]
+            self.capsules = prevState.capsules
             self.agentStates = self.copyAgentStates(prevState.agentStates)
             self.layout = prevState.layout
             self._eaten = prevState._eaten
             self.score = prevState.score
+            self._zobristKeys = prevState._zobristKeys
+            self._hash = prevState._hash
 
         self._foodEaten = None
         self._foodAdded = None
@@ -446,6 +652,47 @@ class GameStateData:
             copiedStates.append(agentState.copy())
         return copiedStates
 
+    def moveAgent(self, agentIndex, configuration):
+        """
+        Sets the configuration of an agent and updates the state hash.
+        """
+        agentState = self.agentStates[agentIndex]
+        keys = self._zobristKeys
+        self._hash ^= keys.agentKey(agentIndex, agentState.configuration.pos)
+        self._hash ^= keys.agentKey(agentIndex, configuration.pos)
+        agentState.configuration = configuration
+
+    def removeFood(self, x, y):
+        """
+        Removes the dot at (x,y), copying the food grid first since it is
+        shared with the predecessor states, and updates the state hash.
+        """
+        self.food = self.food.copy()
+        self.food[x][y] = False
+        self._hash ^= self._zobristKeys.foodKey(x, y)
+
+    def removeCapsule(self, position):
+        """
+        Removes the capsule at position, without modifying the list shared
+        with the predecessor states, and updates the state hash.
+        """
+        self.capsules = [c for c in self.capsules if c != position]
+        self._hash ^= self._zobristKeys.capsuleKey(*position)
+
+    def computeHash(self):
+        """
+        Computes the Zobrist hash of the state from scratch.
+        """
+        keys = self._zobristKeys
+        h = 0
+        for agentIndex, agentState in enumerate(self.agentStates):
+            h ^= keys.agentKey(agentIndex, agentState.configuration.pos)
+        for x, y in self.food.asList():
+            h ^= keys.foodKey(x, y)
+        for x, y in self.capsules:
+            h ^= keys.capsuleKey(x, y)
+        return h
+
     def __eq__(self, other):
         """
         Allows two states to be compared.
@@ -466,28 +713,11 @@ class GameStateData:
     def __hash__(self):
         """
         Allows states to be keys of dictionaries.
+
+        The Zobrist hash of agent positions, food and capsules is maintained
+        incrementally by the game rules, so this costs O(1).
         """
-        for i, state in enumerate(self.agentStates):
-            try:
-                int(hash(state))
-            except TypeError as e:
-                print(e)
-                # hash(state)
-        return int(
-            (hash(
-                tuple(
-                    self.agentStates)) +
-                13 *
-                hash(
-                self.food) +
-                113 *
-                hash(
-                tuple(
-                    self.capsules)) +
-                7 *
-                hash(
-                self.score)) %
-            1048575)
+        return hash((self._hash, self.score))
 
     def __str__(self):
         width, height = self.layout.width, self.layout.height
@@ -569,6 +799,8 @@ class GameStateData:
                         Directions.STOP),
                     isPacman))
         self._eaten = [False for a in self.agentStates]
+        self._zobristKeys = getZobristKeys(layout.width, layout.height)
+        self._hash = self.computeHash()
 
 
 try:
@@ -13,12 +13,13 @@
 
 
 from .util import manhattanDistance
-from .game import Grid
+from .game import Grid, BitGrid, Actions, Configuration, Directions
 import os
 import random
 from functools import reduce
 
 VISIBILITY_MATRIX_CACHE = {}
+MOVE_TABLES_CACHE = {}
 
 
 class Layout:
@@ -30,13 +31,14 @@ class Layout:
         self.width = len(layoutText[0])
         self.height = len(layoutText)
         self.walls = Grid(self.width, self.height, False)
-        self.food = Grid(self.width, self.height, False)
+        self.food = BitGrid(self.width, self.height, False)
         self.capsules = []
         self.agentPositions = []
         self.numGhosts = 0
         self.processLayoutText(layoutText)
         self.layoutText = layoutText
         self.totalFood = len(self.food.asList())
+        self.initializeMoveTables()
         # self.initializeVisibilityMatrix()
 
     def getNumGhosts(self):
@@ -75,6 +77,45 @@ class Layout:
             self.visibility = VISIBILITY_MATRIX_CACHE[reduce(
                 str.__add__, self.layoutText)]
 
+    def initializeMoveTables(self):
+        """
+        Compiles, once per layout, the legal actions of every open cell so
+        that the game rules answer legal-action queries with a lookup:
+
+         - legalActions[(x, y)] is the tuple of actions (including STOP) an
+           agent standing on (x, y) can take, as computed by
+           Actions.getPossibleActions;
+         - ghostLegalActions[(x, y)][direction] is the tuple of actions a
+           ghost standing on (x, y) and travelling in direction can take,
+           i.e. without STOP and without turning around unless it reaches a
+           dead end.
+
+        Positions between grid points (scared ghosts) are not in the tables.
+        """
+        key = str(self)
+        if key not in MOVE_TABLES_CACHE:
+            legalActions = {}
+            ghostLegalActions = {}
+            for x in range(self.width):
+                for y in range(self.height):
+                    if self.walls[x][y]:
+                        continue
+                    possible = Actions.getPossibleActions(
+                        Configuration((x, y), Directions.STOP), self.walls)
+                    legalActions[(x, y)] = tuple(possible)
+                    possible = [a for a in possible if a != Directions.STOP]
+                    ghostLegalActions[(x, y)] = {}
+                    for direction in Directions.REVERSE:
+                        reverse = Directions.REVERSE[direction]
+                        if reverse in possible and len(possible) > 1:
+                            ghostLegalActions[(x, y)][direction] = tuple(
+                                a for a in possible if a != reverse)
+                        else:
+                            ghostLegalActions[(x, y)][direction] = tuple(
+                                possible)
+            MOVE_TABLES_CACHE[key] = (legalActions, ghostLegalActions)
+        self.legalActions, self.ghostLegalActions = MOVE_TABLES_CACHE[key]
+
     def isWall(self, pos):
         x, col = pos
         return self.walls[x][col]
@@ -0,0 +1,127 @@
+# mazeDistances.py
+# ----------------
+# Exact maze distances between the cells of a layout.
+
+
+import hashlib
+import os
+from collections import deque
+
+import numpy as np
+
+from .game import Actions
+from .game import Configuration
+from .game import Directions
+
+MAZE_DISTANCES_CACHE = {}
+CACHE_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'mazeDistancesCache')
+
+
+class MazeDistances:
+    """
+    The length of the shortest path between every pair of open cells of a
+    layout, computed by a breadth-first search from every cell.
+
+    The distances form an int16 N x N matrix, N being the number of open
+    cells, where matrix[i, j] is the distance between cells[i] and cells[j]
+    (-1 if they are not connected). Since it only depends on the walls, the
+    matrix is saved in the cache directory under a hash of the walls, and
+    memory-mapped from there by later runs instead of being recomputed.
+    Rows are converted to lists the first time they are queried, as
+    indexing a list is much cheaper than indexing a memory-mapped array.
+    """
+
+    def __init__(self, layout, cacheDirectory=CACHE_DIRECTORY):
+        walls = layout.walls
+
+        # Open cells, by index
+        self.cells = []
+        for x in range(walls.width):
+            for y in range(walls.height):
+                if not walls[x][y]:
+                    self.cells.append((x, y))
+        self.cellIndex = {}
+        for i, position in enumerate(self.cells):
+            self.cellIndex[position] = i
+
+        key = hashlib.sha1(str(walls).encode()).hexdigest()
+        path = os.path.join(cacheDirectory, key + '.npy')
+        try:
+            self.matrix = np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            self.matrix = self.computeDistances(walls)
+            self.save(path)
+        self.rows = [None] * len(self.cells)
+
+    def computeDistances(self, walls):
+        """
+        Returns the distance matrix, computed by a breadth-first search from
+        every cell.
+        """
+        neighbours = []
+        for position in self.cells:
+            neighbours.append([
+                self.cellIndex[Actions.getSuccessor(position, action)]
+                for action in Actions.getPossibleActions(
+                    Configuration(position, Directions.STOP), walls)
+                if action != Directions.STOP])
+
+        n = len(self.cells)
+        matrix = np.full((n, n), -1, dtype=np.int16)
+        for source in range(n):
+            distances = [-1] * n
+            distances[source] = 0
+            fringe = deque([source])
+            while fringe:
+                cell = fringe.popleft()
+                distance = distances[cell] + 1
+                for nextCell in neighbours[cell]:
+                    if distances[nextCell] < 0:
+                        distances[nextCell] = distance
+                        fringe.append(nextCell)
+            matrix[source] = distances
+        return matrix
+
+    def save(self, path):
+        """
+        Saves the matrix at the given path. The file is written under a
+        temporary name first, so that another process never maps a partial
+        file. Failing to save (e.g. read-only directory) is not an error.
+        """
+        temporaryPath = path + '.' + str(os.getpid()) + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temporaryPath, 'wb') as f:
+                np.save(f, self.matrix)
+            os.replace(temporaryPath, path)
+        except OSError:
+            pass
+
+    def getDistance(self, position1, position2):
+        """
+        Returns the maze distance between two open cells.
+        """
+        return self.getDistances(position1)[self.cellIndex[position2]]
+
+    def getDistances(self, position):
+        """
+        Returns the list of the maze distances from an open cell to every
+        cell, indexed like self.cells.
+        """
+        i = self.cellIndex[position]
+        row = self.rows[i]
+        if row is None:
+            row = self.rows[i] = self.matrix[i].tolist()
+        return row
+
+
+def getMazeDistances(layout):
+    """
+    Returns the MazeDistances of a layout, computed or loaded once per
+    process.
+    """
+    key = str(layout.walls)
+    if key not in MAZE_DISTANCES_CACHE:
+        MAZE_DISTANCES_CACHE[key] = MazeDistances(layout)
+    return MAZE_DISTANCES_CACHE[key]
@@ -43,6 +43,7 @@ from .game import GameStateData
 from .game import Game
 from .game import Directions
 from .game import Actions
+from .game import Configuration
 from .util import nearestPoint
 from .util import manhattanDistance
 from . import textDisplay, graphicsDisplay
@@ -72,6 +73,7 @@ class GameState:
 
     Note that in classic Pacman, Pacman is always agent 0.
     """
+    __slots__ = ('data',)
 
     ####################################################
     # Accessor methods: use these to access state data #
@@ -122,7 +124,7 @@ class GameState:
 
         # Let agent's logic deal with its action's effects on the board
         if agentIndex == 0:  # Pacman is moving
-            state.data._eaten = [False for i in range(state.getNumAgents())]
+            state.data._eaten = [False] * state.getNumAgents()
             PacmanRules.applyAction(state, action)
         else:                # A ghost is moving
             GhostRules.applyAction(state, action, agentIndex)
@@ -131,7 +133,7 @@ class GameState:
         if agentIndex == 0:
             state.data.scoreChange += -TIME_PENALTY  # Penalty for waiting around
         else:
-            GhostRules.decrementTimer(state.data.agentStates[agentIndex])
+            GhostRules.decrementTimer(state, agentIndex)
 
         # Resolve multi-agent effects
         GhostRules.checkDeath(state, agentIndex)
@@ -374,16 +376,24 @@ class PacmanRules:
         """
         Returns a list of possible actions.
         """
-        return Actions.getPossibleActions(
-            state.getPacmanState().configuration,
-            state.data.layout.walls)
+        configuration = state.data.agentStates[0].configuration
+        legal = state.data.layout.legalActions.get(configuration.pos)
+        if legal is None:
+            return Actions.getPossibleActions(
+                configuration, state.data.layout.walls)
+        return list(legal)
     getLegalActions = staticmethod(getLegalActions)
 
     def applyAction(state, action):
         """
         Edits the state to reflect the results of the action.
         """
-        legal = PacmanRules.getLegalActions(state)
+        # The move table of the layout is read directly, without the copy
+        # made by getLegalActions.
+        legal = state.data.layout.legalActions.get(
+            state.data.agentStates[0].configuration.pos)
+        if legal is None:
+            legal = PacmanRules.getLegalActions(state)
         if action not in legal:
             raise Exception("Illegal action " + str(action))
 
@@ -391,8 +401,8 @@ class PacmanRules:
 
         # Update Configuration
         vector = Actions.directionToVector(action, PacmanRules.PACMAN_SPEED)
-        pacmanState.configuration = pacmanState.configuration.generateSuccessor(
-            vector)
+        state.data.moveAgent(
+            0, pacmanState.configuration.generateSuccessor(vector))
 
         # Eat
         next = pacmanState.configuration.getPosition()
@@ -407,8 +417,7 @@ class PacmanRules:
         # Eat food
         if state.data.food[x][y]:
             state.data.scoreChange += 10
-            state.data.food = state.data.food.copy()
-            state.data.food[x][y] = False
+            state.data.removeFood(x, y)
             state.data._foodEaten = position
             # TODO: cache numFood?
             numFood = state.getNumFood()
@@ -417,7 +426,7 @@ class PacmanRules:
                 state.data._win = True
         # Eat capsule
         if(position in state.getCapsules()):
-            state.data.capsules.remove(position)
+            state.data.removeCapsule(position)
             state.data._capsuleEaten = position
             # Reset all ghosts' scared timers
             for index in range(1, len(state.data.agentStates)):
@@ -437,6 +446,11 @@ class GhostRules:
         reach a dead end, but can turn 90 degrees at intersections.
         """
         conf = state.getGhostState(ghostIndex).configuration
+        legal = state.data.layout.ghostLegalActions.get(conf.pos)
+        if legal is not None:
+            return list(legal[conf.direction])
+
+        # In between grid points, the ghost must continue straight
         possibleActions = Actions.getPossibleActions(
             conf, state.data.layout.walls)
         reverse = Actions.reverseDirection(conf.direction)
@@ -449,7 +463,14 @@ class GhostRules:
 
     def applyAction(state, action, ghostIndex):
 
-        legal = GhostRules.getLegalActions(state, ghostIndex)
+        # The move table of the layout is read directly, without the copy
+        # made by getLegalActions.
+        conf = state.data.agentStates[ghostIndex].configuration
+        legal = state.data.layout.ghostLegalActions.get(conf.pos)
+        if legal is None:
+            legal = GhostRules.getLegalActions(state, ghostIndex)
+        else:
+            legal = legal[conf.direction]
         if action not in legal:
             raise Exception("Illegal ghost action " + str(action))
 
@@ -458,15 +479,17 @@ class GhostRules:
         if ghostState.scaredTimer > 0:
             speed /= 2.0
         vector = Actions.directionToVector(action, speed)
-        ghostState.configuration = ghostState.configuration.generateSuccessor(
-            vector)
+        state.data.moveAgent(
+            ghostIndex, ghostState.configuration.generateSuccessor(vector))
     applyAction = staticmethod(applyAction)
 
-    def decrementTimer(ghostState):
+    def decrementTimer(state, ghostIndex):
+        ghostState = state.data.agentStates[ghostIndex]
         timer = ghostState.scaredTimer
         if timer == 1:
-            ghostState.configuration.pos = nearestPoint(
-                ghostState.configuration.pos)
+            configuration = ghostState.configuration
+            state.data.moveAgent(ghostIndex, Configuration(
+                nearestPoint(configuration.pos), configuration.direction))
         ghostState.scaredTimer = max(0, timer - 1)
     decrementTimer = staticmethod(decrementTimer)
 
@@ -488,7 +511,7 @@ class GhostRules:
     def collide(state, ghostState, agentIndex):
         if ghostState.scaredTimer > 0:
             state.data.scoreChange += 200
-            GhostRules.placeGhost(state, ghostState)
+            GhostRules.placeGhost(state, agentIndex)
             ghostState.scaredTimer = 0
             # Added for first-person
             state.data._eaten[agentIndex] = True
@@ -504,8 +527,9 @@ class GhostRules:
             pacmanPosition) <= COLLISION_TOLERANCE
     canKill = staticmethod(canKill)
 
-    def placeGhost(state, ghostState):
-        ghostState.configuration = ghostState.start
+    def placeGhost(state, ghostIndex):
+        ghostState = state.data.agentStates[ghostIndex]
+        state.data.moveAgent(ghostIndex, ghostState.start)
     placeGhost = staticmethod(placeGhost)
 
 #############################
@@ -0,0 +1,171 @@
+# searchProblems.py
+# -----------------
+# Search problems on which the search agents run.
+
+
+from .game import Actions
+from .game import Directions
+from .pacman import GameState
+
+
+def moveCost(hasFood):
+    """
+    Returns the cost of moving onto a cell: moving onto a cell with food
+    costs "less" than moving onto a cell without food, since eating
+    increases the score.
+    """
+    if hasFood:
+        return 1
+    return 11
+
+
+class GameStateSearchProblem:
+    """
+    The problem of eating all the dots, whose states are full game states
+    expanded through GameState.generatePacmanSuccessors.
+    """
+
+    def __init__(self, state):
+        self.startState = state
+
+    def getStartState(self):
+        return self.startState
+
+    def isGoalState(self, state):
+        return state.isWin()
+
+    def getStateKey(self, state):
+        """
+        Returns a hashable key identifying the state: the Pacman position
+        along with the food grid.
+        """
+        return (state.getPacmanPosition(), state.getFood())
+
+    def getSuccessors(self, state):
+        """
+        Returns the list of (successor, action, cost) triples of the state,
+        or None if the node expansion budget is exhausted.
+        """
+        successors = state.generatePacmanSuccessors()
+        if successors is None:
+            return None
+        food = state.getFood()
+        result = []
+        for nextState, action in successors:
+            x, y = nextState.getPacmanPosition()
+            result.append((nextState, action, moveCost(food[x][y])))
+        return result
+
+    def getPacmanPosition(self, state):
+        return state.getPacmanPosition()
+
+    def getRemainingDots(self, state):
+        """
+        Returns the positions of the dots remaining in the state.
+        """
+        return state.getFood().asList()
+
+    def getFoodKey(self, state):
+        """
+        Returns a hashable key identifying the dots remaining in the state.
+        """
+        return state.getFood()
+
+
+class FoodSearchProblem:
+    """
+    The problem of eating all the dots of a ghost-free maze, decoupled from
+    GameState.
+
+    A state is a (cell, food) pair of integers, where cell is the index of
+    the open cell Pacman stands on and food is a bitmask whose bit i is set
+    if the i-th dot of the initial state remains.  Successors are read from
+    a neighbour table computed once, so that expanding a node only costs a
+    few integer operations, while the actions are the ones the game engine
+    would allow in the same order, so that a plan replays identically.
+
+    Ghosts and capsules are ignored.
+    """
+
+    def __init__(self, state):
+        walls = state.getWalls()
+        legalActions = state.data.layout.legalActions
+
+        # Positions of the open cells and of the dots, by index
+        self.cells = []
+        for x in range(walls.width):
+            for y in range(walls.height):
+                if not walls[x][y]:
+                    self.cells.append((x, y))
+        cellIndex = {}
+        for i, position in enumerate(self.cells):
+            cellIndex[position] = i
+        self.dots = state.getFood().asList()
+
+        # The bit of the dot on each cell, 0 if there is none
+        self.dotBits = [0 for position in self.cells]
+        for i, position in enumerate(self.dots):
+            self.dotBits[cellIndex[position]] = 1 << i
+
+        # The (action, next cell) pairs of each cell
+        self.neighbours = []
+        for position in self.cells:
+            moves = []
+            for action in legalActions[position]:
+                if action != Directions.STOP:
+                    nextPosition = Actions.getSuccessor(position, action)
+                    moves.append((action, cellIndex[nextPosition]))
+            self.neighbours.append(tuple(moves))
+
+        x, y = state.getPacmanPosition()
+        self.startState = (cellIndex[(int(x), int(y))],
+                           (1 << len(self.dots)) - 1)
+
+    def getStartState(self):
+        return self.startState
+
+    def isGoalState(self, state):
+        return state[1] == 0
+
+    def getStateKey(self, state):
+        return state
+
+    def getSuccessors(self, state):
+        """
+        Returns the list of (successor, action, cost) triples of the state,
+        or None if the node expansion budget is exhausted.
+
+        Expansions are counted like GameState.generatePacmanSuccessors.
+        """
+        if (GameState.countExpanded >= GameState.maximumExpanded):
+            return None
+        GameState.countExpanded += 1
+
+        cell, food = state
+        dotBits = self.dotBits
+        result = []
+        for action, nextCell in self.neighbours[cell]:
+            dotBit = dotBits[nextCell]
+            if food & dotBit:
+                result.append(((nextCell, food ^ dotBit), action, 1))
+            else:
+                result.append(((nextCell, food), action, 11))
+        return result
+
+    def getPacmanPosition(self, state):
+        return self.cells[state[0]]
+
+    def getRemainingDots(self, state):
+        """
+        Returns the positions of the dots remaining in the state.
+        """
+        food = state[1]
+        return [position for i, position in enumerate(self.dots)
+                if food >> i & 1]
+
+    def getFoodKey(self, state):
+        """
+        Returns a hashable key identifying the dots remaining in the state:
+        the food bitmask.
+        """
+        return state[1]
@@ -31,6 +31,7 @@ import inspect
 import heapq
 import random
 import io
+from array import array
 
 
 class FixedRandom:
@@ -233,6 +234,103 @@ class PriorityQueueWithFunction(PriorityQueue):
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
 
+class IndexedPriorityQueue:
+    """
+      Implements a priority queue whose entries are indexed by item, so that
+      the priority of an item already in the queue can be decreased in
+      O(log n) instead of searching and rebuilding the heap: the entry of
+      the item is marked as removed and a new one is pushed. Items must be
+      hashable and priorities may be any comparable values, e.g. tuples.
+      Items of equal priority are popped in the order they were pushed or
+      last decreased.
+    """
+
+    REMOVED = object()
+
+    def __init__(self):
+        self.heap = []
+        self.entries = {}
+        self.count = 0
+
+    def push(self, item, priority):
+        "Adds 'item', which must not be in the queue, with 'priority'"
+        entry = [priority, self.count, item]
+        self.entries[item] = entry
+        heapq.heappush(self.heap, entry)
+        self.count += 1
+
+    def pop(self):
+        "Removes the item of lowest priority and returns (priority, item)"
+        while True:
+            (priority, _, item) = heapq.heappop(self.heap)
+            if item is not IndexedPriorityQueue.REMOVED:
+                del self.entries[item]
+                return (priority, item)
+
+    def isEmpty(self):
+        return len(self.entries) == 0
+
+    def __contains__(self, item):
+        return item in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def getPriority(self, item):
+        return self.entries[item][0]
+
+    def update(self, item, priority):
+        # If item already in priority queue with higher priority, decrease its priority.
+        # If item already in priority queue with equal or lower priority, do nothing.
+        # If item not in priority queue, do the same thing as self.push.
+        entry = self.entries.get(item)
+        if entry is not None:
+            if entry[0] <= priority:
+                return
+            entry[2] = IndexedPriorityQueue.REMOVED
+        self.push(item, priority)
+
+
+class NodePool:
+    """
+      A pool of search nodes stored in flat arrays. A node is a record
+      (state key, parent index, action, g-cost) referred to by its index,
+      so that a frontier only holds the index of a node instead of the path
+      leading to it. The path is rebuilt once, by following the parent
+      indices, when it is needed.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.parents = array('l')
+        self.actions = []
+        self.costs = array('l')
+
+    def push(self, key, parent, action, cost):
+        """
+          Adds the node reached from node 'parent' by 'action', at cost
+          'cost', and returns its index. The root node has parent -1.
+        """
+        self.keys.append(key)
+        self.parents.append(parent)
+        self.actions.append(action)
+        self.costs.append(cost)
+        return len(self.parents) - 1
+
+    def getPath(self, node):
+        "Returns the list of actions leading from the root to 'node'"
+        path = []
+        parents = self.parents
+        while parents[node] >= 0:
+            path.append(self.actions[node])
+            node = parents[node]
+        path.reverse()
+        return path
+
+    def __len__(self):
+        return len(self.parents)
+
+
 def manhattanDistance(xy1, xy2):
     "Returns the Manhattan distance between points xy1 and xy2"
     return abs(xy1[0] - xy2[0]) + abs(xy1[1] - xy2[1])
@@ -70,6 +70,17 @@ if __name__ == '__main__':
         '--silentdisplay',
         help="Disable the graphical display of the game.",
         action="store_true")
+    parser.add_argument(
+        '--heuristic',
+        help="Heuristic of the A* agent: the largest Manhattan distance to a "
+             "dot, the largest maze distance to a dot, or the distance to "
+             "the closest dot plus a minimum spanning tree over the dots.",
+        choices=["farthest", "maze", "mst"], default="farthest")
+    parser.add_argument(
+        '--compact',
+        help="Run the search agents on compact (cell, food bitmask) states "
+             "instead of game states. Ghosts are ignored by the search.",
+        action="store_true")
 
     args = parser.parse_args()
     agent = load_agent_from_file(args.agentfile)(args)
@@ -1,9 +1,9 @@
 from pacman_module.game import Agent
 from pacman_module.pacman import Directions
-from pacman_module.util import Stack, Queue
-
-from queue import PriorityQueue
-from copy import deepcopy
+from pacman_module.util import Stack, Queue, NodePool
+from pacman_module.util import IndexedPriorityQueue
+from pacman_module.searchProblems import FoodSearchProblem
+from pacman_module.searchProblems import GameStateSearchProblem
 
 class PacmanAgent(Agent):
     def __init__(self, args):
@@ -13,7 +13,7 @@ class PacmanAgent(Agent):
         - `args`: Namespace of arguments from command-line prompt.
         """
         self.args = args
-        self.frontier = PriorityQueue()
+        self.frontier = IndexedPriorityQueue()
         self.path = Queue()
 
     def get_action(self, state):
@@ -36,81 +36,90 @@ class PacmanAgent(Agent):
             move = self.path.pop()
             return move
 
-        # Uniform-Cost Search: the frontier is a priority queue, organised
-        # w.r.t the backward costs.
-        self.frontier = PriorityQueue()
-        pathInformation = PathInformation(0, state, [])
-        self.frontier.put_nowait(pathInformation)
-
-        # A state is defined by a (x,y) position in the labyrinth, and the remaining number of dots
-        # along with their position, i.e. the food matrix
-        self.visited = {(state.getPacmanPosition(), state.getFood())}
+        # The search runs on full game states, or on compact (cell, food)
+        # states if requested, which ignore the ghosts
+        if self.args.compact:
+            self.problem = FoodSearchProblem(state)
+        else:
+            self.problem = GameStateSearchProblem(state)
+        state = self.problem.getStartState()
+
+        # Uniform-Cost Search: the frontier is a priority queue of the keys
+        # of the states, organised w.r.t the backward costs.
+        self.frontier = IndexedPriorityQueue()
+
+        # A state is identified by a (x,y) position in the labyrinth, and the
+        # remaining dots, i.e. the food matrix or bitmask
+        key = self.problem.getStateKey(state)
+
+        # Search nodes are kept in a pool to rebuild the path to the goal.
+        # The best node reaching each state is recorded, along with the state
+        # itself while it lies in the frontier.
+        self.nodes = NodePool()
+        self.bestNodes = {key: self.nodes.push(key, -1, None, 0)}
+        self.frontierStates = {key: state}
+        self.frontier.push(key, 0)
 
         # While the frontier is not empty, remove one state from it and explore
         # further
-        while not self.frontier.empty():
+        while not self.frontier.isEmpty():
 
-            queueHead = self.frontier.get_nowait()
-            currentCost = queueHead.cost
-            currentState = queueHead.state
-            currentMoves = queueHead.moves
+            currentCost, currentKey = self.frontier.pop()
+            currentState = self.frontierStates.pop(currentKey)
+            currentNode = self.bestNodes[currentKey]
 
             # If the removed state is a goal state, return the path leading to
             # it
-            if currentState.isWin():
-                self._build_path(currentMoves)
+            if self.problem.isGoalState(currentState):
+                self._build_path(self.nodes.getPath(currentNode))
                 nextMove = self.path.pop()
                 return nextMove
 
             # Else, expand the frontier with the successors of the current
             # state
-            self._explore_frontier(currentState, currentCost, currentMoves)
+            self._explore_frontier(currentState, currentCost, currentNode)
 
         return Directions.STOP
 
-    def _explore_frontier(self, state, currentCost, currentMoves):
+    def _explore_frontier(self, state, currentCost, currentNode):
         """
         Given a pacman game state and the path leading to it (along with its cost),
-        expand the frontier by adding its not-yet-visited successors.
+        expand the frontier by adding its successors not yet reached by a
+        path at most as cheap.
 
         Arguments:
         ----------
         - `state`: the current game state.
         - `currentCost`: the cost to reach this state
-        - `currentMoves`: the path to reach this state
+        - `currentNode`: the search node of this state
         """
-        currentFood = state.getFood()
-
         # Generate the successors of the current state
-        successors = state.generatePacmanSuccessors()
+        successors = self.problem.getSuccessors(state)
         for s in successors:
 
             nextState = s[0]
             nextMove = s[1]
 
-            # The path to the successor is the path to the current state plus
-            # the action to go from the current state to its successor
-            nextMoves = deepcopy(currentMoves)
-            nextMoves.append(nextMove)
-
-            sInfo = (s[0].getPacmanPosition(), s[0].getFood())
-
-            # If we move unto a cell with food, it costs "less" than if we move
-            # unto a cell without food (since eating increases our score)
-            nextPacmanPosition = nextState.getPacmanPosition()
-            if currentFood[nextPacmanPosition[0]
-                           ][nextPacmanPosition[1]] == True:
-                costIncrease = 1
-            else:
-                costIncrease = 11
-
-            # If the successor has not been visited yet, add it to the frontier,
-            # and mark it as visited.
-            if sInfo not in self.visited:
-                nextPathInformation = PathInformation(currentCost + costIncrease,
-                                                      nextState, nextMoves)
-                self.frontier.put_nowait(nextPathInformation)
-                self.visited.add(sInfo)
+            sInfo = self.problem.getStateKey(s[0])
+
+            # The problem makes a move unto a cell with food cost "less" than
+            # a move unto a cell without food (since eating increases our score)
+            nextCost = currentCost + s[2]
+
+            # If the successor has already been reached by a path at most as
+            # cheap, the new path is dropped.
+            bestNode = self.bestNodes.get(sInfo)
+            if bestNode is not None and self.nodes.costs[bestNode] <= nextCost:
+                continue
+
+            # Else, the successor is added to the frontier, or its cost is
+            # decreased if it already lies in it. The path to the successor is
+            # the path to the current state plus the action to go from the
+            # current state to its successor.
+            self.bestNodes[sInfo] = self.nodes.push(
+                sInfo, currentNode, nextMove, nextCost)
+            self.frontierStates[sInfo] = nextState
+            self.frontier.update(sInfo, nextCost)
 
     def _build_path(self, statePath):
         """
@@ -126,39 +135,3 @@ class PacmanAgent(Agent):
             self.path.push(statePath[i])
             i += 1
 
-
-class PathInformation:
-    """
-    This class is used to store useful information about a developped path.
-    """
-
-    def __init__(self, cost, state, moves):
-        """
-        Initialisation function.
-
-        Arguments:
-        ----------
-        - cost: The backward cost.
-        - state : The state reached by the path.
-        - moves: The moves to make from the current state to reach the state
-                 stored in this object.
-        """
-        self.cost = cost
-        self.state = state
-        self.moves = moves
-
-    def __lt__(self, otherPathInformation):
-        """
-        This method compares this PathInformation object with another one and
-        return True if this object is strictly lower than otherPathInformation
-        object.
-
-        Arguments:
-        ----------
-        - otherPathInformation: a PathInformation object to compare with this
-                                PathInformation object.
-        Return:
-        -------
-        - True if self.cost < otherPathInformation.cost, False otherwise.
-        """
-        return self.cost < otherPathInformation.cost